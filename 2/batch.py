@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Пакетная генерация калькуляторов: одна книга на сценарий CONTROL.
+
+Сценарии - CSV (колонка name и колонки вводных) или JSON/JSONL
+(объекты {"name": ..., "users": ..., ...} либо {"name": ..., "inputs": {...}}):
+
+    name,users,growth,tryons_per_user,region,meta_owner
+    client-001,8000,20,3,EU,anna
+    client-002,1500,10,5,US,oleg
+
+Кроме name и вводных CONTROL допустимы только объявленные метаданные:
+колонки с префиксом meta_ или перечисленные в --meta (region, tier и
+т.п.) пропускаются, любая другая колонка - ошибка (Users, grwoth не
+превратятся молча в книгу с вводными по умолчанию). В объекте "inputs"
+допустимы только вводные. Все сценарии проверяются до запуска пула:
+
+    python batch.py clients.csv -o calculators/ --meta region
+
+    python batch.py clients.csv -o calculators/        # папка с xlsx
+    python batch.py clients.csv -o calculators.zip     # один zip
+
+Книги собираются в пуле процессов; каждый процесс один раз импортирует
+openpyxl и загружает каталог, дальше только строит книги. В режиме zip
+процессы возвращают байты xlsx, а архив пишет основной процесс.
+"""
+
+import argparse
+import csv
+import json
+import os
+import re
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from difflib import get_close_matches
+
+from cost_model import CONTROL_INPUTS, FORECAST_MONTHS, horizon_arg
+from create_calculator import build_workbook
+from pricing import load_catalog
+
+_SAFE_NAME = re.compile(r"[^\w.-]+")
+
+# Колонки-метаданные сценария (не вводные): meta_region, meta_owner, ...
+META_PREFIX = "meta_"
+
+# Параметры сборки в процессе пула (задаются в _init_worker)
+_options = {}
+
+
+def load_scenarios(path, meta=()):
+    """
+    [(имя, вводные)] из CSV, JSON (список) или JSONL. meta - имена
+    колонок-метаданных (кроме колонок с префиксом meta_).
+    """
+    if path.endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+    else:
+        with open(path, encoding="utf-8") as f:
+            if path.endswith(".jsonl"):
+                rows = [json.loads(line) for line in f if line.strip()]
+            else:
+                rows = json.load(f)
+    return [_scenario(row, i, set(meta)) for i, row in enumerate(rows, 1)]
+
+
+def _scenario(row, index, meta=frozenset()):
+    if not isinstance(row, dict):
+        raise ValueError(f"сценарий {index}: ожидается объект, а не {type(row).__name__}")
+    row = dict(row)
+    name = str(row.pop("name", "") or f"scenario-{index:05d}")
+    inputs = row.pop("inputs", None)
+    row = {key: value for key, value in row.items()
+           if key not in meta and not key.startswith(META_PREFIX)}
+    if inputs is None:
+        inputs = row
+    elif row:
+        raise ValueError(f"сценарий {name!r}: поля {sorted(row)} вне inputs; метаданные "
+                         f"объявляются префиксом {META_PREFIX} или --meta")
+    return name, check_inputs(name, inputs)
+
+
+def check_inputs(name, inputs):
+    """Вводные сценария name как числа; неизвестное имя или не число - ValueError."""
+    if not isinstance(inputs, dict):
+        raise ValueError(f"сценарий {name!r}: inputs должен быть объектом")
+    unknown = sorted(set(inputs) - set(CONTROL_INPUTS))
+    if unknown:
+        hints = [f"{key} -> {close[0]}?" for key in unknown
+                 for close in [get_close_matches(key.lower(), CONTROL_INPUTS, n=1)] if close]
+        raise ValueError(f"сценарий {name!r}: неизвестные вводные {unknown}"
+                         + (f" ({', '.join(hints)})" if hints else "")
+                         + f"; метаданные объявляются префиксом {META_PREFIX} или --meta")
+    checked = {}
+    for key, value in inputs.items():
+        if value in ("", None):
+            continue
+        try:
+            if isinstance(value, bool):
+                raise TypeError
+            checked[key] = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"сценарий {name!r}: {key}={value!r} - не число") from None
+    return checked
+
+
+def file_name(name):
+    return _SAFE_NAME.sub("_", name).strip("._") + ".xlsx"
+
+
+def _init_worker(options):
+    _options.clear()
+    _options.update(options)
+
+
+def _build(task):
+    name, inputs, directory = task
+    book = build_workbook(inputs=inputs, **_options)
+    if directory is None:
+        return name, book.to_bytes()
+    path = os.path.join(directory, file_name(name))
+    book.save(path)
+    return name, path
+
+
+def _run(tasks, options, workers):
+    if workers == 1 or len(tasks) == 1:
+        _init_worker(options)
+        yield from map(_build, tasks)
+        return
+    chunksize = max(1, len(tasks) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(options,)) as pool:
+        yield from pool.map(_build, tasks, chunksize=chunksize)
+
+
+def generate(scenarios, output, workers=None, horizon=FORECAST_MONTHS, daily=False,
+             write_only=None, catalog=None, cached_values=False):
+    """
+    Книги для списка сценариев [(имя, вводные)]. output - папка или файл
+    .zip. Возвращает список имен файлов в порядке сценариев.
+    """
+    scenarios = [(name, check_inputs(name, inputs)) for name, inputs in scenarios]
+    names = [file_name(name) for name, _ in scenarios]
+    duplicates = {n for n in names if names.count(n) > 1}
+    if duplicates:
+        raise ValueError(f"повторяющиеся имена сценариев: {sorted(duplicates)}")
+    options = {"horizon": horizon, "daily": daily, "write_only": write_only,
+               "catalog": load_catalog() if catalog is None else catalog,
+               "cached_values": cached_values}
+    workers = max(1, min(workers or os.cpu_count() or 1, len(scenarios)))
+
+    if not output.endswith(".zip"):
+        os.makedirs(output, exist_ok=True)
+        tasks = [(name, inputs, output) for name, inputs in scenarios]
+        return [os.path.basename(path) for _, path in _run(tasks, options, workers)]
+
+    tasks = [(name, inputs, None) for name, inputs in scenarios]
+    # xlsx уже сжат - в архив кладется без повторного сжатия
+    with zipfile.ZipFile(output, "w", zipfile.ZIP_STORED) as archive:
+        for name, data in _run(tasks, options, workers):
+            archive.writestr(file_name(name), data)
+    return names
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Пакетная генерация калькуляторов")
+    parser.add_argument("scenarios", help="CSV, JSON или JSONL со сценариями")
+    parser.add_argument("-o", "--output", required=True, help="папка или файл .zip")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--horizon", type=horizon_arg, default=FORECAST_MONTHS)
+    parser.add_argument("--daily", action="store_true")
+    parser.add_argument("--catalog", help="каталог цен (по умолчанию pricing.json)")
+    parser.add_argument("--values", action="store_true",
+                        help="сохранить вычисленные значения формул")
+    parser.add_argument("--meta", default="", metavar="COL,COL",
+                        help=f"колонки-метаданные (кроме колонок с префиксом {META_PREFIX})")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    try:
+        scenarios = load_scenarios(args.scenarios, [c for c in args.meta.split(",") if c])
+        files = generate(scenarios, args.output, args.workers, args.horizon, args.daily,
+                         catalog=load_catalog(args.catalog), cached_values=args.values)
+    except ValueError as exc:
+        parser.error(str(exc))
+    elapsed = time.perf_counter() - started
+    print(f"✅ {len(files)} калькуляторов -> {args.output} за {elapsed:.1f} с "
+          f"({len(files) / elapsed:.0f} книг/с)")
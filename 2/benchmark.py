@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Замеры производительности генератора и модели.
+
+Сборка книги (build_workbook + запись xlsx в память) меряется для
+горизонтов 6/36/120 месяцев и каталогов на 10/100/1000 позиций: время
+(лучшее из repeat прогонов) и пик памяти (tracemalloc, отдельным
+прогоном - он замедляет сборку). Вычисление модели - сценариев в секунду
+для evaluate() по одному сценарию и для векторного evaluate_batch().
+
+Каталоги нужного размера собираются из pricing.json: позиции, на
+которые ссылаются TOTAL и прогноз, остаются всегда, остальные
+добавляются по порядку, недостающие - синтетические позиции
+bench/service-N в секции BENCHMARK каждого листа.
+
+Результаты сохраняются в JSON (baseline), сравнение с ним отмечает
+регрессии - метрики, ухудшившиеся больше чем на threshold:
+
+    python benchmark.py -o baseline.json
+    python benchmark.py --compare baseline.json --threshold 0.2   # код 1 при регрессии
+    python benchmark.py --horizons 6 --services 10 --repeat 1     # быстрый прогон
+"""
+
+import argparse
+import copy
+import gc
+import io
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from cost_model import BACKEND, BACKGROUND_REMOVAL, LLM, TRYON, UPSCALE, VIDEO, WORKER, evaluate
+from pricing import TOKEN_SHEET, Catalog, item_key, load_catalog
+
+HORIZONS = (6, 36, 120)
+SERVICES = (10, 100, 1000)
+REPEAT = 3
+SCENARIOS = 100_000
+SCALAR_SCENARIOS = 200
+THRESHOLD = 0.2
+
+# Позиции, без которых модель не собирается
+REQUIRED = {TRYON, VIDEO, LLM, BACKGROUND_REMOVAL, UPSCALE, BACKEND, WORKER}
+
+# Метрики, у которых больше - лучше (у остальных больше - хуже)
+HIGHER_IS_BETTER = {"scenarios_per_second"}
+
+
+def _entries(data):
+    """[(лист, секция, позиция)] каталога в порядке файла."""
+    return [(sheet, section["title"], entry)
+            for sheet, spec in data["sheets"].items()
+            for section in spec["sections"]
+            for entry in section["items"]]
+
+
+def _synthetic(sheet, n):
+    entry = {"provider": "bench", "model": f"service-{n}", "operation": "service",
+             "name": f"Service {n}", "note": "benchmark"}
+    if sheet == TOKEN_SHEET:
+        return {**entry, "input": 1.0, "output": 2.0, "tokens": 1000, "quantity": "=CONTROL!B25"}
+    if sheet == "Traffic":
+        return {**entry, "price": 0.0001, "per_user": 1}
+    return {**entry, "price": 1.0, "quantity": 1}
+
+
+def synthetic_catalog(services, base=None):
+    """Каталог ровно на services позиций (не меньше обязательных, по одной на лист)."""
+    base = load_catalog() if base is None else base
+    entries = _entries(base.data)
+    key = lambda e: item_key(e[2]["provider"], e[2]["model"], e[2]["operation"])
+    firsts = {}
+    for entry in entries:
+        firsts.setdefault(entry[0], key(entry))
+    keep = REQUIRED | set(firsts.values())
+    if services < len(keep):
+        raise ValueError(f"каталог не может быть меньше {len(keep)} позиций")
+    for entry in entries:
+        if len(keep) >= services:
+            break
+        keep.add(key(entry))
+
+    data = copy.deepcopy(base.data)
+    for spec in data["sheets"].values():
+        for section in spec["sections"]:
+            section["items"] = [e for e in section["items"]
+                                if item_key(e["provider"], e["model"], e["operation"]) in keep]
+        spec["sections"] = [s for s in spec["sections"] if s["items"]]
+    sheets = list(data["sheets"])
+    extra = {sheet: [] for sheet in sheets}
+    for n in range(services - len(keep)):
+        sheet = sheets[n % len(sheets)]
+        extra[sheet].append(_synthetic(sheet, n + 1))
+    for sheet, items in extra.items():
+        if items:
+            data["sheets"][sheet]["sections"].append({"title": "BENCHMARK", "items": items})
+    return Catalog(data)
+
+
+def _build(horizon, catalog):
+    from create_calculator import build_workbook
+
+    buffer = io.BytesIO()
+    build_workbook(horizon=horizon, catalog=catalog).save(buffer)
+    return buffer.tell()
+
+
+def bench_build(horizon, catalog, repeat=REPEAT):
+    """Лучшее время сборки из repeat прогонов и пик памяти отдельного прогона."""
+    _build(horizon, catalog)  # импорт openpyxl и прогрев кэшей
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        size = _build(horizon, catalog)
+        times.append(time.perf_counter() - started)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        _build(horizon, catalog)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {"seconds": min(times), "peak_mb": peak / 2**20, "xlsx_kb": size / 1024}
+
+
+def _scenarios(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return {
+        "users": rng.uniform(1000, 100_000, n),
+        "growth": rng.uniform(0, 40, n),
+        "tryons_per_user": rng.uniform(1, 6, n),
+        "videos_per_user": rng.uniform(0, 3, n),
+        "llm_per_user": rng.uniform(1, 10, n),
+    }
+
+
+def bench_eval(scenarios=SCENARIOS, scalar_scenarios=SCALAR_SCENARIOS, repeat=REPEAT):
+    """Сценариев в секунду: evaluate() по одному и evaluate_batch() массивами."""
+    from sweep import evaluate_batch
+
+    columns = _scenarios(scenarios)
+    evaluate()  # компиляция модели
+    started = time.perf_counter()
+    for i in range(scalar_scenarios):
+        evaluate({name: float(col[i]) for name, col in columns.items()})
+    scalar = scalar_scenarios / (time.perf_counter() - started)
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        evaluate_batch(columns)
+        times.append(time.perf_counter() - started)
+    return {"eval/scalar": {"scenarios_per_second": scalar},
+            "eval/batch": {"scenarios_per_second": scenarios / min(times)}}
+
+
+def run(horizons=HORIZONS, services=SERVICES, repeat=REPEAT, scenarios=SCENARIOS, log=None):
+    """Все замеры: {'meta': ..., 'results': {'build/h6/s10': {...}, 'eval/batch': {...}}}."""
+    import openpyxl
+
+    results = {}
+    base = load_catalog()
+    for size in services:
+        catalog = synthetic_catalog(size, base)
+        for horizon in horizons:
+            name = f"build/h{horizon}/s{size}"
+            results[name] = bench_build(horizon, catalog, repeat)
+            if log:
+                log(name, results[name])
+    for name, metrics in bench_eval(scenarios, repeat=repeat).items():
+        results[name] = metrics
+        if log:
+            log(name, metrics)
+    meta = {"python": platform.python_version(), "numpy": np.__version__,
+            "openpyxl": openpyxl.__version__, "platform": platform.platform(),
+            "repeat": repeat, "scenarios": scenarios}
+    return {"meta": meta, "results": results}
+
+
+def compare(current, baseline, threshold=THRESHOLD):
+    """
+    Сравнение с baseline: [{'name', 'metric', 'baseline', 'current',
+    'change', 'regression'}]; change - доля ухудшения (> 0 - хуже).
+    """
+    rows = []
+    for name, metrics in current["results"].items():
+        old = baseline["results"].get(name)
+        if old is None:
+            continue
+        for metric, value in metrics.items():
+            if metric not in old or not old[metric]:
+                continue
+            ratio = value / old[metric]
+            change = 1 / ratio - 1 if metric in HIGHER_IS_BETTER else ratio - 1
+            rows.append({"name": name, "metric": metric, "baseline": old[metric],
+                         "current": value, "change": change, "regression": change > threshold})
+    return rows
+
+
+def _print_metrics(name, metrics):
+    text = ", ".join(f"{k}={v:,.3f}" if v < 1000 else f"{k}={v:,.0f}" for k, v in metrics.items())
+    print(f"  {name:<22} {text}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Замеры производительности калькулятора")
+    parser.add_argument("--horizons", default=",".join(map(str, HORIZONS)))
+    parser.add_argument("--services", default=",".join(map(str, SERVICES)))
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--scenarios", type=int, default=SCENARIOS)
+    parser.add_argument("-o", "--output", help="сохранить результаты (baseline) в JSON")
+    parser.add_argument("--compare", metavar="BASELINE", help="сравнить с сохраненным JSON")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="допустимое ухудшение (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    current = run([int(h) for h in args.horizons.split(",")],
+                  [int(s) for s in args.services.split(",")],
+                  args.repeat, args.scenarios, log=_print_metrics)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+    if not args.compare:
+        if not args.output:
+            print(json.dumps(current, ensure_ascii=False, indent=2))
+        sys.exit(0)
+
+    with open(args.compare, encoding="utf-8") as f:
+        rows = compare(current, json.load(f), args.threshold)
+    for row in rows:
+        mark = "РЕГРЕССИЯ" if row["regression"] else "ok"
+        print(f"{row['name']:<22} {row['metric']:<22} {row['baseline']:>14,.3f} -> "
+              f"{row['current']:>14,.3f} ({row['change']:+.1%}) {mark}")
+    regressions = sum(row["regression"] for row in rows)
+    print(f"Регрессий: {regressions} из {len(rows)} метрик (порог {args.threshold:.0%})")
+    sys.exit(1 if regressions else 0)
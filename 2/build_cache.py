@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Кэш собранных книг на диске с адресацией по содержимому.
+
+У каждого листа считается хэш того, из чего он собирается: ячейки модели
+листа (sheet_cells() - вводные CONTROL, таблицы цен, раскладка прогноза
+для горизонта и единицы), вводные, режим --values и версия генератора
+(исходники create_calculator/styles/cost_model/pricing/formula,
+openpyxl, потоковый режим). С --values в хэш листа входят и листы, на
+которые ссылаются его формулы: значения следуют из этих же данных и
+считаются только при сборке листов. Хэш книги - хэш всех
+листов и каркаса (все части zip, кроме листов: workbook.xml, styles.xml
+и т.д.).
+
+    hit      - такая книга уже собиралась: файл копируется из кэша;
+    partial  - собираются только листы с новым хэшем, остальные части
+               берутся из кэша, zip собирается заново;
+    miss     - книга собирается целиком, листы и каркас кладутся в кэш.
+
+Индексы стилей ячеек фиксированы (styles.register_styles()), а строки
+openpyxl пишет в сами листы, поэтому XML листа не зависит от остальных
+листов книги и части из разных сборок складываются в одну книгу.
+
+Кэш - папка CALC_CACHE_DIR (по умолчанию ~/.cache/calculator); при
+превышении max_bytes удаляются давно не использованные записи.
+
+    from build_cache import cached_workbook
+    data, status = cached_workbook(inputs={"users": 8000}, horizon=60)
+
+    python build_cache.py users=8000 --horizon 60 -o calc.xlsx
+    python build_cache.py --stats
+    python build_cache.py --clear
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import re
+import tempfile
+import time
+import zipfile
+from functools import lru_cache
+from importlib import metadata
+
+from cost_model import (
+    FORECAST_MONTHS, forecast_rows, horizon_arg, parse_inputs, resolve_inputs, sheet_cells,
+)
+from formula import is_formula, split_key
+from pricing import load_catalog
+
+CACHE_DIR = os.environ.get("CALC_CACHE_DIR") or os.path.join(
+    os.path.expanduser("~"), ".cache", "calculator")
+MAX_BYTES = 256 * 2**20
+
+# Меняется при несовместимом изменении формата записей кэша
+CACHE_VERSION = 1
+
+# Модули, от которых зависит содержимое книги
+SOURCES = ("create_calculator.py", "styles.py", "cost_model.py", "pricing.py", "formula.py",
+           "xlsx_patch.py")
+
+# Ссылка на лист в формуле: CONTROL!B5, 'Forecast_6M'!B4
+_SHEET_REF_RE = re.compile(r"'?([A-Za-z_][\w.]*)'?!")
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+class DiskCache:
+    """Записи key -> bytes в папке; при превышении max_bytes вытесняются старые по mtime."""
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key)
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)  # время использования для вытеснения
+        except FileNotFoundError:
+            pass
+        return data
+
+    def put(self, key, data):
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, self._path(key))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        self.evict()
+
+    def _entries(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and not entry.name.startswith("."):
+                stat = entry.stat()
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        return entries
+
+    def evict(self):
+        """Удаляет давно не использованные записи, пока кэш больше max_bytes."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        for _, _, path in self._entries():
+            os.unlink(path)
+
+    def stats(self):
+        entries = self._entries()
+        return {"directory": self.directory, "entries": len(entries),
+                "bytes": sum(size for _, size, _ in entries), "max_bytes": self.max_bytes}
+
+
+@lru_cache(maxsize=None)
+def generator_version():
+    """Хэш исходников генератора и версии openpyxl."""
+    digest = hashlib.sha256(f"{CACHE_VERSION}:{metadata.version('openpyxl')}".encode())
+    for name in SOURCES:
+        with open(os.path.join(_HERE, name), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def _digest(*parts):
+    data = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=repr)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def _by_sheet(cells):
+    sheets = {}
+    for key, value in cells.items():
+        sheet, _, _ = split_key(key)
+        sheets.setdefault(sheet, {})[key] = value
+    return sheets
+
+
+def _sheet_deps(cells):
+    """{лист: листы, от формул которых он зависит прямо или косвенно (включая себя)}."""
+    direct = {}
+    for sheet, sheet_data in cells.items():
+        refs = direct.setdefault(sheet, {sheet})
+        for value in sheet_data.values():
+            if is_formula(value):
+                refs.update(_SHEET_REF_RE.findall(value))
+    closure = {}
+    for sheet in direct:
+        found, stack = set(), [sheet]
+        while stack:
+            name = stack.pop()
+            if name not in found:
+                found.add(name)
+                stack.extend(direct.get(name, ()))
+        closure[sheet] = found
+    return closure
+
+
+def build_keys(inputs=None, horizon=FORECAST_MONTHS, daily=False, write_only=None,
+               catalog=None, cached_values=False, cohorts=None):
+    """
+    Ключи кэша для параметров build_workbook(): ({лист: хэш} в порядке
+    листов книги, хэш каркаса, хэш книги).
+    """
+    from create_calculator import sheet_titles, streaming_mode
+
+    catalog = load_catalog() if catalog is None else catalog
+    streaming = streaming_mode(forecast_rows(horizon, daily, catalog, cohorts), write_only)
+    version = generator_version()
+    titles = sheet_titles(horizon, daily)
+
+    cells = sheet_cells(horizon, daily, catalog, cohorts)
+    cells.update(resolve_inputs(inputs))
+    cells = _by_sheet(cells)
+
+    own = {title: _digest(version, streaming, cached_values, title, cells.get(title, {}))
+           for title in titles}
+    if cached_values:
+        # значения формул листа зависят и от листов, на которые он ссылается
+        deps = _sheet_deps(cells)
+        sheets = {title: _digest([own[s] for s in sorted(deps[title] & own.keys())])
+                  for title in titles}
+    else:
+        sheets = own
+    skeleton = _digest(version, streaming, cached_values, titles)
+    return sheets, skeleton, _digest(skeleton, list(sheets.values()))
+
+
+def _build_sheets(titles, options):
+    """Книга только с листами titles (остальные построители пропускаются), xlsx в памяти."""
+    from create_calculator import SHEET_BUILDERS, Calculator, sheet_titles
+
+    book = Calculator(**options)
+    for build, title in zip(SHEET_BUILDERS, sheet_titles(book.horizon, book.daily)):
+        if title in titles:
+            book.stage(build.__name__, build, book)
+    return book.to_bytes()
+
+
+def _skeleton(archive, parts):
+    """Все части книги, кроме листов, - zip без сжатия."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as out:
+        for info in archive.infolist():
+            if info.filename not in parts:
+                out.writestr(info, archive.read(info), zipfile.ZIP_STORED)
+    return buffer.getvalue()
+
+
+def _assemble(skeleton, parts, titles):
+    """xlsx из каркаса и XML листов {лист: bytes}."""
+    from xlsx_patch import sheet_parts
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(io.BytesIO(skeleton)) as src, \
+            zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as out:
+        paths = sheet_parts(src)
+        for info in src.infolist():
+            out.writestr(info, src.read(info), zipfile.ZIP_DEFLATED)
+        for title in titles:
+            out.writestr(zipfile.ZipInfo(paths[title], time.localtime()[:6]), parts[title],
+                         zipfile.ZIP_DEFLATED)
+    return buffer.getvalue()
+
+
+def cached_workbook(cache=None, **options):
+    """
+    xlsx для параметров build_workbook() из кэша или со сборкой только
+    измененных листов: (bytes, {'status': 'hit'|'partial'|'miss', 'rebuilt': [листы]}).
+    """
+    from xlsx_patch import sheet_parts
+
+    cache = DiskCache() if cache is None else cache
+    options = {**options, "catalog": load_catalog() if options.get("catalog") is None
+               else options["catalog"]}
+    options.pop("profiler", None)
+    sheets, skeleton_key, file_key = build_keys(**options)
+    titles = list(sheets)
+
+    data = cache.get(f"file-{file_key}.xlsx")
+    if data is not None:
+        return data, {"status": "hit", "rebuilt": []}
+
+    skeleton = cache.get(f"skel-{skeleton_key}.zip")
+    parts = {}
+    if skeleton is not None:
+        for title in titles:
+            part = cache.get(f"part-{sheets[title]}.xml")
+            if part is not None:
+                parts[title] = part
+    missing = [title for title in titles if title not in parts]
+
+    built = _build_sheets(set(titles) if skeleton is None else set(missing), options)
+    with zipfile.ZipFile(io.BytesIO(built)) as archive:
+        paths = sheet_parts(archive)
+        for title in missing:
+            parts[title] = archive.read(paths[title])
+            cache.put(f"part-{sheets[title]}.xml", parts[title])
+        if skeleton is None:
+            skeleton = _skeleton(archive, set(paths.values()))
+            cache.put(f"skel-{skeleton_key}.zip", skeleton)
+
+    if len(missing) == len(titles):
+        data, status = built, "miss"
+    else:
+        data, status = _assemble(skeleton, parts, titles), "partial"
+    cache.put(f"file-{file_key}.xlsx", data)
+    return data, {"status": status, "rebuilt": missing}
+
+
+def save_cached(path, cache=None, **options):
+    """Сохраняет книгу в path через кэш; возвращает статус cached_workbook()."""
+    data, status = cached_workbook(cache, **options)
+    with open(path, "wb") as f:
+        f.write(data)
+    return status
+
+
+if __name__ == "__main__":
+    from create_calculator import OUTPUT_PATH
+
+    parser = argparse.ArgumentParser(description="Сборка калькулятора через кэш листов")
+    parser.add_argument("inputs", nargs="*", metavar="name=value",
+                        help="вводные CONTROL, например users=8000 growth=20")
+    parser.add_argument("--horizon", type=horizon_arg, default=FORECAST_MONTHS)
+    parser.add_argument("--daily", action="store_true")
+    parser.add_argument("--values", action="store_true",
+                        help="сохранить вычисленные значения формул")
+    parser.add_argument("--catalog", help="каталог цен (по умолчанию pricing.json)")
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--max-mb", type=float, default=MAX_BYTES / 2**20,
+                        help="предельный размер кэша, МБ")
+    parser.add_argument("--stats", action="store_true", help="показать размер кэша")
+    parser.add_argument("--clear", action="store_true", help="очистить кэш")
+    parser.add_argument("-o", "--output", default=OUTPUT_PATH, help="файл xlsx")
+    args = parser.parse_args()
+
+    cache = DiskCache(args.cache_dir, int(args.max_mb * 2**20))
+    if args.clear or args.stats:
+        if args.clear:
+            cache.clear()
+        print(json.dumps(cache.stats(), ensure_ascii=False, indent=2))
+        raise SystemExit(0)
+
+    inputs = parse_inputs(args.inputs, parser)
+    started = time.perf_counter()
+    status = save_cached(args.output, cache, inputs=inputs, horizon=args.horizon,
+                         daily=args.daily, catalog=load_catalog(args.catalog),
+                         cached_values=args.values)
+    elapsed = time.perf_counter() - started
+    rebuilt = ", ".join(status["rebuilt"]) or "-"
+    print(f"✅ {args.output}: {status['status']} за {elapsed:.2f} с (собраны листы: {rebuilt})")
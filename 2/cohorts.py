@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Когортная модель пользователей с оттоком.
+
+Forecast_6M считает пользователей одним сложным процентом
+(B5 * (1 + B6/100)^(месяц-1)) и не учитывает, что пользователи уходят, а
+оставшиеся со временем пользуются продуктом реже. Здесь пользователи
+разбиты на когорты по периоду регистрации. Новые пользователи - прирост
+той же линии сложного процента (B5 в первом периоде), но каждая когорта
+затем теряет пользователей:
+
+    новые[t]      = B5 * ((1 + B6/100)^t - (1 + B6/100)^(t-1))
+    активные[t]   = сумма по когортам c <= t: новые[c] * удержание(t - c)
+    вовлеченные[t]= сумма по когортам: новые[c] * удержание(t - c) * активность(t - c)
+
+Удержание и активность - кривые от возраста когорты в месяцах (по
+умолчанию степенная кривая удержания с плато и экспоненциальное
+затухание активности). Использование и AI-расходы считаются по
+вовлеченным пользователям каждой когорты, серверы и трафик - по
+активным.
+
+Матрица когорт (когорта x период) - float32; удержание по возрастам
+хранится одной строкой и разворачивается в матрицу как view без
+копирования, поэтому 60 месяцев по дням (1826 x 1826) занимают ~13 MB.
+Итоги по периодам считаются сверткой без матрицы.
+
+cohort_forecast() возвращает строки для Forecast и CONTROL:
+
+    from cohorts import cohort_forecast
+    from cost_model import evaluate
+    cohorts = cohort_forecast({"users": 8000}, horizon=60)
+    values = evaluate({"users": 8000}, horizon=60, cohorts=cohorts)
+
+    python cohorts.py users=8000 growth=20 --horizon 60 --daily
+    python cohorts.py --horizon 36 --xlsx cohorts.xlsx
+"""
+
+import argparse
+import json
+import time
+from collections import namedtuple
+
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+from cost_model import (
+    CONTROL_INPUTS, DAYS_PER_YEAR, FORECAST_MONTHS, LLM, TRYON, VIDEO, evaluate, forecast_sheet,
+    horizon_arg, parse_inputs,
+)
+from formula import column_letter
+from pricing import load_catalog
+
+# Удержание: доля когорты, активная через a месяцев = плато + (1 - плато) * (1 + a)^-спад
+RETENTION_FLOOR = 0.10
+RETENTION_DECAY = 1.5
+# Активность удержанных пользователей: плато + (1 - плато) * exp(-a / месяцев)
+ACTIVITY_FLOOR = 0.5
+ACTIVITY_MONTHS = 6.0
+
+# Прогоны модели: массивы длины periods (curve - по возрасту когорты)
+CohortRun = namedtuple("CohortRun", "signups retention activity active engaged")
+# Строки для листов: кортежи по периодам и значения для текущего месяца CONTROL!B7
+Cohorts = namedtuple("Cohorts", "signups users activity month_users month_activity")
+
+
+def retention_curve(ages, floor=RETENTION_FLOOR, decay=RETENTION_DECAY):
+    return floor + (1 - floor) * (1 + ages) ** -decay
+
+
+def activity_curve(ages, floor=ACTIVITY_FLOOR, months=ACTIVITY_MONTHS):
+    return floor + (1 - floor) * np.exp(-ages / months)
+
+
+def _ages(periods, daily):
+    """Возраст когорты в месяцах для каждого периода."""
+    ages = np.arange(periods, dtype=float)
+    return ages * 12 / DAYS_PER_YEAR if daily else ages
+
+
+def _curve(curve, ages, default):
+    """Кривая по возрастам: None - по умолчанию, функция возраста или массив значений."""
+    if curve is None:
+        curve = default
+    if callable(curve):
+        return np.asarray(curve(ages), float)
+    values = np.asarray(curve, float)
+    if values.ndim != 1 or values.size == 0:
+        raise ValueError("кривая - одномерный массив значений по возрастам")
+    # короткая кривая продолжается последним значением
+    return np.concatenate([values, np.full(max(0, ages.size - values.size), values[-1])])[:ages.size]
+
+
+def _controls(inputs):
+    values = evaluate(inputs)
+    return {name: values[CONTROL_INPUTS[name]] for name in ("users", "growth", "month")}
+
+
+def run(inputs=None, periods=FORECAST_MONTHS, daily=False, retention=None, activity=None):
+    """Когортная модель на periods месяцев (или дней при daily) для вводных CONTROL."""
+    controls = _controls(inputs)
+    ages = _ages(periods, daily)
+    # без оттока активные совпали бы с линией сложного процента
+    compound = controls["users"] * (1 + controls["growth"] / 100) ** ages
+    signups = np.diff(compound, prepend=0.0)
+    retention = _curve(retention, ages, retention_curve)
+    activity = _curve(activity, ages, activity_curve)
+    active = np.convolve(signups, retention)[:periods]
+    engaged = np.convolve(signups, retention * activity)[:periods]
+    return CohortRun(signups, retention, activity, active, engaged)
+
+
+def toeplitz(curve):
+    """
+    Матрица (когорта x период) со значениями curve[t - c] при t >= c и 0
+    иначе - view одной строки, без копирования.
+    """
+    curve = np.ascontiguousarray(curve, np.float32)
+    n = curve.size
+    padded = np.concatenate([np.zeros(n - 1, np.float32), curve])
+    step = padded.strides[0]
+    return as_strided(padded[n - 1:], shape=(n, n), strides=(-step, step), writeable=False)
+
+
+def cohort_matrix(result, engaged=False):
+    """Пользователи по когортам и периодам (float32); engaged - с учетом активности."""
+    curve = result.retention * result.activity if engaged else result.retention
+    return result.signups.astype(np.float32)[:, None] * toeplitz(curve)
+
+
+def ai_per_user(inputs=None, daily=False, catalog=None):
+    """AI-расходы на одного вовлеченного пользователя за период (как в Forecast)."""
+    catalog = load_catalog() if catalog is None else catalog
+    values = evaluate(inputs, catalog=catalog)
+    per_month = (values[CONTROL_INPUTS["tryons_per_user"]] * values[catalog.cell(TRYON)]
+                 + values[CONTROL_INPUTS["videos_per_user"]] * values[catalog.cell(VIDEO)]
+                 + values[CONTROL_INPUTS["llm_per_user"]] * values[catalog.cell(LLM)] * 2)
+    return per_month * 12 / DAYS_PER_YEAR if daily else per_month
+
+
+def cohort_costs(result, inputs=None, daily=False, catalog=None):
+    """AI-расходы по когортам и периодам (float32)."""
+    return cohort_matrix(result, engaged=True) * np.float32(ai_per_user(inputs, daily, catalog))
+
+
+def _activity(result):
+    return np.divide(result.engaged, result.active, out=np.ones_like(result.active),
+                     where=result.active > 0)
+
+
+def cohort_forecast(inputs=None, horizon=FORECAST_MONTHS, daily=False, retention=None,
+                    activity=None):
+    """
+    Строки когортной модели для forecast_rows()/evaluate(): новые и
+    активные пользователи и средняя активность по периодам прогноза,
+    активные пользователи и активность в месяце CONTROL!B7.
+    """
+    result = run(inputs, horizon, daily, retention, activity)
+    month = max(1, int(_controls(inputs)["month"]))
+    monthly = result if not daily and month <= horizon else run(inputs, month, False, retention,
+                                                                activity)
+    month_activity = _activity(monthly)[month - 1]
+    return Cohorts(tuple(result.signups.tolist()), tuple(result.active.tolist()),
+                   tuple(_activity(result).tolist()), float(monthly.active[month - 1]),
+                   float(month_activity))
+
+
+def compare(inputs=None, horizon=FORECAST_MONTHS, daily=False, catalog=None, cohorts=None):
+    """Итоги прогноза: сложный процент против когортной модели."""
+    cohorts = cohorts or cohort_forecast(inputs, horizon, daily)
+    sheet = forecast_sheet(horizon, daily)
+    cols = [column_letter(c) for c in range(2, horizon + 2)]
+    result = {}
+    for name, model in (("compound", None), ("cohorts", cohorts)):
+        values = evaluate(inputs, horizon, daily, catalog, model)
+        result[name] = {
+            "users_last": values[f"{sheet}!{cols[-1]}4"],
+            "ai_total": sum(values[f"{sheet}!{c}8"] for c in cols),
+            "cumulative": values[f"{sheet}!{cols[-1]}13"],
+        }
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Когортная модель пользователей с оттоком")
+    parser.add_argument("inputs", nargs="*", metavar="name=value",
+                        help="вводные CONTROL, например users=8000 growth=20")
+    parser.add_argument("--horizon", type=horizon_arg, default=FORECAST_MONTHS)
+    parser.add_argument("--daily", action="store_true")
+    parser.add_argument("--catalog", help="каталог цен (по умолчанию pricing.json)")
+    parser.add_argument("--xlsx", help="собрать книгу с когортным прогнозом")
+    args = parser.parse_args()
+
+    inputs = parse_inputs(args.inputs, parser)
+    catalog = load_catalog(args.catalog)
+
+    started = time.perf_counter()
+    result = run(inputs, args.horizon, args.daily)
+    costs = cohort_costs(result, inputs, args.daily, catalog)
+    elapsed = time.perf_counter() - started
+    cohorts = cohort_forecast(inputs, args.horizon, args.daily)
+    report = {
+        "periods": args.horizon, "daily": args.daily,
+        "matrix": {"shape": list(costs.shape), "mb": round(costs.nbytes / 2**20, 1)},
+        "signups_total": float(result.signups.sum()),
+        "active_last": float(result.active[-1]),
+        "activity_last": cohorts.activity[-1],
+        "ai_by_cohort_top": [round(float(x), 2) for x in costs.sum(axis=1)[:12]],
+        "forecast": compare(inputs, args.horizon, args.daily, catalog, cohorts),
+        "seconds": round(elapsed, 3),
+    }
+    if args.xlsx:
+        from create_calculator import save_workbook
+        save_workbook(args.xlsx, inputs=inputs, horizon=args.horizon, daily=args.daily,
+                      catalog=catalog, cohorts=cohorts)
+        report["xlsx"] = args.xlsx
+    print(json.dumps(report, ensure_ascii=False, indent=2))
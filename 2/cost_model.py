@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""
+Модель расходов калькулятора (Fashion Try-On) без Excel.
+
+Здесь лежат таблицы листов CONTROL, TOTAL и Forecast_6M; таблицы листов
+цен (AI_Generation, Infrastructure, Traffic, Token_Calculator) собираются
+из каталога pricing.json. create_calculator.py записывает их в xlsx, а
+evaluate() вычисляет те же формулы в Python и возвращает значения всех
+ячеек в виде словаря {'Лист!A1': значение}.
+
+    from cost_model import evaluate
+    values = evaluate({"users": 8000, "growth": 20})
+    values["TOTAL!B10"]
+"""
+
+import argparse
+import json
+from functools import lru_cache
+
+from formula import FormulaModel, LiveModel, cell_key, column_letter, split_key
+from pricing import TABLE_ROW, TOKEN_SHEET, load_catalog
+
+# Первые строки таблиц на листах (TABLE_ROW - листы цен и прогноз)
+CONTROL_ROW = 4
+CALC_ROW = 22
+TOTAL_ROW = 6
+UNIT_ROW = 13
+
+# ==================== CONTROL ====================
+# Вводные данные
+CONTROL_DATA = [
+    # row 4-17
+    ("ПОЛЬЗОВАТЕЛИ", "", "", ""),
+    ("Пользователи (месяц 1)", 5000, "чел", "MVP старт"),
+    ("Рост пользователей", 15, "%", "Ежемесячный прирост"),
+    ("Текущий месяц расчета", 1, "мес", "Меняй для прогноза (1-12)"),
+    ("", "", "", ""),
+    ("ИСПОЛЬЗОВАНИЕ НА ПОЛЬЗОВАТЕЛЯ", "", "", ""),
+    ("Примерок на пользователя", 3, "шт", "Pixelcut Try-On"),
+    ("Анимаций (видео) на пользователя", 1, "шт", "Video generation"),
+    ("LLM запросов на пользователя", 5, "шт", "Чат/рекомендации"),
+    ("", "", "", ""),
+    ("РАЗМЕРЫ ФАЙЛОВ", "", "", ""),
+    ("Средний размер фото", 3, "MB", "Входное изображение"),
+    ("Средний размер видео", 15, "MB", "Сгенерированное видео"),
+    ("", "", "", ""),
+    ("МАСШТАБИРОВАНИЕ", "", "", ""),
+    ("Пользователей на 1 сервер", 10000, "чел", "Порог для автоскейла"),
+]
+
+# Расчетные поля
+CALC_DATA = [
+    ("Пользователи (текущий месяц)", "=IF(B7=1,B5,ROUND(B5*(1+B6/100)^(B7-1),0))", "чел", "С учетом роста"),
+    ("Всего примерок", "=B22*B10", "шт", "В месяц"),
+    ("Всего видео", "=B22*B11", "шт", "В месяц"),
+    ("Всего LLM запросов", "=B22*B12", "шт", "В месяц"),
+    ("Хранилище фото (GB)", "=B23*B15/1024", "GB", "В месяц"),
+    ("Хранилище видео (GB)", "=B24*B16/1024", "GB", "В месяц"),
+    ("Требуется серверов", "=CEILING(B22/B19,1)", "шт", "Автоскейл"),
+]
+
+
+def calc_data(cohorts=None):
+    """
+    Расчетные поля CONTROL. С когортной моделью (cohorts.py) пользователи
+    текущего месяца - активные пользователи когорт, а объемы умножаются
+    на их среднюю активность.
+    """
+    if cohorts is None:
+        return CALC_DATA
+    activity = f"*{cohorts.month_activity:.6g}"
+    rows = list(CALC_DATA)
+    rows[0] = ("Пользователи (текущий месяц)", round(cohorts.month_users), "чел", "Активные (когорты)")
+    rows[1] = ("Всего примерок", "=B22*B10" + activity, "шт", "В месяц, с учетом активности")
+    rows[2] = ("Всего видео", "=B22*B11" + activity, "шт", "В месяц, с учетом активности")
+    rows[3] = ("Всего LLM запросов", "=B22*B12" + activity, "шт", "В месяц, с учетом активности")
+    return rows
+
+# ==================== Листы цен ====================
+PRICE_SHEETS = ["AI_Generation", "Infrastructure", "Traffic", TOKEN_SHEET]
+
+# Позиции каталога, на которые ссылаются TOTAL и прогноз
+TRYON = "pixelcut/try-on/tryon"
+VIDEO = "minimax/video-animation/video"
+LLM = "openai/gpt-4o/llm"
+BACKGROUND_REMOVAL = "generic/background-removal/background_removal"
+UPSCALE = "generic/image-upscale/upscale"
+BACKEND = "digitalocean/backend-vps/server"
+WORKER = "digitalocean/worker-server/ai_queue"
+# Считаются в прогнозе отдельно от фиксированных позиций (CEILING от пользователей)
+SERVER_ITEMS = (BACKEND, WORKER)
+
+
+def _catalog(catalog):
+    return load_catalog() if catalog is None else catalog
+
+
+# ==================== TOTAL ====================
+def total_data(catalog=None):
+    catalog = _catalog(catalog)
+    return [
+        ("AI и Генерация", f"={catalog.total_cell('AI_Generation')}", "=B6/$B$10*100", "Pixelcut, Video, LLM"),
+        ("Инфраструктура", f"={catalog.total_cell('Infrastructure')}", "=B7/$B$10*100", "Серверы, БД, Хранилище"),
+        ("Трафик и Коммуникации", f"={catalog.total_cell('Traffic')}", "=B8/$B$10*100", "Push, Email, SMS"),
+    ]
+
+
+# Unit Economics
+def unit_data(catalog=None):
+    catalog = _catalog(catalog)
+    tryon, video = catalog.cell(TRYON, "D"), catalog.cell(VIDEO, "D")
+    look = "+".join(catalog.cell(key, "D") for key in (TRYON, BACKGROUND_REMOVAL, UPSCALE))
+    return [
+        ("Стоимость 1 пользователя", "=B10/CONTROL!B22", "$", "Средняя за месяц"),
+        ("Стоимость 1 примерки", f"={tryon}/CONTROL!B23", "$", "Только Pixelcut"),
+        ("Стоимость 1 видео", f"={video}/CONTROL!B24", "$", "Только генерация"),
+        ("Себестоимость образа (полная)", f"=({look})/CONTROL!B23", "$", "Try-on + обработка"),
+    ]
+
+# ==================== Forecast_6M ====================
+FORECAST_MONTHS = 6
+DAYS_PER_YEAR = 365
+# Колонок листа Excel 16384: подпись в A и рост за период в последней
+MAX_HORIZON = 16382
+
+FORECAST_SECTIONS = ["ЗАТРАТЫ ($)", "UNIT ECONOMICS", "КОГОРТЫ"]
+# Строка "Активность" когортного прогноза (после 14 строк прогноза, пустой,
+# заголовка КОГОРТЫ и новых пользователей)
+ACTIVITY_ROW = TABLE_ROW + 17
+FORECAST_TOTALS = ["ИТОГО МЕСЯЦ", "ИТОГО ДЕНЬ", "Накопительно"]
+
+
+def check_horizon(horizon):
+    """horizon как целое число периодов; вне 1..MAX_HORIZON - ValueError."""
+    if isinstance(horizon, bool) or int(horizon) != horizon or not 1 <= horizon <= MAX_HORIZON:
+        raise ValueError(f"горизонт прогноза должен быть целым от 1 до {MAX_HORIZON}, "
+                         f"а не {horizon!r}")
+    return int(horizon)
+
+
+def horizon_arg(value):
+    """Тип аргумента --horizon для argparse: ошибка уходит в parser.error()."""
+    try:
+        horizon = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"{value!r} - не целое число") from None
+    try:
+        return check_horizon(horizon)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(str(exc)) from None
+
+
+def forecast_sheet(horizon=FORECAST_MONTHS, daily=False):
+    """Имя листа прогноза: Forecast_6M, Forecast_36M, Forecast_365D."""
+    check_horizon(horizon)
+    return f"Forecast_{horizon}{'D' if daily else 'M'}"
+
+
+def _fixed_costs(catalog, sheet):
+    """SUM итогов позиций с постоянным количеством: SUM(Лист!$D$9:$D$10,...)."""
+    runs = []
+    for item in catalog.fixed_items(sheet, exclude=SERVER_ITEMS):
+        if runs and runs[-1][1] == item.row - 1:
+            runs[-1][1] = item.row
+        else:
+            runs.append([item.row, item.row])
+    if not runs:
+        return "0"
+    col = "$D$"
+    ranges = [f"{sheet}!{col}{a}" + (f":{col}{b}" if b != a else "") for a, b in runs]
+    return f"SUM({','.join(ranges)})"
+
+
+def forecast_rows(horizon=FORECAST_MONTHS, daily=False, catalog=None, cohorts=None):
+    """
+    Строки листа прогноза на horizon периодов (месяцев или дней).
+    При daily рост CONTROL!B6 и месячные объемы пересчитываются на день.
+    Цены - ссылки на ячейки листов цен (позиции каталога); число серверов
+    растет с пользователями, если в каталоге у сервера не задано
+    постоянное количество.
+
+    cohorts (cohorts.cohort_forecast()) заменяет сложный процент
+    когортной моделью: пользователи - числа из модели, а использование
+    умножается на строку "Активность" в секции КОГОРТЫ.
+    """
+    catalog = _catalog(catalog)
+    horizon = check_horizon(horizon)
+    cols = [column_letter(c) for c in range(2, horizon + 2)]
+    first, last = cols[0], cols[-1]
+    k = f"*12/{DAYS_PER_YEAR}" if daily else ""
+    step = f"^(12/{DAYS_PER_YEAR})" if daily else ""
+
+    def per_period(expr):
+        return f"({expr}){k}" if k else expr
+
+    def row(label, template, growth=True, first_template=None):
+        cells = [f"={(first_template or template).format(c=cols[0], p='')}"]
+        cells += [f"={template.format(c=c, p=p)}" for p, c in zip(cols, cols[1:])]
+        return (label, *cells, f"={last}{{r}}/{first}{{r}}-1" if growth else "")
+
+    def blank(label=""):
+        return (label,) + ("",) * (horizon + 1)
+
+    def series(label, values, digits):
+        values = [round(float(v), digits) for v in values[:horizon]]
+        if len(values) < horizon:
+            raise ValueError(f"когортная модель короче горизонта ({len(values)} < {horizon})")
+        return (label, *values, f"={last}{{r}}/{first}{{r}}-1")
+
+    def price(key):
+        return catalog.cell(key, absolute=True)
+
+    def quantity(key, formula):
+        # постоянное количество (например, подобранное queue_sim.py) - ячейка листа цен
+        if isinstance(catalog[key].spec.get("quantity"), (int, float)):
+            return catalog.cell(key, "C", absolute=True)
+        return formula
+
+    servers = "CEILING({c}4/CONTROL!$B$19,1)"
+    backends = quantity(BACKEND, servers)
+    workers = quantity(WORKER, f"CEILING({servers}/2,1)")
+    traffic = "+".join(f"{{c}}4*{item.spec['per_user']:g}*{catalog.cell(item.key, absolute=True)}"
+                       for item in catalog.per_user_items("Traffic")) or "0"
+    if cohorts is None:
+        users = row("Пользователи", "{p}4*(1+CONTROL!$B$6/100)" + step, first_template="CONTROL!B5")
+        active = ""
+    else:
+        users = series("Пользователи", cohorts.users, 1)
+        active = f"*{{c}}{ACTIVITY_ROW}"
+    rows = [
+        users,
+        row("Примерок (всего)", "{c}4*CONTROL!$B$10" + active + k),
+        blank(),
+        blank("ЗАТРАТЫ ($)"),
+        row("AI и Генерация",
+            f"{{c}}5*{price(TRYON)} + {{c}}4*CONTROL!$B$11{active}*{price(VIDEO)}" + k
+            + f" + {{c}}4*CONTROL!$B$12{active}*{price(LLM)}*2" + k),
+        row("Инфраструктура", per_period(
+            f"{price(BACKEND)}*{backends}+{price(WORKER)}*{workers}"
+            f"+{_fixed_costs(catalog, 'Infrastructure')}")),
+        row("Трафик", per_period(traffic)),
+        blank(),
+        row("ИТОГО ДЕНЬ" if daily else "ИТОГО МЕСЯЦ", "{c}8+{c}9+{c}10"),
+        row("Накопительно", "{p}13+{c}12", growth=False, first_template="{c}12"),
+        blank(),
+        blank("UNIT ECONOMICS"),
+        row("$/пользователь", "{c}12/{c}4"),
+        row("$/примерка", "{c}8/{c}5"),
+    ]
+    if cohorts is not None:
+        rows += [
+            blank(),
+            blank("КОГОРТЫ"),
+            series("Новые пользователи", cohorts.signups, 1),
+            series("Активность", cohorts.activity, 4),
+        ]
+    # номер строки в формуле роста известен только после раскладки
+    return [r[:-1] + (r[-1].format(r=i),) for i, r in enumerate(rows, TABLE_ROW)]
+
+
+# Итоговые ячейки, которые create_calculator.py пишет отдельно от таблиц
+SUMMARY_CELLS = {
+    "TOTAL!B3": "=CONTROL!B7",
+    "TOTAL!D3": "=CONTROL!B22",
+    "TOTAL!B10": "=SUM(B6:B8)",
+    "TOTAL!C10": "100%",
+}
+
+
+def summary_cells(catalog=None):
+    """SUMMARY_CELLS и строки ИТОГО листов цен (их место зависит от каталога)."""
+    catalog = _catalog(catalog)
+    cells = {catalog.total_cell(sheet): catalog.total_formula(sheet) for sheet in PRICE_SHEETS}
+    cells.update(SUMMARY_CELLS)
+    return cells
+
+# Вводные CONTROL по именам
+CONTROL_INPUTS = {
+    "users": "CONTROL!B5",
+    "growth": "CONTROL!B6",
+    "month": "CONTROL!B7",
+    "tryons_per_user": "CONTROL!B10",
+    "videos_per_user": "CONTROL!B11",
+    "llm_per_user": "CONTROL!B12",
+    "photo_mb": "CONTROL!B15",
+    "video_mb": "CONTROL!B16",
+    "users_per_server": "CONTROL!B19",
+}
+
+# Ключевые результаты по именам
+OUTPUTS = {
+    "users_current": "CONTROL!B22",
+    "servers": "CONTROL!B28",
+    "ai": "TOTAL!B6",
+    "infrastructure": "TOTAL!B7",
+    "traffic": "TOTAL!B8",
+    "total": "TOTAL!B10",
+    "cost_per_user": "TOTAL!B13",
+    "cost_per_tryon": "TOTAL!B14",
+    "cost_per_video": "TOTAL!B15",
+    "full_look_cost": "TOTAL!B16",
+}
+
+
+def outputs(catalog=None):
+    """OUTPUTS и итог Token_Calculator (его строка зависит от каталога)."""
+    return {**OUTPUTS, "llm_tokens_total": _catalog(catalog).total_cell(TOKEN_SHEET)}
+
+
+def _place(cells, sheet, first_row, table, first_col=1):
+    for row, values in enumerate(table, first_row):
+        for col, value in enumerate(values, first_col):
+            cells[cell_key(sheet, row, col)] = value
+
+
+def sheet_cells(horizon=FORECAST_MONTHS, daily=False, catalog=None, cohorts=None):
+    """Все ячейки модели в раскладке create_calculator.py."""
+    catalog = _catalog(catalog)
+    cells = {}
+    _place(cells, "CONTROL", CONTROL_ROW, CONTROL_DATA)
+    _place(cells, "CONTROL", CALC_ROW, calc_data(cohorts))
+    for sheet in PRICE_SHEETS:
+        _place(cells, sheet, TABLE_ROW, catalog.table(sheet))
+    _place(cells, "TOTAL", TOTAL_ROW, total_data(catalog))
+    _place(cells, "TOTAL", UNIT_ROW, unit_data(catalog))
+    _place(cells, forecast_sheet(horizon, daily), TABLE_ROW,
+           forecast_rows(horizon, daily, catalog, cohorts))
+    cells.update(summary_cells(catalog))
+    return cells
+
+
+def compiled_model(horizon=FORECAST_MONTHS, daily=False, catalog=None, cohorts=None):
+    """Скомпилированная модель (строится один раз на горизонт, версию каталога и когорты)."""
+    return _compiled_model(horizon, daily, _catalog(catalog), cohorts)
+
+
+@lru_cache(maxsize=32)
+def _compiled_model(horizon, daily, catalog, cohorts):
+    return FormulaModel(sheet_cells(horizon, daily, catalog, cohorts))
+
+
+def resolve_inputs(inputs):
+    """{'users': 8000, 'CONTROL!B6': 20} -> {'CONTROL!B5': 8000, 'CONTROL!B6': 20}"""
+    resolved = {}
+    for name, value in (inputs or {}).items():
+        key = CONTROL_INPUTS.get(name, name)
+        if "!" not in key:
+            raise KeyError(f"неизвестный параметр {name!r}")
+        resolved[key] = value
+    return resolved
+
+
+def control_data(inputs=None):
+    """Строки CONTROL_DATA с подставленными вводными (только ячейки CONTROL_INPUTS)."""
+    rows = [list(row) for row in CONTROL_DATA]
+    allowed = set(CONTROL_INPUTS.values())
+    for key, value in resolve_inputs(inputs).items():
+        if key not in allowed:
+            raise KeyError(f"{key} - не вводная ячейка CONTROL")
+        _, row, col = split_key(key)
+        rows[row - CONTROL_ROW][col - 1] = value
+    return [tuple(row) for row in rows]
+
+
+def evaluate(inputs=None, horizon=FORECAST_MONTHS, daily=False, catalog=None, cohorts=None):
+    """
+    Значения всех ячеек модели для заданных вводных CONTROL. cohorts
+    должны быть посчитаны для тех же вводных (cohorts.cohort_forecast()).
+    """
+    return compiled_model(horizon, daily, catalog, cohorts).evaluate(resolve_inputs(inputs))
+
+
+def live_model(inputs=None, horizon=FORECAST_MONTHS, daily=False, catalog=None):
+    """
+    Модель для интерактивного пересчета (слайдеры UI):
+
+        live = live_model()
+        changed = live.update({"users": 6000})   # только изменившиеся ячейки
+        summary(changed)                         # None - результат не изменился
+    """
+    return LiveModel(compiled_model(horizon, daily, catalog), inputs, aliases=CONTROL_INPUTS)
+
+
+def summary(values, catalog=None):
+    """Ключевые результаты из словаря evaluate()."""
+    return {name: values.get(key) for name, key in outputs(catalog).items()}
+
+
+def parse_inputs(args, parser):
+    """
+    Вводные из аргументов командной строки: ['users=8000', 'growth=20'] ->
+    {'users': 8000.0, 'growth': 20.0}. Допустимы только имена вводных
+    CONTROL_INPUTS: ключи ячеек (TOTAL!B4=0) переопределили бы формулы.
+    Ошибка - parser.error() (argparse).
+    """
+    inputs = {}
+    for arg in args:
+        name, sep, value = arg.partition("=")
+        if not sep or not name:
+            parser.error(f"{arg!r}: ожидается name=value, например users=8000")
+        try:
+            inputs[name] = float(value)
+        except ValueError:
+            parser.error(f"{arg!r}: {value!r} - не число")
+        if name not in CONTROL_INPUTS:
+            parser.error(f"неизвестная вводная {name!r}; допустимы {', '.join(CONTROL_INPUTS)}")
+    return inputs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ключевые результаты модели")
+    parser.add_argument("inputs", nargs="*", metavar="name=value",
+                        help="вводные CONTROL, например users=8000 growth=20")
+    inputs = parse_inputs(parser.parse_args().inputs, parser)
+    print(json.dumps(summary(evaluate(inputs)), ensure_ascii=False, indent=2))
@@ -1,544 +1,473 @@
 #!/usr/bin/env python3
 """
 Калькулятор расходов на AI-проект (Fashion Try-On)
-Создает Excel файл с 6 листами и формулами
+Создает Excel файл с 7 листами и формулами
+
+    python create_calculator.py                      # прогноз на 6 месяцев
+    python create_calculator.py --horizon 60         # на 60 месяцев
+    python create_calculator.py --horizon 365 --daily
+    python create_calculator.py users=8000 growth=20 -o calc.xlsx
+    python create_calculator.py --values             # формулы + вычисленные значения
+    python create_calculator.py --horizon 60 --cohorts   # когортная модель с оттоком
+    python create_calculator.py --profile            # замеры этапов сборки (JSON)
+
+Большие горизонты пишутся в потоковом (write-only) режиме openpyxl:
+строки прогноза уходят в файл сразу, память не растет с горизонтом.
+
+С --values (cached_values=True) у каждой формулы сохраняется значение,
+посчитанное cost_model, - pandas, openpyxl data_only=True и просмотрщики
+видят числа без пересчета книги в Excel/LibreOffice.
+
+Как библиотека (openpyxl импортируется только при сборке книги):
+
+    from create_calculator import build_workbook, save_workbook, workbook_bytes
+    save_workbook("calc.xlsx", inputs={"users": 8000})
+    data = workbook_bytes(horizon=36)
+    book = build_workbook()            # Calculator: book.wb, book.save(...)
 """
 
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from openpyxl.utils import get_column_letter
-from openpyxl.formatting.rule import FormulaRule
-
-# Создаем книгу
-wb = Workbook()
-
-# Цвета
-HEADER_FILL = PatternFill(start_color="1F4E79", end_color="1F4E79", fill_type="solid")
-HEADER_FONT = Font(color="FFFFFF", bold=True, size=11)
-SECTION_FILL = PatternFill(start_color="D6DCE5", end_color="D6DCE5", fill_type="solid")
-TOTAL_FILL = PatternFill(start_color="E2EFDA", end_color="E2EFDA", fill_type="solid")
-INPUT_FILL = PatternFill(start_color="FFF2CC", end_color="FFF2CC", fill_type="solid")
-BORDER = Border(
-    left=Side(style='thin'),
-    right=Side(style='thin'),
-    top=Side(style='thin'),
-    bottom=Side(style='thin')
+import argparse
+import io
+
+from cost_model import (
+    FORECAST_MONTHS, FORECAST_SECTIONS, FORECAST_TOTALS,
+    CONTROL_ROW, CALC_ROW, TABLE_ROW, TOTAL_ROW, UNIT_ROW,
+    calc_data, control_data, evaluate, forecast_rows, forecast_sheet, horizon_arg, parse_inputs,
+    total_data, unit_data,
 )
+from formula import column_letter, is_formula, split_key
+from pricing import TOKEN_SHEET, load_catalog
+from styles import register_styles, style_range, write_row
+
+# Прогноз крупнее этого числа ячеек пишется потоково
+STREAMING_CELLS = 2000
+
+OUTPUT_PATH = '/workspace/project_cost_calculator.xlsx'
 
-def style_header(ws, row, cols):
-    for col in range(1, cols + 1):
-        cell = ws.cell(row=row, column=col)
-        cell.fill = HEADER_FILL
-        cell.font = HEADER_FONT
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-        cell.border = BORDER
-
-def style_cell(ws, row, col, fill=None):
-    cell = ws.cell(row=row, column=col)
-    cell.border = BORDER
-    if fill:
-        cell.fill = fill
-    return cell
 
 def set_column_widths(ws, widths):
     for i, width in enumerate(widths, 1):
-        ws.column_dimensions[get_column_letter(i)].width = width
+        ws.column_dimensions[column_letter(i)].width = width
+
+def add_title(ws, text, cell_range, style="calc_title"):
+    ws['A1'] = text
+    ws.merge_cells(cell_range)
+    ws['A1'].style = style
+
+def add_headers(ws, row, headers):
+    write_row(ws, row, headers)
+    style_range(ws, f"A{row}:{column_letter(len(headers))}{row}", "calc_header")
+
+def add_total_row(ws, catalog, sheet, label, cols):
+    """Строка ИТОГО листа цен: подпись и сумма выделены, остальные ячейки - только рамка."""
+    _, row, col = split_key(catalog.total_cell(sheet))
+    values = [label] + [None] * (cols - 1)
+    values[col - 1] = catalog.total_formula(sheet)
+    styles = ["calc_cell"] * cols
+    styles[0] = styles[col - 1] = "calc_total_bold"
+    write_row(ws, row, values, styles)
+
+
+class BufferedSheet:
+    """
+    Лист write-only книги с интерфейсом обычного листа: cell(), ws['A1'],
+    merge_cells(), column_dimensions. Ячейки копятся в памяти и пишутся
+    построчно в flush() - подходит для небольших листов.
+    """
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.title = ws.title
+        self.column_dimensions = ws.column_dimensions
+        self._cells = {}
+
+    def cell(self, row, column, value=None):
+        from openpyxl.cell import WriteOnlyCell
+
+        cell = self._cells.get((row, column))
+        if cell is None:
+            cell = self._cells[(row, column)] = WriteOnlyCell(self.ws)
+        if value is not None:
+            cell.value = value
+        return cell
+
+    def __getitem__(self, coordinate):
+        _, row, col = split_key(f"{self.title}!{coordinate}")
+        return self.cell(row, col)
+
+    def __setitem__(self, coordinate, value):
+        self[coordinate].value = value
+
+    def merge_cells(self, range_string):
+        self.ws.merged_cells.add(range_string)
+
+    def flush(self):
+        rows = {}
+        for (row, col), cell in self._cells.items():
+            rows.setdefault(row, {})[col] = cell
+        for row in range(1, max(rows, default=0) + 1):
+            cells = rows.get(row, {})
+            self.ws.append([cells.get(col) for col in range(1, max(cells, default=0) + 1)])
+
+
+def streaming_mode(forecast, write_only=None):
+    """Потоковая ли запись: write_only=None - если прогноз больше STREAMING_CELLS ячеек."""
+    if write_only is None:
+        return len(forecast) * len(forecast[0]) > STREAMING_CELLS
+    return write_only
+
+
+class Calculator:
+    """
+    Книга калькулятора в процессе сборки: openpyxl Workbook, каталог цен,
+    вводные CONTROL и горизонт прогноза. write_only=None - потоковый
+    режим включается сам, если прогноз больше STREAMING_CELLS ячеек.
+    cached_values - сохранять при записи значения формул. cohorts -
+    когортная модель (cohorts.cohort_forecast()) вместо сложного процента.
+    profiler (profiling.BuildProfiler) - замеры построителей листов и записи.
+    """
+
+    def __init__(self, inputs=None, horizon=FORECAST_MONTHS, daily=False,
+                 write_only=None, catalog=None, cached_values=False, cohorts=None,
+                 profiler=None):
+        from openpyxl import Workbook
+
+        self.inputs = inputs or {}
+        self.horizon = horizon
+        self.daily = daily
+        self.cached_values = cached_values
+        self.catalog = load_catalog() if catalog is None else catalog
+        self.cohorts = cohorts
+        self.profiler = profiler
+        self.forecast = forecast_rows(horizon, daily, self.catalog, cohorts)
+        write_only = streaming_mode(self.forecast, write_only)
+        self.streaming = write_only
+        self.wb = Workbook(write_only=write_only)
+        if not write_only:
+            self.wb.remove(self.wb.active)
+        register_styles(self.wb)
+        self._buffered = []
+
+    def new_sheet(self, title):
+        ws = self.wb.create_sheet(title)
+        if self.streaming:
+            ws = BufferedSheet(ws)
+            self._buffered.append(ws)
+        return ws
+
+    def stage(self, name, func, *args):
+        """func(*args) как этап сборки (с замером, если задан profiler)."""
+        if self.profiler is None:
+            return func(*args)
+        return self.profiler.call(name, func, *args)
+
+    def _write(self, target):
+        for ws in self._buffered:
+            ws.flush()
+        self._buffered = []
+        self.wb.save(target)
+
+    def save(self, target):
+        """Сохраняет книгу в файл (путь или объект с write()). Write-only книгу - один раз."""
+        if not self.cached_values:
+            self.stage("save", self._write, target)
+            return
+        from xlsx_patch import write_cached_values  # zip/XML нужны только для значений
+
+        buffer = io.BytesIO()
+        self.stage("save", self._write, buffer)
+        buffer.seek(0)
+        self.stage("cached_values", lambda: write_cached_values(buffer, target, self.values()))
+
+    def values(self):
+        """Значения всех ячеек модели для вводных и каталога книги."""
+        return evaluate(self.inputs, self.horizon, self.daily, self.catalog, self.cohorts)
+
+    def to_bytes(self):
+        buffer = io.BytesIO()
+        self.save(buffer)
+        return buffer.getvalue()
+
+
+def write_price_table(ws, catalog, sheet):
+    """Таблица листа цен из каталога: секции и позиции."""
+    sections = catalog.sections[sheet]
+    for i, row_data in enumerate(catalog.table(sheet), TABLE_ROW):
+        write_row(ws, i, row_data, "calc_section" if row_data[0] in sections else "calc_cell")
+
 
 # ==================== ЛИСТ 1: CONTROL ====================
-ws_control = wb.active
-ws_control.title = "CONTROL"
-
-ws_control['A1'] = "ПАНЕЛЬ УПРАВЛЕНИЯ - ВВОДНЫЕ ДАННЫЕ"
-ws_control.merge_cells('A1:D1')
-ws_control['A1'].font = Font(bold=True, size=14)
-ws_control['A1'].fill = HEADER_FILL
-ws_control['A1'].font = Font(color="FFFFFF", bold=True, size=14)
-
-headers = ["Параметр", "Значение", "Единица", "Комментарий"]
-for col, header in enumerate(headers, 1):
-    ws_control.cell(row=3, column=col, value=header)
-style_header(ws_control, 3, 4)
-
-# Данные CONTROL
-control_data = [
-    # row 4-17
-    ("ПОЛЬЗОВАТЕЛИ", "", "", ""),
-    ("Пользователи (месяц 1)", 5000, "чел", "MVP старт"),
-    ("Рост пользователей", 15, "%", "Ежемесячный прирост"),
-    ("Текущий месяц расчета", 1, "мес", "Меняй для прогноза (1-12)"),
-    ("", "", "", ""),
-    ("ИСПОЛЬЗОВАНИЕ НА ПОЛЬЗОВАТЕЛЯ", "", "", ""),
-    ("Примерок на пользователя", 3, "шт", "Pixelcut Try-On"),
-    ("Анимаций (видео) на пользователя", 1, "шт", "Video generation"),
-    ("LLM запросов на пользователя", 5, "шт", "Чат/рекомендации"),
-    ("", "", "", ""),
-    ("РАЗМЕРЫ ФАЙЛОВ", "", "", ""),
-    ("Средний размер фото", 3, "MB", "Входное изображение"),
-    ("Средний размер видео", 15, "MB", "Сгенерированное видео"),
-    ("", "", "", ""),
-    ("МАСШТАБИРОВАНИЕ", "", "", ""),
-    ("Пользователей на 1 сервер", 10000, "чел", "Порог для автоскейла"),
-]
+CONTROL_SECTIONS = ["ПОЛЬЗОВАТЕЛИ", "ИСПОЛЬЗОВАНИЕ НА ПОЛЬЗОВАТЕЛЯ", "РАЗМЕРЫ ФАЙЛОВ", "МАСШТАБИРОВАНИЕ"]
 
-for i, (param, value, unit, comment) in enumerate(control_data, 4):
-    ws_control.cell(row=i, column=1, value=param)
-    cell_val = ws_control.cell(row=i, column=2, value=value)
-    ws_control.cell(row=i, column=3, value=unit)
-    ws_control.cell(row=i, column=4, value=comment)
-
-    # Стилизация секций
-    if param in ["ПОЛЬЗОВАТЕЛИ", "ИСПОЛЬЗОВАНИЕ НА ПОЛЬЗОВАТЕЛЯ", "РАЗМЕРЫ ФАЙЛОВ", "МАСШТАБИРОВАНИЕ"]:
-        for col in range(1, 5):
-            style_cell(ws_control, i, col, SECTION_FILL)
-    elif value != "":
-        style_cell(ws_control, i, 2, INPUT_FILL)
-
-    for col in range(1, 5):
-        ws_control.cell(row=i, column=col).border = BORDER
-
-# Расчетные поля
-ws_control.cell(row=21, column=1, value="РАСЧЕТНЫЕ ЗНАЧЕНИЯ")
-ws_control.merge_cells('A21:D21')
-style_cell(ws_control, 21, 1, HEADER_FILL)
-ws_control['A21'].font = HEADER_FONT
-
-calc_data = [
-    ("Пользователи (текущий месяц)", "=IF(B7=1,B5,ROUND(B5*(1+B6/100)^(B7-1),0))", "чел", "С учетом роста"),
-    ("Всего примерок", "=B22*B10", "шт", "В месяц"),
-    ("Всего видео", "=B22*B11", "шт", "В месяц"),
-    ("Всего LLM запросов", "=B22*B12", "шт", "В месяц"),
-    ("Хранилище фото (GB)", "=B23*B15/1024", "GB", "В месяц"),
-    ("Хранилище видео (GB)", "=B24*B16/1024", "GB", "В месяц"),
-    ("Требуется серверов", "=CEILING(B22/B19,1)", "шт", "Автоскейл"),
-]
+def build_control(book):
+    ws = book.new_sheet("CONTROL")
 
-for i, (param, formula, unit, comment) in enumerate(calc_data, 22):
-    ws_control.cell(row=i, column=1, value=param)
-    ws_control.cell(row=i, column=2, value=formula)
-    ws_control.cell(row=i, column=3, value=unit)
-    ws_control.cell(row=i, column=4, value=comment)
-    style_cell(ws_control, i, 2, TOTAL_FILL)
-    for col in range(1, 5):
-        ws_control.cell(row=i, column=col).border = BORDER
+    add_title(ws, "ПАНЕЛЬ УПРАВЛЕНИЯ - ВВОДНЫЕ ДАННЫЕ", 'A1:D1')
+    add_headers(ws, 3, ["Параметр", "Значение", "Единица", "Комментарий"])
 
-set_column_widths(ws_control, [35, 20, 10, 35])
+    # Данные CONTROL (таблицы модели - в cost_model.py)
+    for i, row_data in enumerate(control_data(book.inputs), CONTROL_ROW):
+        param, value = row_data[:2]
+        # Стилизация секций и вводных ячеек
+        if param in CONTROL_SECTIONS:
+            style = "calc_section"
+        elif value != "":
+            style = ["calc_cell", "calc_input", "calc_cell", "calc_cell"]
+        else:
+            style = "calc_cell"
+        write_row(ws, i, row_data, style)
 
-# ==================== ЛИСТ 2: ИИ И ГЕНЕРАЦИЯ ====================
-ws_ai = wb.create_sheet("AI_Generation")
-
-ws_ai['A1'] = "ИИ И ГЕНЕРАЦИЯ - ЗАТРАТЫ"
-ws_ai.merge_cells('A1:E1')
-ws_ai['A1'].font = Font(bold=True, size=14, color="FFFFFF")
-ws_ai['A1'].fill = HEADER_FILL
-
-headers = ["Сервис / Операция", "Цена за 1 опер. ($)", "Количество", "Итого ($)", "Комментарий"]
-for col, header in enumerate(headers, 1):
-    ws_ai.cell(row=3, column=col, value=header)
-style_header(ws_ai, 3, 5)
-
-ai_data = [
-    ("ВИРТУАЛЬНЫЕ ПРИМЕРКИ", "", "", "", ""),
-    ("Pixelcut Try-On API", 0.10, "=CONTROL!B23", "=B5*C5", "10 кредитов = $0.10/изображение"),
-    ("", "", "", "", ""),
-    ("ВИДЕО ГЕНЕРАЦИЯ", "", "", "", ""),
-    ("Video Animation (MiniMax/Runway)", 0.50, "=CONTROL!B24", "=B9*C9", "~$0.50 за 5 сек видео"),
-    ("", "", "", "", ""),
-    ("LLM / ТЕКСТ", "", "", "", ""),
-    ("OpenAI GPT-4o (1K токенов)", 0.005, "=CONTROL!B25*2", "=B13*C13", "input+output ~2K токенов/запрос"),
-    ("OpenAI GPT-4o-mini (backup)", 0.0003, "=CONTROL!B25*0.5", "=B14*C14", "Легкие запросы"),
-    ("Embeddings (поиск)", 0.0001, "=CONTROL!B25", "=B15*C15", "Рекомендации"),
-    ("", "", "", "", ""),
-    ("ДОПОЛНИТЕЛЬНЫЕ AI", "", "", "", ""),
-    ("Background Removal", 0.02, "=CONTROL!B23*0.5", "=B19*C19", "50% примерок"),
-    ("Image Upscale", 0.01, "=CONTROL!B23*0.3", "=B20*C20", "30% примерок"),
-]
+    # Расчетные поля
+    ws.cell(row=21, column=1, value="РАСЧЕТНЫЕ ЗНАЧЕНИЯ")
+    ws.merge_cells('A21:D21')
+    ws['A21'].style = "calc_band"
 
-for i, (service, price, qty, total, comment) in enumerate(ai_data, 4):
-    ws_ai.cell(row=i, column=1, value=service)
-    ws_ai.cell(row=i, column=2, value=price)
-    ws_ai.cell(row=i, column=3, value=qty)
-    ws_ai.cell(row=i, column=4, value=total)
-    ws_ai.cell(row=i, column=5, value=comment)
+    for i, row_data in enumerate(calc_data(book.cohorts), CALC_ROW):
+        write_row(ws, i, row_data, ["calc_cell", "calc_total", "calc_cell", "calc_cell"])
 
-    if service in ["ВИРТУАЛЬНЫЕ ПРИМЕРКИ", "ВИДЕО ГЕНЕРАЦИЯ", "LLM / ТЕКСТ", "ДОПОЛНИТЕЛЬНЫЕ AI"]:
-        for col in range(1, 6):
-            style_cell(ws_ai, i, col, SECTION_FILL)
+    set_column_widths(ws, [35, 20, 10, 35])
+    return ws
 
-    for col in range(1, 6):
-        ws_ai.cell(row=i, column=col).border = BORDER
+# ==================== ЛИСТ 2: ИИ И ГЕНЕРАЦИЯ ====================
+def build_ai_generation(book):
+    ws = book.new_sheet("AI_Generation")
 
-# Итого AI
-ws_ai.cell(row=22, column=1, value="ИТОГО AI И ГЕНЕРАЦИЯ")
-ws_ai.cell(row=22, column=4, value="=SUM(D5:D21)")
-style_cell(ws_ai, 22, 1, TOTAL_FILL)
-style_cell(ws_ai, 22, 4, TOTAL_FILL)
-ws_ai['A22'].font = Font(bold=True)
-ws_ai['D22'].font = Font(bold=True)
-for col in range(1, 6):
-    ws_ai.cell(row=22, column=col).border = BORDER
+    add_title(ws, "ИИ И ГЕНЕРАЦИЯ - ЗАТРАТЫ", 'A1:E1')
+    add_headers(ws, 3, ["Сервис / Операция", "Цена за 1 опер. ($)", "Количество", "Итого ($)", "Комментарий"])
 
-set_column_widths(ws_ai, [35, 20, 15, 15, 40])
+    write_price_table(ws, book.catalog, "AI_Generation")
 
-# ==================== ЛИСТ 3: ИНФРАСТРУКТУРА ====================
-ws_infra = wb.create_sheet("Infrastructure")
-
-ws_infra['A1'] = "ИНФРАСТРУКТУРА - СЕРВЕРЫ И СЕРВИСЫ"
-ws_infra.merge_cells('A1:E1')
-ws_infra['A1'].font = Font(bold=True, size=14, color="FFFFFF")
-ws_infra['A1'].fill = HEADER_FILL
-
-headers = ["Ресурс", "Цена/мес ($)", "Количество", "Итого ($)", "Провайдер / Комментарий"]
-for col, header in enumerate(headers, 1):
-    ws_infra.cell(row=3, column=col, value=header)
-style_header(ws_infra, 3, 5)
-
-infra_data = [
-    ("СЕРВЕРЫ", "", "", "", ""),
-    ("Backend VPS (4 CPU / 8 GB)", 45, "=CONTROL!B28", "=B5*C5", "DigitalOcean / Vultr"),
-    ("Worker Server (AI Queue)", 60, "=CEILING(CONTROL!B28/2,1)", "=B6*C6", "Для обработки задач"),
-    ("", "", "", "", ""),
-    ("БАЗЫ ДАННЫХ", "", "", "", ""),
-    ("PostgreSQL Managed", 25, 1, "=B10*C10", "DigitalOcean / Supabase"),
-    ("Redis (кэш/очереди)", 15, 1, "=B11*C11", "Upstash / Redis Cloud"),
-    ("", "", "", "", ""),
-    ("ХРАНИЛИЩЕ", "", "", "", ""),
-    ("Object Storage (за GB)", 0.02, "=CONTROL!B26+CONTROL!B27", "=B15*C15", "S3 / Cloudflare R2"),
-    ("CDN Bandwidth (за GB)", 0.01, "=(CONTROL!B26+CONTROL!B27)*3", "=B16*C16", "x3 от хранилища"),
-    ("", "", "", "", ""),
-    ("ДОПОЛНИТЕЛЬНО", "", "", "", ""),
-    ("SSL / Domain", 0, 1, "=B20*C20", "Let's Encrypt бесплатно"),
-    ("Monitoring (Sentry)", 26, 1, "=B21*C21", "Team plan"),
-    ("CI/CD (GitHub Actions)", 0, 1, "=B22*C22", "Free tier достаточно"),
-    ("Email Service (Resend)", 20, 1, "=B23*C23", "10K emails/month"),
-]
+    # Итого AI
+    add_total_row(ws, book.catalog, "AI_Generation", "ИТОГО AI И ГЕНЕРАЦИЯ", 5)
 
-for i, (resource, price, qty, total, comment) in enumerate(infra_data, 4):
-    ws_infra.cell(row=i, column=1, value=resource)
-    ws_infra.cell(row=i, column=2, value=price)
-    ws_infra.cell(row=i, column=3, value=qty)
-    ws_infra.cell(row=i, column=4, value=total)
-    ws_infra.cell(row=i, column=5, value=comment)
+    set_column_widths(ws, [35, 20, 15, 15, 40])
+    return ws
 
-    if resource in ["СЕРВЕРЫ", "БАЗЫ ДАННЫХ", "ХРАНИЛИЩЕ", "ДОПОЛНИТЕЛЬНО"]:
-        for col in range(1, 6):
-            style_cell(ws_infra, i, col, SECTION_FILL)
+# ==================== ЛИСТ 3: ИНФРАСТРУКТУРА ====================
+def build_infrastructure(book):
+    ws = book.new_sheet("Infrastructure")
 
-    for col in range(1, 6):
-        ws_infra.cell(row=i, column=col).border = BORDER
+    add_title(ws, "ИНФРАСТРУКТУРА - СЕРВЕРЫ И СЕРВИСЫ", 'A1:E1')
+    add_headers(ws, 3, ["Ресурс", "Цена/мес ($)", "Количество", "Итого ($)", "Провайдер / Комментарий"])
 
-# Итого Infrastructure
-ws_infra.cell(row=25, column=1, value="ИТОГО ИНФРАСТРУКТУРА")
-ws_infra.cell(row=25, column=4, value="=SUM(D5:D24)")
-style_cell(ws_infra, 25, 1, TOTAL_FILL)
-style_cell(ws_infra, 25, 4, TOTAL_FILL)
-ws_infra['A25'].font = Font(bold=True)
-ws_infra['D25'].font = Font(bold=True)
-for col in range(1, 6):
-    ws_infra.cell(row=25, column=col).border = BORDER
+    write_price_table(ws, book.catalog, "Infrastructure")
 
-set_column_widths(ws_infra, [35, 18, 15, 15, 35])
+    # Итого Infrastructure
+    add_total_row(ws, book.catalog, "Infrastructure", "ИТОГО ИНФРАСТРУКТУРА", 5)
 
-# ==================== ЛИСТ 4: ТРАФИК ====================
-ws_traffic = wb.create_sheet("Traffic")
-
-ws_traffic['A1'] = "ТРАФИК И КОММУНИКАЦИИ"
-ws_traffic.merge_cells('A1:E1')
-ws_traffic['A1'].font = Font(bold=True, size=14, color="FFFFFF")
-ws_traffic['A1'].fill = HEADER_FILL
-
-headers = ["Канал", "Цена за событие ($)", "Количество", "Итого ($)", "Комментарий"]
-for col, header in enumerate(headers, 1):
-    ws_traffic.cell(row=3, column=col, value=header)
-style_header(ws_traffic, 3, 5)
-
-traffic_data = [
-    ("УВЕДОМЛЕНИЯ", "", "", "", ""),
-    ("Push Notifications", 0.0001, "=CONTROL!B22*10", "=B5*C5", "~10 пушей/пользователь"),
-    ("Email (транзакционные)", 0.001, "=CONTROL!B22*3", "=B6*C6", "~3 email/пользователь"),
-    ("SMS (критичные)", 0.05, "=CONTROL!B22*0.1", "=B7*C7", "10% пользователей"),
-    ("", "", "", "", ""),
-    ("API И ИНТЕГРАЦИИ", "", "", "", ""),
-    ("Webhook calls", 0.0001, "=CONTROL!B22*5", "=B11*C11", "~5 webhooks/пользователь"),
-    ("Payment Gateway (Stripe)", 0, 1, "=B12*C12", "% от транзакций отдельно"),
-    ("Analytics (Mixpanel)", 0, 1, "=B13*C13", "Free tier"),
-]
+    set_column_widths(ws, [35, 18, 15, 15, 35])
+    return ws
 
-for i, (channel, price, qty, total, comment) in enumerate(traffic_data, 4):
-    ws_traffic.cell(row=i, column=1, value=channel)
-    ws_traffic.cell(row=i, column=2, value=price)
-    ws_traffic.cell(row=i, column=3, value=qty)
-    ws_traffic.cell(row=i, column=4, value=total)
-    ws_traffic.cell(row=i, column=5, value=comment)
+# ==================== ЛИСТ 4: ТРАФИК ====================
+def build_traffic(book):
+    ws = book.new_sheet("Traffic")
 
-    if channel in ["УВЕДОМЛЕНИЯ", "API И ИНТЕГРАЦИИ"]:
-        for col in range(1, 6):
-            style_cell(ws_traffic, i, col, SECTION_FILL)
+    add_title(ws, "ТРАФИК И КОММУНИКАЦИИ", 'A1:E1')
+    add_headers(ws, 3, ["Канал", "Цена за событие ($)", "Количество", "Итого ($)", "Комментарий"])
 
-    for col in range(1, 6):
-        ws_traffic.cell(row=i, column=col).border = BORDER
+    write_price_table(ws, book.catalog, "Traffic")
 
-# Итого Traffic
-ws_traffic.cell(row=15, column=1, value="ИТОГО ТРАФИК")
-ws_traffic.cell(row=15, column=4, value="=SUM(D5:D14)")
-style_cell(ws_traffic, 15, 1, TOTAL_FILL)
-style_cell(ws_traffic, 15, 4, TOTAL_FILL)
-ws_traffic['A15'].font = Font(bold=True)
-ws_traffic['D15'].font = Font(bold=True)
-for col in range(1, 6):
-    ws_traffic.cell(row=15, column=col).border = BORDER
+    # Итого Traffic
+    add_total_row(ws, book.catalog, "Traffic", "ИТОГО ТРАФИК", 5)
 
-set_column_widths(ws_traffic, [35, 22, 15, 15, 35])
+    set_column_widths(ws, [35, 22, 15, 15, 35])
+    return ws
 
 # ==================== ЛИСТ 5: ИТОГО ====================
-ws_total = wb.create_sheet("TOTAL")
-
-ws_total['A1'] = "СВОДКА РАСХОДОВ"
-ws_total.merge_cells('A1:D1')
-ws_total['A1'].font = Font(bold=True, size=16, color="FFFFFF")
-ws_total['A1'].fill = HEADER_FILL
-
-# Текущий месяц
-ws_total['A3'] = "Расчет для месяца:"
-ws_total['B3'] = "=CONTROL!B7"
-ws_total['C3'] = "Пользователей:"
-ws_total['D3'] = "=CONTROL!B22"
-ws_total['B3'].fill = INPUT_FILL
-ws_total['D3'].fill = TOTAL_FILL
-
-headers = ["Категория", "Сумма ($)", "% от общего", "Комментарий"]
-for col, header in enumerate(headers, 1):
-    ws_total.cell(row=5, column=col, value=header)
-style_header(ws_total, 5, 4)
-
-total_data = [
-    ("AI и Генерация", "=AI_Generation!D22", "=B6/$B$10*100", "Pixelcut, Video, LLM"),
-    ("Инфраструктура", "=Infrastructure!D25", "=B7/$B$10*100", "Серверы, БД, Хранилище"),
-    ("Трафик и Коммуникации", "=Traffic!D15", "=B8/$B$10*100", "Push, Email, SMS"),
-]
+def build_total(book):
+    ws = book.new_sheet("TOTAL")
+
+    add_title(ws, "СВОДКА РАСХОДОВ", 'A1:D1', "calc_title_large")
+
+    # Текущий месяц
+    write_row(ws, 3, ["Расчет для месяца:", "=CONTROL!B7", "Пользователей:", "=CONTROL!B22"],
+              [None, "calc_input_fill", None, "calc_total_fill"])
+
+    add_headers(ws, 5, ["Категория", "Сумма ($)", "% от общего", "Комментарий"])
+
+    for i, row_data in enumerate(total_data(book.catalog), TOTAL_ROW):
+        write_row(ws, i, row_data, "calc_cell")
+
+    # Общий итог
+    write_row(ws, 10, ["ОБЩИЙ ИТОГ", "=SUM(B6:B8)", "100%", None],
+              ["calc_grand_total", "calc_grand_total", "calc_cell", "calc_cell"])
+
+    # Unit Economics
+    ws['A12'] = "UNIT ECONOMICS"
+    ws.merge_cells('A12:D12')
+    ws['A12'].style = "calc_band"
+
+    for i, row_data in enumerate(unit_data(book.catalog), UNIT_ROW):
+        write_row(ws, i, row_data, ["calc_cell", "calc_total", "calc_cell", "calc_cell"])
+
+    set_column_widths(ws, [35, 20, 15, 35])
+    return ws
+
+# ==================== ЛИСТ 6: ПРОГНОЗ ====================
+def plural(n, one, few, many):
+    if n % 10 == 1 and n % 100 != 11:
+        return one
+    if 2 <= n % 10 <= 4 and not 12 <= n % 100 <= 14:
+        return few
+    return many
+
+def forecast_unit(horizon, daily):
+    return plural(horizon, *(("ДЕНЬ", "ДНЯ", "ДНЕЙ") if daily else ("МЕСЯЦ", "МЕСЯЦА", "МЕСЯЦЕВ")))
+
+def forecast_styles(row_data):
+    """Стили ячеек строки прогноза; последняя колонка - рост в процентах."""
+    label = row_data[0]
+    if label in FORECAST_SECTIONS:
+        return ["calc_section"] * len(row_data)
+    if label in FORECAST_TOTALS:
+        styles = ["calc_total_bold"] + ["calc_total"] * (len(row_data) - 2)
+        return styles + ["calc_total_percent" if is_formula(row_data[-1]) else "calc_total"]
+    styles = ["calc_cell"] * (len(row_data) - 1)
+    return styles + ["calc_percent" if is_formula(row_data[-1]) else "calc_cell"]
+
+def styled_cells(ws, values, styles):
+    """Строка WriteOnlyCell для потоковой записи."""
+    from openpyxl.cell import WriteOnlyCell
+
+    cells = []
+    for value, name in zip(values, styles):
+        cell = WriteOnlyCell(ws, value)
+        cell.style = name
+        cells.append(cell)
+    return cells
+
+def build_forecast(book):
+    horizon, daily = book.horizon, book.daily
+    period = "День" if daily else "Месяц"
+    last_col = column_letter(horizon + 2)
+    title = f"ПРОГНОЗ НА {horizon} {forecast_unit(horizon, daily)}"
+    headers = ["Показатель"] + [f"{period} {n}" for n in range(1, horizon + 1)] + ["Рост"]
+
+    ws = book.wb.create_sheet(forecast_sheet(horizon, daily))
+    set_column_widths(ws, [20] + [14] * horizon + [12])
+
+    if book.streaming:
+        # Строки уходят в файл сразу, в памяти держится только текущая
+        ws.merged_cells.add(f'A1:{last_col}1')
+        ws.append(styled_cells(ws, [title], ["calc_title_large"]))
+        ws.append([])
+        ws.append(styled_cells(ws, headers, ["calc_header"] * len(headers)))
+        for row_data in book.forecast:
+            ws.append(styled_cells(ws, row_data, forecast_styles(row_data)))
+    else:
+        add_title(ws, title, f'A1:{last_col}1', "calc_title_large")
+        add_headers(ws, 3, headers)
+        # Формулы для прогноза
+        for i, row_data in enumerate(book.forecast, TABLE_ROW):
+            write_row(ws, i, row_data, forecast_styles(row_data))
+    return ws
 
-for i, (cat, formula, pct, comment) in enumerate(total_data, 6):
-    ws_total.cell(row=i, column=1, value=cat)
-    ws_total.cell(row=i, column=2, value=formula)
-    ws_total.cell(row=i, column=3, value=pct)
-    ws_total.cell(row=i, column=4, value=comment)
-    for col in range(1, 5):
-        ws_total.cell(row=i, column=col).border = BORDER
-
-# Общий итог
-ws_total.cell(row=10, column=1, value="ОБЩИЙ ИТОГ")
-ws_total.cell(row=10, column=2, value="=SUM(B6:B8)")
-ws_total.cell(row=10, column=3, value="100%")
-style_cell(ws_total, 10, 1, TOTAL_FILL)
-style_cell(ws_total, 10, 2, TOTAL_FILL)
-ws_total['A10'].font = Font(bold=True, size=12)
-ws_total['B10'].font = Font(bold=True, size=12)
-for col in range(1, 5):
-    ws_total.cell(row=10, column=col).border = BORDER
-
-# Unit Economics
-ws_total['A12'] = "UNIT ECONOMICS"
-ws_total.merge_cells('A12:D12')
-style_cell(ws_total, 12, 1, HEADER_FILL)
-ws_total['A12'].font = HEADER_FONT
-
-unit_data = [
-    ("Стоимость 1 пользователя", "=B10/CONTROL!B22", "$", "Средняя за месяц"),
-    ("Стоимость 1 примерки", "=AI_Generation!D5/CONTROL!B23", "$", "Только Pixelcut"),
-    ("Стоимость 1 видео", "=AI_Generation!D9/CONTROL!B24", "$", "Только генерация"),
-    ("Себестоимость образа (полная)", "=(AI_Generation!D5+AI_Generation!D19+AI_Generation!D20)/CONTROL!B23", "$", "Try-on + обработка"),
-]
+# ==================== ЛИСТ 7: КАЛЬКУЛЯТОР ТОКЕНОВ ====================
+def build_token_calculator(book):
+    ws = book.new_sheet(TOKEN_SHEET)
 
-for i, (metric, formula, unit, comment) in enumerate(unit_data, 13):
-    ws_total.cell(row=i, column=1, value=metric)
-    ws_total.cell(row=i, column=2, value=formula)
-    ws_total.cell(row=i, column=3, value=unit)
-    ws_total.cell(row=i, column=4, value=comment)
-    style_cell(ws_total, i, 2, TOTAL_FILL)
-    for col in range(1, 5):
-        ws_total.cell(row=i, column=col).border = BORDER
-
-set_column_widths(ws_total, [35, 20, 15, 35])
-
-# ==================== ЛИСТ 6: ПРОГНОЗ 6 МЕСЯЦЕВ ====================
-ws_forecast = wb.create_sheet("Forecast_6M")
-
-ws_forecast['A1'] = "ПРОГНОЗ НА 6 МЕСЯЦЕВ"
-ws_forecast.merge_cells('A1:H1')
-ws_forecast['A1'].font = Font(bold=True, size=16, color="FFFFFF")
-ws_forecast['A1'].fill = HEADER_FILL
-
-headers = ["Показатель", "Месяц 1", "Месяц 2", "Месяц 3", "Месяц 4", "Месяц 5", "Месяц 6", "Рост"]
-for col, header in enumerate(headers, 1):
-    ws_forecast.cell(row=3, column=col, value=header)
-style_header(ws_forecast, 3, 8)
-
-# Формулы для прогноза
-forecast_rows = [
-    ("Пользователи",
-     "=CONTROL!B5",
-     "=B4*(1+CONTROL!$B$6/100)",
-     "=C4*(1+CONTROL!$B$6/100)",
-     "=D4*(1+CONTROL!$B$6/100)",
-     "=E4*(1+CONTROL!$B$6/100)",
-     "=F4*(1+CONTROL!$B$6/100)",
-     "=G4/B4-1"),
-    ("Примерок (всего)",
-     "=B4*CONTROL!$B$10",
-     "=C4*CONTROL!$B$10",
-     "=D4*CONTROL!$B$10",
-     "=E4*CONTROL!$B$10",
-     "=F4*CONTROL!$B$10",
-     "=G4*CONTROL!$B$10",
-     "=G5/B5-1"),
-    ("", "", "", "", "", "", "", ""),
-    ("ЗАТРАТЫ ($)", "", "", "", "", "", "", ""),
-    ("AI и Генерация",
-     "=B5*0.1 + B4*CONTROL!$B$11*0.5 + B4*CONTROL!$B$12*0.005*2",
-     "=C5*0.1 + C4*CONTROL!$B$11*0.5 + C4*CONTROL!$B$12*0.005*2",
-     "=D5*0.1 + D4*CONTROL!$B$11*0.5 + D4*CONTROL!$B$12*0.005*2",
-     "=E5*0.1 + E4*CONTROL!$B$11*0.5 + E4*CONTROL!$B$12*0.005*2",
-     "=F5*0.1 + F4*CONTROL!$B$11*0.5 + F4*CONTROL!$B$12*0.005*2",
-     "=G5*0.1 + G4*CONTROL!$B$11*0.5 + G4*CONTROL!$B$12*0.005*2",
-     "=G8/B8-1"),
-    ("Инфраструктура",
-     "=45*CEILING(B4/CONTROL!$B$19,1)+60*CEILING(CEILING(B4/CONTROL!$B$19,1)/2,1)+40+15+26+20",
-     "=45*CEILING(C4/CONTROL!$B$19,1)+60*CEILING(CEILING(C4/CONTROL!$B$19,1)/2,1)+40+15+26+20",
-     "=45*CEILING(D4/CONTROL!$B$19,1)+60*CEILING(CEILING(D4/CONTROL!$B$19,1)/2,1)+40+15+26+20",
-     "=45*CEILING(E4/CONTROL!$B$19,1)+60*CEILING(CEILING(E4/CONTROL!$B$19,1)/2,1)+40+15+26+20",
-     "=45*CEILING(F4/CONTROL!$B$19,1)+60*CEILING(CEILING(F4/CONTROL!$B$19,1)/2,1)+40+15+26+20",
-     "=45*CEILING(G4/CONTROL!$B$19,1)+60*CEILING(CEILING(G4/CONTROL!$B$19,1)/2,1)+40+15+26+20",
-     "=G9/B9-1"),
-    ("Трафик",
-     "=B4*10*0.0001+B4*3*0.001+B4*0.1*0.05",
-     "=C4*10*0.0001+C4*3*0.001+C4*0.1*0.05",
-     "=D4*10*0.0001+D4*3*0.001+D4*0.1*0.05",
-     "=E4*10*0.0001+E4*3*0.001+E4*0.1*0.05",
-     "=F4*10*0.0001+F4*3*0.001+F4*0.1*0.05",
-     "=G4*10*0.0001+G4*3*0.001+G4*0.1*0.05",
-     "=G10/B10-1"),
-    ("", "", "", "", "", "", "", ""),
-    ("ИТОГО МЕСЯЦ",
-     "=B8+B9+B10",
-     "=C8+C9+C10",
-     "=D8+D9+D10",
-     "=E8+E9+E10",
-     "=F8+F9+F10",
-     "=G8+G9+G10",
-     "=G12/B12-1"),
-    ("Накопительно",
-     "=B12",
-     "=B13+C12",
-     "=C13+D12",
-     "=D13+E12",
-     "=E13+F12",
-     "=F13+G12",
-     ""),
-    ("", "", "", "", "", "", "", ""),
-    ("UNIT ECONOMICS", "", "", "", "", "", "", ""),
-    ("$/пользователь",
-     "=B12/B4",
-     "=C12/C4",
-     "=D12/D4",
-     "=E12/E4",
-     "=F12/F4",
-     "=G12/G4",
-     "=G16/B16-1"),
-    ("$/примерка",
-     "=B8/B5",
-     "=C8/C5",
-     "=D8/D5",
-     "=E8/E5",
-     "=F8/F5",
-     "=G8/G5",
-     "=G17/B17-1"),
-]
+    add_title(ws, "КАЛЬКУЛЯТОР СТОИМОСТИ ТОКЕНОВ", 'A1:F1', "calc_title_large")
+    add_headers(ws, 3, ["Провайдер / Модель", "Input ($/1M)", "Output ($/1M)", "Токенов/запрос", "Запросов", "Итого ($)"])
 
-for i, row_data in enumerate(forecast_rows, 4):
-    for j, value in enumerate(row_data, 1):
-        cell = ws_forecast.cell(row=i, column=j, value=value)
-        cell.border = BORDER
+    write_price_table(ws, book.catalog, TOKEN_SHEET)
 
-    # Стилизация
-    if row_data[0] in ["ЗАТРАТЫ ($)", "UNIT ECONOMICS"]:
-        for col in range(1, 9):
-            style_cell(ws_forecast, i, col, SECTION_FILL)
-    elif row_data[0] in ["ИТОГО МЕСЯЦ", "Накопительно"]:
-        for col in range(1, 9):
-            style_cell(ws_forecast, i, col, TOTAL_FILL)
-        ws_forecast.cell(row=i, column=1).font = Font(bold=True)
+    # Итого токены
+    add_total_row(ws, book.catalog, TOKEN_SHEET, "ИТОГО LLM ЗАТРАТЫ", 6)
 
-# Форматирование процентов для колонки H
-for row in [4, 5, 8, 9, 10, 12, 16, 17]:
-    cell = ws_forecast.cell(row=row, column=8)
-    cell.number_format = '0.0%'
+    # Памятка
+    note = f"A{book.catalog.total_rows[TOKEN_SHEET] + 2}"
+    ws[note] = "ПАМЯТКА: 1M = 1,000,000 токенов. ~750 слов = ~1000 токенов"
+    ws[note].style = "calc_note"
 
-set_column_widths(ws_forecast, [20, 14, 14, 14, 14, 14, 14, 12])
+    set_column_widths(ws, [25, 15, 15, 18, 15, 15])
+    return ws
 
-# ==================== ЛИСТ 7: КАЛЬКУЛЯТОР ТОКЕНОВ ====================
-ws_tokens = wb.create_sheet("Token_Calculator")
-
-ws_tokens['A1'] = "КАЛЬКУЛЯТОР СТОИМОСТИ ТОКЕНОВ"
-ws_tokens.merge_cells('A1:F1')
-ws_tokens['A1'].font = Font(bold=True, size=16, color="FFFFFF")
-ws_tokens['A1'].fill = HEADER_FILL
-
-headers = ["Провайдер / Модель", "Input ($/1M)", "Output ($/1M)", "Токенов/запрос", "Запросов", "Итого ($)"]
-for col, header in enumerate(headers, 1):
-    ws_tokens.cell(row=3, column=col, value=header)
-style_header(ws_tokens, 3, 6)
-
-token_data = [
-    ("OPENAI", "", "", "", "", ""),
-    ("GPT-4o", 2.50, 10.00, 2000, "=CONTROL!B25", "=(B5*C5/1000000+C5*D5/1000000)*E5"),
-    ("GPT-4o-mini", 0.15, 0.60, 1500, "=CONTROL!B25*0.5", "=(B6*D6/1000000+C6*D6/1000000)*E6"),
-    ("GPT-4-turbo", 10.00, 30.00, 2000, 0, "=(B7*D7/1000000+C7*D7/1000000)*E7"),
-    ("", "", "", "", "", ""),
-    ("ANTHROPIC", "", "", "", "", ""),
-    ("Claude 3.5 Sonnet", 3.00, 15.00, 2000, 0, "=(B11*D11/1000000+C11*D11/1000000)*E11"),
-    ("Claude 3 Haiku", 0.25, 1.25, 1500, 0, "=(B12*D12/1000000+C12*D12/1000000)*E12"),
-    ("", "", "", "", "", ""),
-    ("GOOGLE", "", "", "", "", ""),
-    ("Gemini 1.5 Pro", 1.25, 5.00, 2000, 0, "=(B16*D16/1000000+C16*D16/1000000)*E16"),
-    ("Gemini 1.5 Flash", 0.075, 0.30, 1500, 0, "=(B17*D17/1000000+C17*D17/1000000)*E17"),
-    ("", "", "", "", "", ""),
-    ("EMBEDDINGS", "", "", "", "", ""),
-    ("text-embedding-3-small", 0.02, 0, 500, "=CONTROL!B25", "=B21*D21/1000000*E21"),
-    ("text-embedding-3-large", 0.13, 0, 500, 0, "=B22*D22/1000000*E22"),
+
+# Листы в порядке книги
+SHEET_BUILDERS = [
+    build_control, build_ai_generation, build_infrastructure, build_traffic,
+    build_total, build_forecast, build_token_calculator,
 ]
 
-for i, row_data in enumerate(token_data, 4):
-    for j, value in enumerate(row_data, 1):
-        cell = ws_tokens.cell(row=i, column=j, value=value)
-        cell.border = BORDER
-
-    if row_data[0] in ["OPENAI", "ANTHROPIC", "GOOGLE", "EMBEDDINGS"]:
-        for col in range(1, 7):
-            style_cell(ws_tokens, i, col, SECTION_FILL)
-
-# Итого токены
-ws_tokens.cell(row=24, column=1, value="ИТОГО LLM ЗАТРАТЫ")
-ws_tokens.cell(row=24, column=6, value="=SUM(F5:F23)")
-style_cell(ws_tokens, 24, 1, TOTAL_FILL)
-style_cell(ws_tokens, 24, 6, TOTAL_FILL)
-ws_tokens['A24'].font = Font(bold=True)
-ws_tokens['F24'].font = Font(bold=True)
-for col in range(1, 7):
-    ws_tokens.cell(row=24, column=col).border = BORDER
-
-# Памятка
-ws_tokens['A26'] = "ПАМЯТКА: 1M = 1,000,000 токенов. ~750 слов = ~1000 токенов"
-ws_tokens['A26'].font = Font(italic=True, color="666666")
-
-set_column_widths(ws_tokens, [25, 15, 15, 18, 15, 15])
-
-# Сохраняем
-wb.save('/workspace/project_cost_calculator.xlsx')
-print("✅ Калькулятор создан: /workspace/project_cost_calculator.xlsx")
-print("\nСтруктура файла:")
-print("  1. CONTROL - Панель управления (вводные данные)")
-print("  2. AI_Generation - Затраты на ИИ (Pixelcut, Video, LLM)")
-print("  3. Infrastructure - Серверы и инфраструктура")
-print("  4. Traffic - Трафик и коммуникации")
-print("  5. TOTAL - Сводка и Unit Economics")
-print("  6. Forecast_6M - Прогноз на 6 месяцев")
-print("  7. Token_Calculator - Калькулятор токенов")
+
+def sheet_titles(horizon=FORECAST_MONTHS, daily=False):
+    """Имена листов книги в порядке SHEET_BUILDERS."""
+    return ["CONTROL", "AI_Generation", "Infrastructure", "Traffic", "TOTAL",
+            forecast_sheet(horizon, daily), TOKEN_SHEET]
+
+
+def build_workbook(inputs=None, horizon=FORECAST_MONTHS, daily=False, write_only=None,
+                   catalog=None, cached_values=False, cohorts=None, profiler=None):
+    """Собирает все листы; возвращает Calculator (книга еще не сохранена)."""
+    book = Calculator(inputs, horizon, daily, write_only, catalog, cached_values, cohorts,
+                      profiler)
+    for build in SHEET_BUILDERS:
+        book.stage(build.__name__, build, book)
+    return book
+
+
+def save_workbook(path=OUTPUT_PATH, **options):
+    """Собирает и сохраняет книгу; options - как у build_workbook()."""
+    book = build_workbook(**options)
+    book.save(path)
+    return book
+
+
+def workbook_bytes(**options):
+    """Содержимое xlsx в памяти (для ответа сервиса, вложения и т.п.)."""
+    return build_workbook(**options).to_bytes()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Калькулятор расходов на AI-проект")
+    parser.add_argument("inputs", nargs="*", metavar="name=value",
+                        help="вводные CONTROL, например users=8000 growth=20")
+    parser.add_argument("--horizon", type=horizon_arg, default=FORECAST_MONTHS,
+                        help="число периодов прогноза (по умолчанию 6)")
+    parser.add_argument("--daily", action="store_true", help="прогноз по дням вместо месяцев")
+    parser.add_argument("--write-only", action="store_true",
+                        help="потоковая запись книги (включается сама для больших горизонтов)")
+    parser.add_argument("--catalog", help="каталог цен (по умолчанию pricing.json)")
+    parser.add_argument("--values", action="store_true",
+                        help="сохранить вычисленные значения формул")
+    parser.add_argument("--cohorts", action="store_true",
+                        help="пользователи по когортной модели с оттоком (cohorts.py)")
+    parser.add_argument("--profile", nargs="?", const="-", metavar="FILE",
+                        help="замеры этапов сборки в JSON (без FILE - в stdout)")
+    parser.add_argument("-o", "--output", default=OUTPUT_PATH, help="файл xlsx")
+    args = parser.parse_args(argv)
+
+    inputs = parse_inputs(args.inputs, parser)
+    cohorts = None
+    if args.cohorts:
+        from cohorts import cohort_forecast
+        cohorts = cohort_forecast(inputs, args.horizon, args.daily)
+    profiler = None
+    if args.profile:
+        from profiling import BuildProfiler
+        profiler = BuildProfiler()
+
+    save_workbook(args.output, inputs=inputs, horizon=args.horizon, daily=args.daily,
+                  write_only=args.write_only or None, catalog=load_catalog(args.catalog),
+                  cached_values=args.values, cohorts=cohorts, profiler=profiler)
+    if profiler is not None:
+        profiler.close()
+        if args.profile == "-":
+            print(profiler.to_json(indent=2))
+            return
+        with open(args.profile, "w", encoding="utf-8") as f:
+            f.write(profiler.to_json(indent=2))
+    print(f"✅ Калькулятор создан: {args.output}")
+    print("\nСтруктура файла:")
+    print("  1. CONTROL - Панель управления (вводные данные)")
+    print("  2. AI_Generation - Затраты на ИИ (Pixelcut, Video, LLM)")
+    print("  3. Infrastructure - Серверы и инфраструктура")
+    print("  4. Traffic - Трафик и коммуникации")
+    print("  5. TOTAL - Сводка и Unit Economics")
+    print(f"  6. {forecast_sheet(args.horizon, args.daily)} - Прогноз на {args.horizon} "
+          f"{forecast_unit(args.horizon, args.daily).lower()}")
+    print("  7. Token_Calculator - Калькулятор токенов")
+
+
+if __name__ == "__main__":
+    main()
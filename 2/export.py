@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Выгрузка вычисленных результатов в колоночные таблицы (CSV, Parquet,
+Arrow) для хранилища данных.
+
+Три таблицы:
+
+    items     - позиции листов цен в структуре каталога (лист, секция,
+                провайдер/модель/операция, цена, количество, итог) со
+                значениями, посчитанными cost_model;
+    forecast  - периоды прогноза: пользователи, примерки, расходы по
+                статьям, итог, накопительно, unit economics;
+    sweep     - перебор сценариев sweep.py: вводные и результаты.
+
+Таблицы пишутся блоками (row group в Parquet, record batch в Arrow,
+строки в CSV): перебор на миллионы сценариев идет блоками по
+chunk_size и не держится в памяти целиком. Формат - по расширению
+файла; для .parquet и .arrow нужен pyarrow.
+
+    python export.py items items.csv users=8000
+    python export.py forecast forecast.parquet --horizon 60
+    python export.py sweep sweep.parquet --grid users=1000:100000:1000 growth=0:50:51
+    python export.py all exports/ --format parquet users=8000      # items + forecast
+"""
+
+import argparse
+import csv
+import os
+import time
+
+import numpy as np
+
+from cost_model import (
+    CONTROL_INPUTS, FORECAST_MONTHS, evaluate, forecast_sheet, horizon_arg, parse_inputs,
+)
+from formula import column_letter
+from pricing import TOKEN_SHEET, TOTAL_COLUMNS, item_key, load_catalog
+from sweep import CHUNK_SIZE, grid_size, iter_sweep
+
+ITEM_COLUMNS = ["sheet", "section", "key", "provider", "model", "operation", "name",
+                "price", "input_price", "output_price", "tokens", "quantity", "total", "note"]
+
+# Колонка таблицы forecast -> строка листа прогноза (раскладка forecast_rows())
+FORECAST_COLUMNS = {
+    "users": 4, "tryons": 5, "ai": 8, "infrastructure": 9, "traffic": 10,
+    "total": 12, "cumulative": 13, "cost_per_user": 16, "cost_per_tryon": 17,
+}
+
+FORMATS = ("csv", "parquet", "arrow")
+
+
+def _number(value):
+    """Значение ячейки для таблицы: ошибки Excel и пустые ячейки -> None."""
+    if value is None or isinstance(value, str):
+        return None
+    return float(value)
+
+
+def line_items(values, catalog=None):
+    """Столбцы таблицы items для словаря evaluate()."""
+    catalog = load_catalog() if catalog is None else catalog
+    columns = {name: [] for name in ITEM_COLUMNS}
+    for sheet, spec in catalog.data["sheets"].items():
+        for section in spec["sections"]:
+            for entry in section["items"]:
+                _item_row(columns, catalog, sheet, section["title"],
+                          catalog[item_key(entry["provider"], entry["model"], entry["operation"])],
+                          values)
+    return columns
+
+
+def _item_row(columns, catalog, sheet, section, item, values):
+    spec = item.spec
+    token = sheet == TOKEN_SHEET
+
+    def cell(column):
+        return _number(values.get(catalog.cell(item.key, column)))
+
+    row = {
+        "sheet": sheet, "section": section, "key": item.key,
+        "provider": spec["provider"], "model": spec["model"], "operation": spec["operation"],
+        "name": spec["name"],
+        "price": None if token else cell("B"),
+        "input_price": cell("B") if token else None,
+        "output_price": cell("C") if token else None,
+        "tokens": cell("D") if token else None,
+        "quantity": cell("E" if token else "C"),
+        "total": cell(TOTAL_COLUMNS[sheet]),
+        "note": spec.get("note", ""),
+    }
+    for name in ITEM_COLUMNS:
+        columns[name].append(row[name])
+
+
+def forecast_table(values, horizon=FORECAST_MONTHS, daily=False):
+    """Столбцы таблицы forecast: по строке на период прогноза."""
+    sheet = forecast_sheet(horizon, daily)
+    cols = [column_letter(c) for c in range(2, horizon + 2)]
+    columns = {"period": list(range(1, horizon + 1)),
+               "unit": ["day" if daily else "month"] * horizon}
+    for name, row in FORECAST_COLUMNS.items():
+        columns[name] = [_number(values.get(f"{sheet}!{c}{row}")) for c in cols]
+    return columns
+
+
+# ---------- Запись ----------
+
+class CSVWriter:
+    def __init__(self, path):
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._header = None
+
+    def write(self, columns):
+        if self._header is None:
+            self._header = list(columns)
+            self._writer.writerow(self._header)
+        data = [np.asarray(columns[name]).tolist() for name in self._header]
+        self._writer.writerows(zip(*data))
+
+    def close(self):
+        self._file.close()
+
+
+class ArrowWriter:
+    """Parquet (row group на блок) или Arrow IPC (record batch на блок)."""
+
+    def __init__(self, path, fmt):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise RuntimeError(f"для формата {fmt} нужен pyarrow (pip install pyarrow)") from None
+        self.path = path
+        self.fmt = fmt
+        self._writer = None
+
+    def write(self, columns):
+        import pyarrow as pa
+
+        # столбцы sweep бывают растянутыми скалярами (шаг 0) - Arrow нужен непрерывный буфер
+        table = pa.table({name: np.ascontiguousarray(col) if isinstance(col, np.ndarray) else col
+                          for name, col in columns.items()})
+        if self._writer is None:
+            if self.fmt == "parquet":
+                import pyarrow.parquet as pq
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            else:
+                self._writer = pa.ipc.new_file(self.path, table.schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def table_format(path):
+    ext = os.path.splitext(path)[1].lower().lstrip(".")
+    fmt = {"feather": "arrow", "ipc": "arrow"}.get(ext, ext)
+    if fmt not in FORMATS:
+        raise ValueError(f"неизвестный формат {ext!r}; поддерживаются {', '.join(FORMATS)}")
+    return fmt
+
+
+def open_writer(path):
+    fmt = table_format(path)
+    return CSVWriter(path) if fmt == "csv" else ArrowWriter(path, fmt)
+
+
+def write_table(path, chunks):
+    """Пишет блоки столбцов (итерируемое словарей) в path; возвращает число строк."""
+    writer = open_writer(path)
+    rows = 0
+    try:
+        for columns in chunks:
+            writer.write(columns)
+            rows += len(next(iter(columns.values())))
+    finally:
+        writer.close()
+    return rows
+
+
+# ---------- Таблицы ----------
+
+def export_items(path, inputs=None, catalog=None):
+    catalog = load_catalog() if catalog is None else catalog
+    return write_table(path, [line_items(evaluate(inputs, catalog=catalog), catalog)])
+
+
+def export_forecast(path, inputs=None, horizon=FORECAST_MONTHS, daily=False, catalog=None):
+    values = evaluate(inputs, horizon, daily, catalog)
+    return write_table(path, [forecast_table(values, horizon, daily)])
+
+
+def export_sweep(path, grid, chunk_size=CHUNK_SIZE, inputs=None, catalog=None):
+    """
+    Перебор сценариев grid (как в sweep.sweep()) блоками по chunk_size
+    строк; inputs - вводные, общие для всех сценариев (оси grid важнее).
+    """
+    return write_table(path, iter_sweep(grid, chunk_size=chunk_size, inputs=inputs,
+                                        catalog=catalog))
+
+
+def export_all(directory, fmt="csv", inputs=None, horizon=FORECAST_MONTHS, daily=False,
+               catalog=None):
+    """items.<fmt> и forecast.<fmt> в папке directory (рядом с xlsx)."""
+    os.makedirs(directory, exist_ok=True)
+    items = os.path.join(directory, f"items.{fmt}")
+    forecast = os.path.join(directory, f"forecast.{fmt}")
+    return {items: export_items(items, inputs, catalog),
+            forecast: export_forecast(forecast, inputs, horizon, daily, catalog)}
+
+
+def parse_grid(specs, parser):
+    """
+    Оси перебора из аргументов командной строки: ['users=1000:100000:100',
+    'growth=5,10,15'] -> {'users': linspace(...), 'growth': [...]}. Как в
+    parse_inputs(), допустимы только имена CONTROL_INPUTS; ошибка -
+    parser.error().
+    """
+    grid = {}
+    for spec in specs:
+        name, sep, values = spec.partition("=")
+        if not sep or not name:
+            parser.error(f"{spec!r}: ожидается name=a:b:n или name=v1,v2")
+        if name not in CONTROL_INPUTS:
+            parser.error(f"неизвестная ось {name!r}; допустимы {', '.join(CONTROL_INPUTS)}")
+        if name in grid:
+            parser.error(f"ось {name!r} задана дважды")
+        try:
+            if ":" in values:
+                start, stop, count = values.split(":")
+                if int(count) < 1:
+                    raise ValueError
+                grid[name] = np.linspace(float(start), float(stop), int(count))
+            else:
+                grid[name] = [float(v) for v in values.split(",")]
+        except ValueError:
+            parser.error(f"{spec!r}: ожидается name=a:b:n (n - целое >= 1) или name=v1,v2 "
+                         "(числа)")
+    return grid
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Выгрузка результатов в CSV/Parquet/Arrow")
+    parser.add_argument("table", choices=["items", "forecast", "sweep", "all"])
+    parser.add_argument("output", help="файл (формат по расширению) или папка для all")
+    parser.add_argument("inputs", nargs="*", metavar="name=value", help="вводные CONTROL")
+    parser.add_argument("--horizon", type=horizon_arg, default=FORECAST_MONTHS)
+    parser.add_argument("--daily", action="store_true")
+    parser.add_argument("--grid", nargs="+", default=[], metavar="name=a:b:n|v1,v2",
+                        help="оси перебора для sweep")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--format", default="csv", choices=FORMATS, help="формат для all")
+    parser.add_argument("--catalog", help="каталог цен (по умолчанию pricing.json)")
+    args = parser.parse_args()
+
+    inputs = parse_inputs(args.inputs, parser)
+    catalog = load_catalog(args.catalog)
+
+    started = time.perf_counter()
+    if args.table == "items":
+        written = {args.output: export_items(args.output, inputs, catalog)}
+    elif args.table == "forecast":
+        written = {args.output: export_forecast(args.output, inputs, args.horizon, args.daily,
+                                                catalog)}
+    elif args.table == "sweep":
+        if not args.grid:
+            parser.error("для sweep нужен --grid")
+        grid = parse_grid(args.grid, parser)
+        print(f"Сценариев: {grid_size(grid):,}")
+        written = {args.output: export_sweep(args.output, grid, args.chunk_size, inputs,
+                                             catalog)}
+    else:
+        written = export_all(args.output, args.format, inputs, args.horizon, args.daily, catalog)
+    elapsed = time.perf_counter() - started
+    for path, rows in written.items():
+        print(f"✅ {path}: {rows:,} строк")
+    print(f"за {elapsed:.2f} с")
@@ -0,0 +1,505 @@
+#!/usr/bin/env python3
+"""
+Вычисление формул калькулятора без Excel.
+
+Поддерживается подмножество синтаксиса Excel, которое используется в
+create_calculator.py: числа, строки, ссылки (в т.ч. CONTROL!$B$6),
+диапазоны, арифметика, ^, сравнения и функции IF, ROUND, CEILING, SUM,
+MIN, MAX. Каждая формула компилируется в выражение Python, которое
+одинаково работает со скалярами и с массивами NumPy.
+"""
+
+import math
+import re
+from graphlib import TopologicalSorter
+
+
+class CellError(str):
+    """Значение-ошибка Excel (#DIV/0!, #VALUE!, #NUM!)."""
+
+
+DIV0 = CellError("#DIV/0!")
+VALUE = CellError("#VALUE!")
+NUM = CellError("#NUM!")
+
+
+class FormulaError(Exception):
+    """Ошибка разбора формулы (неподдерживаемый синтаксис)."""
+
+
+class _Propagate(Exception):
+    def __init__(self, error):
+        super().__init__(error)
+        self.error = error
+
+
+_TOKEN_RE = re.compile(r"""
+    \s*(?:
+      (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+    | (?P<string>"(?:[^"]|"")*")
+    | (?P<func>[A-Z][A-Z0-9.]*)\s*\(
+    | (?P<ref>(?:(?P<sheet>[A-Za-z_][A-Za-z0-9_]*|'[^']+')!)?
+              (?P<start>\$?[A-Z]{1,3}\$?\d+)(?::(?P<end>\$?[A-Z]{1,3}\$?\d+))?)
+    | (?P<op><>|<=|>=|[-+*/^&=<>(),%])
+    )""", re.X)
+
+_CELL_RE = re.compile(r"\$?([A-Z]{1,3})\$?(\d+)")
+
+_FUNCTIONS = {"IF": "_if", "ROUND": "_round", "CEILING": "_ceiling",
+              "SUM": "_sum", "MIN": "_min", "MAX": "_max"}
+
+_COMPARE = {"=": "==", "<>": "!=", "<": "<", ">": ">", "<=": "<=", ">=": ">="}
+
+
+def column_letter(index):
+    """1 -> 'A', 28 -> 'AB' (без импорта openpyxl)"""
+    letters = ""
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+def column_index(letters):
+    """'A' -> 1, 'AB' -> 28"""
+    index = 0
+    for ch in letters:
+        index = index * 26 + ord(ch) - 64
+    return index
+
+
+def split_key(key):
+    """'CONTROL!B22' -> ('CONTROL', 22, 2)"""
+    sheet, cell = key.split("!")
+    col, row = _CELL_RE.fullmatch(cell).groups()
+    return sheet, int(row), column_index(col)
+
+
+def cell_key(sheet, row, col):
+    return f"{sheet}!{column_letter(col)}{row}"
+
+
+def _tokenize(formula):
+    tokens = []
+    pos = 0
+    text = formula.rstrip()
+    while pos < len(text):
+        m = _TOKEN_RE.match(text, pos)
+        if not m or m.end() == pos:
+            raise FormulaError(f"не удалось разобрать формулу {formula!r} с позиции {pos}")
+        kind = m.lastgroup if m.lastgroup not in ("sheet", "start", "end") else "ref"
+        tokens.append((kind, m))
+        pos = m.end()
+    return tokens
+
+
+class _Parser:
+    """Рекурсивный спуск; приоритеты операторов как в Excel."""
+
+    def __init__(self, formula, sheet):
+        self.formula = formula
+        self.sheet = sheet
+        self.tokens = _tokenize(formula)
+        self.pos = 0
+        self.refs = []
+
+    def peek(self):
+        if self.pos < len(self.tokens):
+            kind, m = self.tokens[self.pos]
+            return kind, m.group(kind) if kind != "ref" else m
+        return None, None
+
+    def take(self):
+        token = self.peek()
+        self.pos += 1
+        return token
+
+    def expect(self, op):
+        kind, value = self.take()
+        if kind != "op" or value != op:
+            raise FormulaError(f"ожидался {op!r} в формуле {self.formula!r}")
+
+    def parse(self):
+        expr = self.comparison()
+        if self.pos != len(self.tokens):
+            raise FormulaError(f"лишние символы в формуле {self.formula!r}")
+        return expr
+
+    def comparison(self):
+        left = self.concat()
+        kind, value = self.peek()
+        while kind == "op" and value in _COMPARE:
+            self.take()
+            left = f"({left} {_COMPARE[value]} {self.concat()})"
+            kind, value = self.peek()
+        return left
+
+    def concat(self):
+        left = self.additive()
+        kind, value = self.peek()
+        while kind == "op" and value == "&":
+            self.take()
+            left = f"_concat({left}, {self.additive()})"
+            kind, value = self.peek()
+        return left
+
+    def additive(self):
+        left = self.term()
+        kind, value = self.peek()
+        while kind == "op" and value in "+-":
+            self.take()
+            left = f"({left} {value} {self.term()})"
+            kind, value = self.peek()
+        return left
+
+    def term(self):
+        left = self.power()
+        kind, value = self.peek()
+        while kind == "op" and value in "*/":
+            self.take()
+            left = f"({left} {value} {self.power()})"
+            kind, value = self.peek()
+        return left
+
+    def power(self):
+        left = self.unary()
+        kind, value = self.peek()
+        while kind == "op" and value == "^":
+            self.take()
+            left = f"_pow({left}, {self.unary()})"
+            kind, value = self.peek()
+        return left
+
+    def unary(self):
+        kind, value = self.peek()
+        if kind == "op" and value in "+-":
+            self.take()
+            return f"({value}{self.unary()})"
+        expr = self.primary()
+        kind, value = self.peek()
+        while kind == "op" and value == "%":
+            self.take()
+            expr = f"({expr} / 100)"
+            kind, value = self.peek()
+        return expr
+
+    def primary(self):
+        kind, value = self.take()
+        if kind == "number":
+            return repr(float(value)) if any(c in value for c in ".eE") else value
+        if kind == "string":
+            return repr(value[1:-1].replace('""', '"'))
+        if kind == "ref":
+            keys = self.expand(value)
+            self.refs.extend(keys)
+            if len(keys) == 1 and value.group("end") is None:
+                return f"_n(v.get({keys[0]!r}))"
+            return "(" + ", ".join(f"v.get({k!r})" for k in keys) + ",)"
+        if kind == "func":
+            return self.call(value)
+        if kind == "op" and value == "(":
+            expr = self.comparison()
+            self.expect(")")
+            return expr
+        raise FormulaError(f"неожиданный элемент в формуле {self.formula!r}")
+
+    def call(self, name):
+        if name not in _FUNCTIONS:
+            raise FormulaError(f"функция {name} не поддерживается ({self.formula!r})")
+        args = []
+        kind, value = self.peek()
+        if not (kind == "op" and value == ")"):
+            args.append(self.comparison())
+            kind, value = self.peek()
+            while kind == "op" and value == ",":
+                self.take()
+                args.append(self.comparison())
+                kind, value = self.peek()
+        self.expect(")")
+        if name == "IF":
+            # ветви вычисляются лениво, как в Excel
+            args = args[:1] + [f"lambda: {a}" for a in args[1:]]
+        return f"{_FUNCTIONS[name]}({', '.join(args)})"
+
+    def expand(self, m):
+        sheet = m.group("sheet") or self.sheet
+        sheet = sheet.strip("'")
+        col1, row1 = _CELL_RE.fullmatch(m.group("start")).groups()
+        if m.group("end") is None:
+            return [f"{sheet}!{col1}{row1}"]
+        col2, row2 = _CELL_RE.fullmatch(m.group("end")).groups()
+        c1, c2 = sorted((column_index(col1), column_index(col2)))
+        r1, r2 = sorted((int(row1), int(row2)))
+        return [cell_key(sheet, r, c) for r in range(r1, r2 + 1) for c in range(c1, c2 + 1)]
+
+
+def parse(formula, sheet):
+    """Формула '=...' -> (выражение Python от словаря v, список ссылок)."""
+    parser = _Parser(formula[1:] if formula.startswith("=") else formula, sheet)
+    expr = parser.parse()
+    return expr, list(dict.fromkeys(parser.refs))
+
+
+def is_formula(value):
+    return isinstance(value, str) and value.startswith("=") and len(value) > 1
+
+
+# ==================== ФУНКЦИИ EXCEL ====================
+
+def _is_array(x):
+    return getattr(x, "ndim", 0) > 0
+
+
+def _n(x):
+    """Значение ячейки в арифметике: пусто -> 0, текст -> #VALUE!"""
+    if x is None:
+        return 0
+    if isinstance(x, str):
+        raise _Propagate(x if isinstance(x, CellError) else VALUE)
+    return x
+
+
+def _items(args):
+    for arg in args:
+        if isinstance(arg, tuple):
+            # диапазон: текст и пустые ячейки пропускаются
+            for x in arg:
+                if isinstance(x, CellError):
+                    raise _Propagate(x)
+                if x is not None and not isinstance(x, str):
+                    yield x
+        else:
+            yield arg
+
+
+def _sum(*args):
+    total = 0
+    for x in _items(args):
+        total = total + x
+    return total
+
+
+def _min(*args):
+    items = list(_items(args))
+    if any(_is_array(x) for x in items):
+        import numpy as np
+        return np.minimum.reduce(np.broadcast_arrays(*items))
+    return min(items) if items else 0
+
+
+def _max(*args):
+    items = list(_items(args))
+    if any(_is_array(x) for x in items):
+        import numpy as np
+        return np.maximum.reduce(np.broadcast_arrays(*items))
+    return max(items) if items else 0
+
+
+def _if(cond, then, otherwise=lambda: False):
+    if _is_array(cond):
+        import numpy as np
+        return np.where(cond, then(), otherwise())
+    return then() if cond else otherwise()
+
+
+def _round(x, digits=0):
+    """ROUND в Excel округляет половину от нуля, а не к четному."""
+    factor = 10.0 ** int(digits)
+    if _is_array(x):
+        import numpy as np
+        return np.sign(x) * np.floor(np.abs(x) * factor + 0.5) / factor
+    return math.copysign(math.floor(abs(x) * factor + 0.5), x) / factor
+
+
+def _ceiling(x, significance=1):
+    # частное округляется до 12 знаков, чтобы 0.3/0.1 не давало лишний шаг
+    if _is_array(x) or _is_array(significance):
+        import numpy as np
+        with np.errstate(divide="ignore", invalid="ignore"):
+            q = np.round(np.divide(x, significance), 12)
+            return np.where(significance == 0, 0, np.ceil(q) * significance)
+    if significance == 0:
+        return 0
+    return math.ceil(round(x / significance, 12)) * significance
+
+
+def _pow(base, exp):
+    if _is_array(base) or _is_array(exp):
+        import numpy as np
+        with np.errstate(invalid="ignore"):
+            return np.power(np.asarray(base, dtype=float), exp)
+    result = base ** exp
+    if isinstance(result, complex):
+        raise _Propagate(NUM)
+    return result
+
+
+def _concat(a, b):
+    return f"{'' if a is None else a}{'' if b is None else b}"
+
+
+_RUNTIME = {name: globals()[name] for name in
+            ("_n", "_sum", "_min", "_max", "_if", "_round", "_ceiling", "_pow", "_concat")}
+
+_ERRORS = (_Propagate, ArithmeticError, TypeError, ValueError)
+
+
+def _as_error(exc):
+    if isinstance(exc, _Propagate):
+        return exc.error
+    if isinstance(exc, ZeroDivisionError):
+        return DIV0
+    if isinstance(exc, ArithmeticError):
+        return NUM
+    return VALUE
+
+
+# ==================== КОМПИЛЯЦИЯ МОДЕЛИ ====================
+
+class FormulaModel:
+    """
+    Набор ячеек {'Лист!A1': значение или '=формула'}, скомпилированный
+    в функции Python и упорядоченный по зависимостям.
+    """
+
+    def __init__(self, cells):
+        self.constants = {}
+        self.formulas = {}
+        for key, value in cells.items():
+            if is_formula(value):
+                self.formulas[key] = value
+            elif value is not None and value != "":
+                self.constants[key] = value
+
+        self.refs = {}
+        source = []
+        for i, (key, formula) in enumerate(self.formulas.items()):
+            expr, refs = parse(formula, key.split("!")[0])
+            self.refs[key] = refs
+            source.append(f"_f{i} = lambda v: {expr}")
+        namespace = dict(_RUNTIME)
+        exec(compile("\n".join(source), "<formulas>", "exec"), namespace)
+        functions = {key: namespace[f"_f{i}"] for i, key in enumerate(self.formulas)}
+
+        graph = {key: [r for r in refs if r in self.formulas] for key, refs in self.refs.items()}
+        self.order = list(TopologicalSorter(graph).static_order())
+        self.position = {key: i for i, key in enumerate(self.order)}
+        self.functions = functions
+        self.steps = [(key, functions[key]) for key in self.order]
+        self._target_steps = {}
+
+        # обратный граф: ячейка -> формулы, которые на нее ссылаются
+        self.dependents = {}
+        for key, refs in self.refs.items():
+            for ref in refs:
+                self.dependents.setdefault(ref, []).append(key)
+
+    def cross_sheet_refs(self):
+        """Ребра графа между листами: [(ячейка-источник, формула)]."""
+        return [(ref, key) for key, refs in self.refs.items() for ref in refs
+                if ref.split("!")[0] != key.split("!")[0]]
+
+    def downstream(self, keys):
+        """Формулы, зависящие от keys (прямо или косвенно), в порядке расчета."""
+        found = set()
+        stack = list(keys)
+        while stack:
+            for dep in self.dependents.get(stack.pop(), ()):
+                if dep not in found:
+                    found.add(dep)
+                    stack.append(dep)
+        return sorted(found, key=self.position.__getitem__)
+
+    def precedents(self, targets):
+        """Формульные ячейки, от которых зависят targets (включая их самих)."""
+        needed = set()
+        stack = [t for t in targets if t in self.formulas]
+        while stack:
+            key = stack.pop()
+            if key not in needed:
+                needed.add(key)
+                stack.extend(r for r in self.refs[key] if r in self.formulas)
+        return needed
+
+    def steps_for(self, targets):
+        """Шаги вычисления, достаточные для получения targets."""
+        if targets is None:
+            return self.steps
+        targets = tuple(targets)
+        steps = self._target_steps.get(targets)
+        if steps is None:
+            needed = self.precedents(targets)
+            steps = [(key, fn) for key, fn in self.steps if key in needed]
+            self._target_steps[targets] = steps
+        return steps
+
+    def evaluate(self, inputs=None, targets=None):
+        """
+        Вычисляет формулы. inputs переопределяет значения ячеек
+        (в т.ч. формульных - такие ячейки не пересчитываются), targets
+        ограничивает расчет ячейками, от которых они зависят.
+        Значения могут быть скалярами или массивами NumPy одной длины.
+        Возвращает плоский словарь {'Лист!A1': значение}.
+        """
+        v = dict(self.constants)
+        if inputs:
+            v.update(inputs)
+        for key, fn in self.steps_for(targets):
+            if inputs and key in inputs:
+                continue
+            try:
+                v[key] = fn(v)
+            except _ERRORS as exc:
+                v[key] = _as_error(exc)
+        return v
+
+    def compute(self, key, v):
+        """Значение одной формулы по текущим значениям v."""
+        try:
+            return self.functions[key](v)
+        except _ERRORS as exc:
+            return _as_error(exc)
+
+
+class LiveModel:
+    """
+    Текущие значения модели с инкрементальным пересчетом: update()
+    пересчитывает только формулы ниже измененных ячеек по графу
+    зависимостей и останавливается там, где значение не изменилось.
+
+        live = LiveModel(model)
+        live.update({"CONTROL!B5": 6000})   # -> {ячейка: новое значение}
+    """
+
+    def __init__(self, model, inputs=None, aliases=None):
+        self.model = model
+        self.aliases = aliases or {}
+        self.pinned = {}
+        inputs = self._resolve(inputs or {})
+        self.pinned.update(inputs)
+        self.values = model.evaluate(inputs)
+
+    def _resolve(self, changes):
+        return {self.aliases.get(name, name): value for name, value in changes.items()}
+
+    def update(self, changes):
+        """Применяет изменения и возвращает {ячейка: значение} для всех изменившихся ячеек."""
+        changes = self._resolve(changes)
+        changed = {}
+        for key, value in changes.items():
+            if key in self.model.formulas:
+                # формульная ячейка, заданная вручную, больше не пересчитывается
+                self.pinned[key] = value
+            if self.values.get(key) != value:
+                self.values[key] = changed[key] = value
+
+        for key in self.model.downstream(changed):
+            if key in self.pinned or not any(r in changed for r in self.model.refs[key]):
+                continue
+            value = self.model.compute(key, self.values)
+            if value != self.values.get(key):
+                self.values[key] = changed[key] = value
+        return changed
+
+    def __getitem__(self, key):
+        return self.values[self.aliases.get(key, key)]
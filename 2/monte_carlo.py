@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Стохастический прогноз расходов (Monte Carlo) по логике Forecast_6M.
+
+Рост пользователей, использование на пользователя и цены (Pixelcut, видео,
+GPT-4o) задаются распределениями. Каждая траектория считается по тем же
+формулам, что и лист Forecast_6M:
+
+    пользователи[m] = пользователи[m-1] * (1 + рост[m] / 100)
+    AI      = примерки * Pixelcut + пользователи * (видео * цена видео
+              + LLM * цена GPT-4o * 2)
+    инфра   = backend * CEILING(польз. / B19) + worker * CEILING(серверы / 2)
+              + фиксированные позиции Infrastructure
+    трафик  = пользователи * сумма(цена * per_user) позиций Traffic
+
+Цены и постоянные части берутся из каталога pricing.json.
+
+Траектории считаются блоками в пуле процессов. У каждого блока свой
+SeedSequence, порожденный от общего seed, поэтому результат не зависит
+от числа процессов. Блоки возвращают гистограммы в логарифмических
+корзинах (точность квантилей ~0.5%), и память не растет с числом
+траекторий.
+
+    python monte_carlo.py --paths 1000000 --months 36 --seed 42
+"""
+
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from cost_model import BACKEND, CONTROL_INPUTS, LLM, SERVER_ITEMS, TRYON, VIDEO, WORKER, evaluate
+from pricing import load_catalog
+
+CHUNK_SIZE = 50_000
+PERCENTILES = (5, 50, 95)
+
+# Корзины гистограммы: 0 и логарифмическая сетка от $0.01 до $10^10
+_EDGES = np.concatenate([[0.0], np.logspace(-2, 10, 4801)])
+
+TOKENS_K_PER_REQUEST = 2
+
+
+def base_parameters(inputs=None, catalog=None):
+    """Детерминированные параметры прогноза из модели (CONTROL и цены каталога)."""
+    catalog = load_catalog() if catalog is None else catalog
+    values = evaluate(inputs, catalog=catalog)
+    params = {name: values[CONTROL_INPUTS[name]] for name in (
+        "users", "growth", "tryons_per_user", "videos_per_user", "llm_per_user",
+        "users_per_server")}
+    params.update({
+        "pixelcut_price": values[catalog.cell(TRYON)],
+        "video_price": values[catalog.cell(VIDEO)],
+        "gpt4o_price": values[catalog.cell(LLM)],
+        "backend_price": values[catalog.cell(BACKEND)],
+        "worker_price": values[catalog.cell(WORKER)],
+        "fixed_monthly": catalog.fixed_monthly("Infrastructure", exclude=SERVER_ITEMS),
+        "traffic_per_user": catalog.per_user_cost("Traffic"),
+    })
+    return params
+
+
+def default_distributions(inputs=None, catalog=None):
+    """Распределения вокруг текущих значений модели."""
+    p = base_parameters(inputs, catalog)
+
+    def tri(value, low, high):
+        return ("triangular", value * low, value, value * high)
+
+    return {
+        "users": p["users"],
+        "growth": ("normal", p["growth"], max(p["growth"] / 3, 1.0)),
+        "tryons_per_user": tri(p["tryons_per_user"], 0.6, 1.6),
+        "videos_per_user": tri(p["videos_per_user"], 0.5, 2.0),
+        "llm_per_user": tri(p["llm_per_user"], 0.6, 1.6),
+        "users_per_server": p["users_per_server"],
+        "pixelcut_price": tri(p["pixelcut_price"], 0.8, 1.2),
+        "video_price": tri(p["video_price"], 0.7, 1.4),
+        "gpt4o_price": tri(p["gpt4o_price"], 0.5, 1.5),
+        "backend_price": p["backend_price"],
+        "worker_price": p["worker_price"],
+        "fixed_monthly": p["fixed_monthly"],
+        "traffic_per_user": p["traffic_per_user"],
+    }
+
+
+def _sample(rng, spec, size):
+    """Число - константа; иначе (вид, параметры...) для numpy.random.Generator."""
+    if not isinstance(spec, (tuple, list)):
+        return np.full(size, float(spec))
+    kind, *args = spec
+    if kind == "normal":
+        return rng.normal(args[0], args[1], size)
+    if kind == "lognormal":
+        return rng.lognormal(args[0], args[1], size)
+    if kind == "uniform":
+        return rng.uniform(args[0], args[1], size)
+    if kind == "triangular":
+        low, mode, high = args
+        if low == high:
+            return np.full(size, float(mode))
+        return rng.triangular(low, mode, high, size)
+    raise ValueError(f"неизвестное распределение {kind!r}")
+
+
+def simulate_paths(distributions, months, size, rng):
+    """Траектории помесячных расходов: массивы (size, months)."""
+    d = {name: _sample(rng, spec, size) for name, spec in distributions.items()
+         if name != "growth"}
+    # рост разыгрывается отдельно для каждого месяца
+    growth = _sample(rng, distributions["growth"], (size, months - 1)) if months > 1 \
+        else np.empty((size, 0))
+    factors = np.maximum(1 + growth / 100, 0.0)
+    users = np.empty((size, months))
+    users[:, 0] = d["users"]
+    users[:, 1:] = d["users"][:, None] * np.cumprod(factors, axis=1)
+
+    ai = users * (d["tryons_per_user"] * d["pixelcut_price"]
+                  + d["videos_per_user"] * d["video_price"]
+                  + d["llm_per_user"] * d["gpt4o_price"] * TOKENS_K_PER_REQUEST)[:, None]
+    servers = np.ceil(np.round(users / d["users_per_server"][:, None], 12))
+    workers = np.ceil(np.round(servers / 2, 12))
+    infra = (d["backend_price"][:, None] * servers + d["worker_price"][:, None] * workers
+             + d["fixed_monthly"][:, None])
+    traffic = users * d["traffic_per_user"][:, None]
+    monthly = ai + infra + traffic
+    return {"users": users, "monthly": monthly, "cumulative": np.cumsum(monthly, axis=1)}
+
+
+def _histogram(values):
+    months = values.shape[1]
+    index = np.clip(np.searchsorted(_EDGES, values, side="right") - 1, 0, len(_EDGES) - 2)
+    index += np.arange(months) * (len(_EDGES) - 1)
+    return np.bincount(index.ravel(), minlength=months * (len(_EDGES) - 1)) \
+        .reshape(months, len(_EDGES) - 1)
+
+
+def _simulate_chunk(task):
+    distributions, months, size, seed = task
+    paths = simulate_paths(distributions, months, size, np.random.default_rng(seed))
+    return {name: (_histogram(values), values.sum(axis=0)) for name, values in paths.items()}
+
+
+def _quantiles(counts, percentiles):
+    """Квантили по гистограмме с геометрической интерполяцией внутри корзины."""
+    total = counts[0].sum()
+    cum = np.cumsum(counts, axis=1)
+    result = {}
+    for p in percentiles:
+        target = p / 100 * total
+        row = []
+        for m in range(counts.shape[0]):
+            b = int(np.searchsorted(cum[m], target, side="left"))
+            b = min(b, counts.shape[1] - 1)
+            before = cum[m, b - 1] if b else 0
+            frac = (target - before) / counts[m, b] if counts[m, b] else 0.0
+            low, high = _EDGES[b], _EDGES[b + 1]
+            row.append(float(low + (high - low) * frac if low == 0 else low * (high / low) ** frac))
+        result[f"p{p:g}"] = row
+    return result
+
+
+def simulate(n_paths, months=6, distributions=None, seed=0, workers=None,
+             chunk_size=CHUNK_SIZE, percentiles=PERCENTILES):
+    """
+    Monte Carlo прогноз. Возвращает помесячные квантили и среднее для
+    пользователей, расходов за месяц и накопительных расходов.
+    """
+    if months < 1:
+        raise ValueError("months должен быть >= 1")
+    distributions = distributions or default_distributions()
+    sizes = [min(chunk_size, n_paths - start) for start in range(0, n_paths, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(distributions, months, size, s) for size, s in zip(sizes, seeds)]
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) == 1:
+        merged = _merge(map(_simulate_chunk, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            merged = _merge(pool.map(_simulate_chunk, tasks))
+
+    report = {"paths": n_paths, "months": list(range(1, months + 1)), "seed": seed}
+    for name, (counts, sums) in merged.items():
+        stats = _quantiles(counts, percentiles)
+        stats["mean"] = (sums / n_paths).tolist()
+        report[name] = stats
+    return report
+
+
+def _merge(results):
+    merged = {}
+    for chunk in results:
+        for name, (counts, sums) in chunk.items():
+            if name in merged:
+                merged[name][0] += counts
+                merged[name][1] += sums
+            else:
+                merged[name] = [counts, sums]
+    return merged
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Monte Carlo прогноз расходов")
+    parser.add_argument("--paths", type=int, default=100_000)
+    parser.add_argument("--months", type=int, default=6)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    print(json.dumps(simulate(args.paths, args.months, seed=args.seed, workers=args.workers),
+                     ensure_ascii=False, indent=2))
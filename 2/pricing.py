@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Каталог цен калькулятора (pricing.json).
+
+Каталог - единственный источник цен: из него собираются таблицы листов
+AI_Generation, Infrastructure, Traffic и Token_Calculator, а прогноз,
+Monte Carlo и разбор журналов берут цены через индекс по ключу
+'провайдер/модель/операция':
+
+    from pricing import load_catalog
+    catalog = load_catalog()
+    catalog.price("pixelcut/try-on/tryon")        # 0.1
+    catalog.cell("pixelcut/try-on/tryon")         # 'AI_Generation!B5'
+
+load_catalog() запоминает разобранный каталог и перечитывает файл,
+только если у него изменились время модификации или размер.
+
+Позиция каталога - одна строка листа. quantity - формула количества
+(или число для фиксированных ежемесячных позиций), per_user - количество
+на пользователя текущего месяца (=CONTROL!B22*per_user). У позиций
+Token_Calculator вместо price - input/output ($ за 1M токенов) и tokens.
+"""
+
+import copy
+import json
+import os
+from collections import namedtuple
+
+CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pricing.json")
+
+# Первая строка таблиц на листах цен (строка 3 - заголовки)
+TABLE_ROW = 4
+
+TOKEN_SHEET = "Token_Calculator"
+
+# Колонка "Итого ($)" на листах цен
+TOTAL_COLUMNS = {"AI_Generation": "D", "Infrastructure": "D", "Traffic": "D", TOKEN_SHEET: "F"}
+
+Item = namedtuple("Item", "key sheet row spec")
+
+
+def item_key(provider, model, operation):
+    return f"{provider}/{model}/{operation}"
+
+
+class Catalog:
+    """Разобранный каталог: таблицы листов и индексы позиций."""
+
+    def __init__(self, data, path=None):
+        self.data = data
+        self.path = path
+        self.tables = {}
+        self.sections = {}
+        self.total_rows = {}
+        self.items = {}
+        self.by_operation = {}
+        self.by_model = {}
+        for sheet, spec in data["sheets"].items():
+            self._compile(sheet, spec)
+
+    def _compile(self, sheet, spec):
+        if sheet not in TOTAL_COLUMNS:
+            raise ValueError(f"неизвестный лист каталога {sheet!r}")
+        width = 6 if sheet == TOKEN_SHEET else 5
+        rows = []
+        for section in spec["sections"]:
+            if rows:
+                rows.append(("",) * width)
+            rows.append((section["title"],) + ("",) * (width - 1))
+            for entry in section["items"]:
+                row = TABLE_ROW + len(rows)
+                key = item_key(entry["provider"], entry["model"], entry["operation"])
+                if key in self.items:
+                    raise ValueError(f"позиция {key!r} встречается в каталоге дважды")
+                item = self.items[key] = Item(key, sheet, row, entry)
+                self.by_operation.setdefault(entry["operation"], []).append(item)
+                self.by_model.setdefault(entry["model"], []).append(item)
+                rows.append(_table_row(sheet, entry, row))
+        self.tables[sheet] = rows
+        self.sections[sheet] = [section["title"] for section in spec["sections"]]
+        last_row = TABLE_ROW + len(rows) - 1
+        self.total_rows[sheet] = max(spec.get("total_row", 0), last_row + 2)
+
+    def __getitem__(self, key):
+        try:
+            return self.items[key]
+        except KeyError:
+            raise KeyError(f"позиции {key!r} нет в каталоге цен") from None
+
+    def __contains__(self, key):
+        return key in self.items
+
+    def replace(self, key, **fields):
+        """Копия каталога, в которой у позиции key заменены поля (price, quantity, note...)."""
+        self[key]  # KeyError, если позиции нет
+        data = copy.deepcopy(self.data)
+        for spec in data["sheets"].values():
+            for section in spec["sections"]:
+                for entry in section["items"]:
+                    if item_key(entry["provider"], entry["model"], entry["operation"]) == key:
+                        entry.update(fields)
+        return Catalog(data)
+
+    def price(self, key):
+        return self[key].spec["price"]
+
+    def cell(self, key, column="B", absolute=False):
+        """Ячейка позиции: B - цена, C - количество, D - итог."""
+        item = self[key]
+        if absolute:
+            return f"{item.sheet}!${column}${item.row}"
+        return f"{item.sheet}!{column}{item.row}"
+
+    def table(self, sheet):
+        """Строки листа начиная с TABLE_ROW (секции, позиции, пустые строки)."""
+        return self.tables[sheet]
+
+    def sheet_items(self, sheet):
+        return [item for item in self.items.values() if item.sheet == sheet]
+
+    def total_cell(self, sheet):
+        return f"{sheet}!{TOTAL_COLUMNS[sheet]}{self.total_rows[sheet]}"
+
+    def total_formula(self, sheet):
+        col = TOTAL_COLUMNS[sheet]
+        return f"=SUM({col}{TABLE_ROW + 1}:{col}{self.total_rows[sheet] - 1})"
+
+    def fixed_items(self, sheet, exclude=()):
+        """Позиции с постоянным количеством (ежемесячные подписки), кроме exclude."""
+        return [item for item in self.sheet_items(sheet)
+                if isinstance(item.spec.get("quantity"), (int, float)) and item.key not in exclude]
+
+    def per_user_items(self, sheet):
+        return [item for item in self.sheet_items(sheet) if "per_user" in item.spec]
+
+    def fixed_monthly(self, sheet, exclude=()):
+        return sum(item.spec["price"] * item.spec["quantity"]
+                   for item in self.fixed_items(sheet, exclude))
+
+    def per_user_cost(self, sheet):
+        return sum(item.spec["price"] * item.spec["per_user"] for item in self.per_user_items(sheet))
+
+
+def _quantity(entry):
+    if "per_user" in entry:
+        return f"=CONTROL!B22*{entry['per_user']:g}"
+    return entry["quantity"]
+
+
+def _table_row(sheet, entry, r):
+    if sheet == TOKEN_SHEET:
+        if entry["output"]:
+            total = f"=(B{r}*D{r}/1000000+C{r}*D{r}/1000000)*E{r}"
+        else:
+            total = f"=B{r}*D{r}/1000000*E{r}"
+        return (entry["name"], entry["input"], entry["output"], entry["tokens"],
+                _quantity(entry), total)
+    return (entry["name"], entry["price"], _quantity(entry), f"=B{r}*C{r}", entry.get("note", ""))
+
+
+_loaded = {}
+
+
+def load_catalog(path=None):
+    """Каталог из файла; повторные вызовы без изменений файла не читают его заново."""
+    path = os.path.abspath(path or CATALOG_PATH)
+    stat = os.stat(path)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    cached = _loaded.get(path)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    with open(path, encoding="utf-8") as f:
+        catalog = Catalog(json.load(f), path)
+    _loaded[path] = (stamp, catalog)
+    return catalog
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Замеры сборки книги по этапам: построители листов и запись файла.
+
+Для каждого этапа пишется время, выделенная память (tracemalloc: прирост
+и пик за этап), число ячеек листа, ячеек со стилем и разных стилей на
+листе. Замеры включаются только по запросу:
+
+    from create_calculator import build_workbook
+    from profiling import BuildProfiler
+
+    profiler = BuildProfiler(on_end=lambda stage, record: statsd.timing(stage, record["seconds"]))
+    build_workbook(horizon=120, profiler=profiler).save("calc.xlsx")
+    print(profiler.to_json())
+
+    python create_calculator.py --horizon 120 --profile            # JSON в stdout
+    python create_calculator.py --horizon 120 --profile build.json
+
+on_start(stage) и on_end(stage, record) вызываются до и после каждого
+этапа - через них замеры уходят во внешнюю систему метрик. У листов,
+которые пишутся потоково (write-only), ячейки уходят в файл сразу и не
+считаются: cells, styled_cells и styles - null.
+"""
+
+import json
+import time
+import tracemalloc
+
+
+def sheet_counts(ws):
+    """
+    (ячеек, ячеек со стилем, разных стилей) листа; None для потокового
+    листа.
+    """
+    if hasattr(ws, "_get_writer"):  # WriteOnlyWorksheet openpyxl
+        return None, None, None
+    cells = ws._cells
+    styles = {tuple(cell._style) for cell in cells.values() if cell.has_style}
+    return len(cells), sum(1 for cell in cells.values() if cell.has_style), len(styles)
+
+
+class BuildProfiler:
+    """Замеры этапов сборки; memory=False - без tracemalloc (он замедляет сборку)."""
+
+    def __init__(self, on_start=None, on_end=None, memory=True):
+        self.on_start = on_start
+        self.on_end = on_end
+        self.memory = memory
+        self.stages = []
+        self._started_tracing = False
+
+    def _memory(self):
+        if not self.memory:
+            return None
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        tracemalloc.reset_peak()
+        return tracemalloc.get_traced_memory()[0]
+
+    def call(self, stage, func, *args):
+        """
+        Выполняет func(*args) как этап stage. Если func вернула лист,
+        в замер попадают его имя и число ячеек.
+        """
+        if self.on_start:
+            self.on_start(stage)
+        before = self._memory()
+        started = time.perf_counter()
+        result = func(*args)
+        record = {"stage": stage, "seconds": time.perf_counter() - started}
+        if before is not None:
+            current, peak = tracemalloc.get_traced_memory()
+            record["allocated_bytes"] = current - before
+            record["peak_bytes"] = peak - before
+        if hasattr(result, "title"):
+            record["sheet"] = result.title
+            record["cells"], record["styled_cells"], record["styles"] = sheet_counts(result)
+        self.stages.append(record)
+        if self.on_end:
+            self.on_end(stage, record)
+        return result
+
+    def close(self):
+        """Останавливает tracemalloc, если его запустил этот профилировщик."""
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def report(self):
+        total = {"seconds": sum(record["seconds"] for record in self.stages)}
+        if self.memory:
+            total["peak_bytes"] = max((record["peak_bytes"] for record in self.stages), default=0)
+        cells = [record.get("cells") for record in self.stages]
+        total["cells"] = sum(c for c in cells if c is not None)
+        return {"stages": self.stages, "total": total}
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.report(), ensure_ascii=False, **kwargs)
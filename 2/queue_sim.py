@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Дискретно-событийная модель очереди AI-задач (Worker Server) для подбора
+числа воркеров.
+
+Лист Infrastructure считает воркеры как CEILING(серверы / 2) и ничего не
+говорит о задержках. Здесь месяц задач моделируется напрямую:
+
+    задачи  = пользователи текущего месяца (CONTROL!B22) * примерок, видео
+              и LLM-запросов на пользователя (CONTROL!B10-B12)
+    приход  = неоднородный пуассоновский поток по суточному профилю
+              (вечерний пик и т.п.), одинаковый для всех дней месяца
+    очередь = одна FIFO-очередь на workers * slots параллельных слотов;
+              время обработки задачи - логнормальное со средним и
+              коэффициентом вариации своего типа
+
+Занятость слотов хранится в куче (heapq): задача берет слот, который
+освободится раньше всех. Месяц для 100 тыс. пользователей (~900 тыс.
+задач) считается примерно за секунду. min_workers() ищет наименьшее
+число воркеров, при котором перцентиль ожидания не больше SLO; все
+прогоны используют один и тот же поток задач.
+
+    python queue_sim.py users=100000 --slo 30 --percentile 95
+    python queue_sim.py users=100000 --slo 30 --xlsx sized.xlsx
+"""
+
+import argparse
+import heapq
+import json
+import math
+import time
+
+import numpy as np
+
+from cost_model import WORKER, evaluate, parse_inputs
+from pricing import load_catalog
+
+DAYS = 30
+DAY_SECONDS = 24 * 3600
+
+# Ячейки CONTROL с объемами задач за месяц
+JOB_CELLS = {"tryon": "CONTROL!B23", "video": "CONTROL!B24", "llm": "CONTROL!B25"}
+
+# Время обработки задачи в слоте воркера: (среднее, с; коэффициент вариации)
+SERVICE_TIMES = {"tryon": (12.0, 0.5), "video": (90.0, 0.6), "llm": (4.0, 0.8)}
+
+# Параллельных задач на один Worker Server
+SLOTS_PER_WORKER = 4
+
+# Суточные профили прихода задач: доля суток по часам 0-23 (нормируются)
+PROFILES = {
+    "flat": [1] * 24,
+    "evening": [2, 1, 1, 1, 1, 1, 2, 3, 4, 5, 5, 5,
+                5, 5, 5, 5, 6, 7, 9, 11, 12, 10, 7, 4],
+    "business": [1, 1, 1, 1, 1, 1, 2, 4, 7, 9, 10, 10,
+                 9, 10, 10, 9, 8, 6, 4, 3, 2, 2, 1, 1],
+}
+DEFAULT_PROFILE = "evening"
+
+
+def _profile(profile):
+    weights = np.asarray(PROFILES[profile] if isinstance(profile, str) else profile, float)
+    if (weights.ndim != 1 or weights.size == 0 or not np.isfinite(weights).all()
+            or (weights < 0).any() or weights.sum() <= 0):
+        raise ValueError("профиль - непустой список неотрицательных весов")
+    return weights / weights.sum()
+
+
+def monthly_jobs(inputs=None, catalog=None):
+    """Задач за месяц по типам из модели: {'tryon': ..., 'video': ..., 'llm': ...}."""
+    values = evaluate(inputs, catalog=catalog)
+    return {kind: float(values[cell]) for kind, cell in JOB_CELLS.items()}
+
+
+def generate_jobs(jobs, profile=DEFAULT_PROFILE, service_times=None, days=DAYS, seed=0):
+    """
+    Поток задач за days суток: (время прихода, время обработки, тип) -
+    массивы, отсортированные по времени прихода. jobs - задач за месяц
+    (30 дней) по типам.
+    """
+    service_times = {**SERVICE_TIMES, **(service_times or {})}
+    shares = _profile(profile)
+    bin_seconds = DAY_SECONDS / shares.size
+    starts = (np.arange(days)[:, None] * DAY_SECONDS
+              + np.arange(shares.size)[None, :] * bin_seconds).ravel()
+    rng = np.random.default_rng(np.random.SeedSequence(seed))
+    arrivals, services, kinds = [], [], []
+    for index, (kind, count) in enumerate(jobs.items()):
+        counts = rng.poisson(np.tile(shares, days) * count / DAYS)
+        n = int(counts.sum())
+        arrivals.append(np.repeat(starts, counts) + rng.random(n) * bin_seconds)
+        mean, cv = service_times[kind]
+        sigma2 = math.log1p(cv * cv)
+        services.append(rng.lognormal(math.log(mean) - sigma2 / 2, math.sqrt(sigma2), n))
+        kinds.append(np.full(n, index, np.int8))
+    arrivals = np.concatenate(arrivals)
+    order = np.argsort(arrivals, kind="stable")
+    return arrivals[order], np.concatenate(services)[order], np.concatenate(kinds)[order]
+
+
+def simulate_queue(arrivals, services, servers):
+    """Ожидания в FIFO-очереди с servers параллельными слотами (массив, с)."""
+    free = [0.0] * servers
+    waits = []
+    append = waits.append
+    replace = heapq.heapreplace
+    for arrival, service in zip(arrivals.tolist(), services.tolist()):
+        start = free[0]
+        if start < arrival:
+            start = arrival
+        replace(free, start + service)
+        append(start - arrival)
+    return np.asarray(waits)
+
+
+def _stats(waits, percentiles):
+    if waits.size == 0:
+        return {"jobs": 0, "mean": 0.0, **{f"p{p:g}": 0.0 for p in percentiles}}
+    values = np.percentile(waits, percentiles)
+    return {"jobs": int(waits.size), "mean": float(waits.mean()),
+            **{f"p{p:g}": float(v) for p, v in zip(percentiles, values)}}
+
+
+def _peak_load(arrivals, services, days):
+    """Средняя занятость слотов (в слотах) в самый загруженный час."""
+    hours = np.minimum((arrivals // 3600).astype(np.int64), days * 24 - 1)
+    return np.bincount(hours, services, days * 24).max() / 3600
+
+
+def report(flow, workers, slots=SLOTS_PER_WORKER, percentiles=(50, 95, 99),
+           names=tuple(SERVICE_TIMES), days=DAYS):
+    """Перцентили ожидания (всего и по типам задач) и загрузка воркеров."""
+    arrivals, services, kinds = flow
+    servers = workers * slots
+    waits = simulate_queue(arrivals, services, servers)
+    result = {"workers": workers, "slots": servers, "wait": _stats(waits, percentiles),
+              "by_type": {name: _stats(waits[kinds == i], percentiles)
+                          for i, name in enumerate(names)}}
+    result["utilization"] = float(services.sum() / (servers * days * DAY_SECONDS))
+    result["peak_hour_utilization"] = float(_peak_load(arrivals, services, days) / servers)
+    return result
+
+
+def _meets(flow, workers, slots, slo, percentile):
+    waits = simulate_queue(flow[0], flow[1], workers * slots)
+    return waits.size == 0 or np.percentile(waits, percentile) <= slo
+
+
+def min_workers(flow, slo, percentile=95, slots=SLOTS_PER_WORKER, days=DAYS):
+    """
+    Наименьшее число воркеров, при котором перцентиль ожидания <= slo
+    секунд. Поиск начинается с загрузки слотов < 1 в пиковый час: если
+    SLO там выполняется (мягкий SLO выдерживает очередь в пик), нужное
+    число ищется ниже, иначе - удвоением выше; дальше бинарный поиск.
+    """
+    if slo < 0:
+        raise ValueError("slo должен быть >= 0")
+    arrivals, services, _ = flow
+    if arrivals.size == 0:
+        return 1
+    start = max(1, math.ceil(_peak_load(arrivals, services, days) / slots))
+    if _meets(flow, start, slots, slo, percentile):
+        low, high = 0, start     # 0 воркеров SLO не выполняют
+    else:
+        low, high = start, start * 2
+        while not _meets(flow, high, slots, slo, percentile):
+            low, high = high, high * 2
+    # при low SLO не выполняется, при high - выполняется
+    while high - low > 1:
+        middle = (low + high) // 2
+        if _meets(flow, middle, slots, slo, percentile):
+            high = middle
+        else:
+            low = middle
+    return high
+
+
+def size_workers(inputs=None, slo=30.0, percentile=95, slots=SLOTS_PER_WORKER,
+                 profile=DEFAULT_PROFILE, service_times=None, seed=0, catalog=None):
+    """Подбор воркеров под SLO для вводных CONTROL: отчет прогона с найденным числом."""
+    jobs = monthly_jobs(inputs, catalog)
+    flow = generate_jobs(jobs, profile, service_times, seed=seed)
+    workers = min_workers(flow, slo, percentile, slots)
+    result = report(flow, workers, slots)
+    result.update({"jobs_per_month": jobs, "slo": {"seconds": slo, "percentile": percentile}})
+    return result
+
+
+def sized_catalog(workers, slo, percentile=95, catalog=None):
+    """Каталог, в котором количество Worker Server - найденное число воркеров."""
+    catalog = load_catalog() if catalog is None else catalog
+    note = f"Очередь: p{percentile:g} ожидания <= {slo:g} с"
+    return catalog.replace(WORKER, quantity=workers, note=note)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Моделирование очереди AI-задач")
+    parser.add_argument("inputs", nargs="*", metavar="name=value",
+                        help="вводные CONTROL, например users=100000")
+    parser.add_argument("--slo", type=float, default=30.0, help="допустимое ожидание, с")
+    parser.add_argument("--percentile", type=float, default=95)
+    parser.add_argument("--slots", type=int, default=SLOTS_PER_WORKER,
+                        help="параллельных задач на воркер")
+    parser.add_argument("--profile", default=DEFAULT_PROFILE,
+                        help=f"{', '.join(PROFILES)} или 24 веса через запятую")
+    parser.add_argument("--service", action="append", default=[], metavar="type=mean[:cv]",
+                        help="время обработки, например video=120:0.5")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--catalog", help="каталог цен (по умолчанию pricing.json)")
+    parser.add_argument("--xlsx", help="собрать книгу с найденным числом воркеров")
+    args = parser.parse_args()
+
+    inputs = parse_inputs(args.inputs, parser)
+    service_times = {}
+    for arg in args.service:
+        name, _, value = arg.partition("=")
+        if name not in SERVICE_TIMES:
+            parser.error(f"--service {arg!r}: тип задачи - один из {', '.join(SERVICE_TIMES)}")
+        mean, _, cv = value.partition(":")
+        try:
+            mean, cv = float(mean), float(cv) if cv else SERVICE_TIMES[name][1]
+        except ValueError:
+            parser.error(f"--service {arg!r}: ожидается {name}=среднее[:cv]")
+        if not (0 < mean < math.inf and 0 <= cv < math.inf):
+            parser.error(f"--service {arg!r}: среднее > 0, cv >= 0")
+        service_times[name] = (mean, cv)
+    profile = args.profile
+    if profile not in PROFILES:
+        try:
+            profile = [float(w) for w in profile.split(",")]
+            _profile(profile)
+        except ValueError as error:
+            parser.error(f"--profile {args.profile!r}: {', '.join(PROFILES)} или веса "
+                         f"через запятую ({error})")
+
+    started = time.perf_counter()
+    catalog = load_catalog(args.catalog)
+    result = size_workers(inputs, args.slo, args.percentile, args.slots, profile,
+                          service_times, args.seed, catalog)
+    result["seconds"] = round(time.perf_counter() - started, 2)
+    if args.xlsx:
+        from create_calculator import save_workbook
+        save_workbook(args.xlsx, inputs=inputs,
+                      catalog=sized_catalog(result["workers"], args.slo, args.percentile, catalog))
+        result["xlsx"] = args.xlsx
+    print(json.dumps(result, ensure_ascii=False, indent=2))
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Чувствительность итогов к вводным и ценам (tornado-анализ).
+
+Каждая вводная CONTROL и каждая цена листов AI_Generation,
+Infrastructure, Traffic и Token_Calculator (вход и выход $/1M) по
+очереди сдвигается на -X% и +X%; остальные остаются базовыми. Все
+2 * N + 1 сценариев (база и сдвиги) считаются одним векторным проходом
+модели, как в sweep.py.
+
+Результат - таблица, отсортированная по размаху TOTAL!B10 (или другого
+показателя rank_by): для каждого параметра значения итога и unit
+economics (стоимость пользователя, примерки, видео, образа) при -X% и +X%.
+
+    from sensitivity import tornado
+    rows = tornado({"users": 8000}, percent=10)
+    rows[0]["parameter"], rows[0]["total"]["swing"]
+
+    python sensitivity.py users=8000 --percent 10 --top 15
+    python sensitivity.py --percent 20 --xlsx calc.xlsx    # книга с листом Sensitivity
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from cost_model import (
+    CONTROL_DATA, CONTROL_INPUTS, CONTROL_ROW, PRICE_SHEETS, compiled_model, outputs,
+    parse_inputs, resolve_inputs,
+)
+from formula import column_letter, split_key
+from pricing import TOKEN_SHEET, load_catalog
+
+# Показатели, для которых считается чувствительность
+TARGETS = ["total", "cost_per_user", "cost_per_tryon", "cost_per_video", "full_look_cost"]
+TARGET_LABELS = {"total": "ИТОГО", "cost_per_user": "$/пользователь", "cost_per_tryon": "$/примерка",
+                 "cost_per_video": "$/видео", "full_look_cost": "$/образ"}
+
+# Месяц расчета - точка прогноза, а не допущение; его сдвиг на X% смысла не имеет
+FIXED_INPUTS = {"month"}
+
+SHEET_NAME = "Sensitivity"
+
+
+def parameters(catalog=None):
+    """{имя параметра: (ячейка, подпись)} - вводные CONTROL и цены каталога."""
+    catalog = load_catalog() if catalog is None else catalog
+    params = {}
+    for name, key in CONTROL_INPUTS.items():
+        if name not in FIXED_INPUTS:
+            _, row, _ = split_key(key)
+            params[name] = (key, CONTROL_DATA[row - CONTROL_ROW][0])
+    for sheet in PRICE_SHEETS:
+        for item in catalog.sheet_items(sheet):
+            if sheet != TOKEN_SHEET:
+                params[item.key] = (catalog.cell(item.key), item.spec["name"])
+                continue
+            params[f"{item.key}:input"] = (catalog.cell(item.key, "B"), f"{item.spec['name']} (вход)")
+            if item.spec["output"]:
+                params[f"{item.key}:output"] = (catalog.cell(item.key, "C"),
+                                                f"{item.spec['name']} (выход)")
+    return params
+
+
+def _column(value, size):
+    if isinstance(value, str):  # ошибка Excel (#DIV/0! и т.п.)
+        value = np.nan
+    return np.broadcast_to(np.asarray(value, dtype=float), (size,))
+
+
+def tornado(inputs=None, percent=10.0, targets=TARGETS, rank_by="total", catalog=None):
+    """
+    Чувствительность targets к сдвигу каждого параметра на -percent% и
+    +percent%. Строки отсортированы по убыванию размаха rank_by.
+    """
+    catalog = load_catalog() if catalog is None else catalog
+    if rank_by not in targets:
+        raise ValueError(f"rank_by должен быть одним из {list(targets)}")
+    params = parameters(catalog)
+    names = outputs(catalog)
+    out_keys = {target: names[target] for target in targets}
+    model = compiled_model(catalog=catalog)
+    base_inputs = resolve_inputs(inputs)
+    base = model.evaluate(base_inputs)
+
+    # сценарий 0 - база, 2i+1 и 2i+2 - параметр i при -X% и +X%
+    size = 2 * len(params) + 1
+    factor = percent / 100
+    columns = {}
+    for i, (cell, _) in enumerate(params.values()):
+        column = np.full(size, float(base[cell]))
+        column[2 * i + 1] *= 1 - factor
+        column[2 * i + 2] *= 1 + factor
+        columns[cell] = column
+    with np.errstate(divide="ignore", invalid="ignore"):
+        values = model.evaluate({**base_inputs, **columns}, targets=out_keys.values())
+    results = {target: _column(values[key], size) for target, key in out_keys.items()}
+
+    rows = []
+    for i, (name, (cell, label)) in enumerate(params.items()):
+        row = {"parameter": name, "cell": cell, "label": label, "base": float(base[cell])}
+        for target, column in results.items():
+            low, high = float(column[2 * i + 1]), float(column[2 * i + 2])
+            row[target] = {"base": float(column[0]), "low": low, "high": high,
+                           "swing": abs(high - low)}
+        rows.append(row)
+    rows.sort(key=lambda row: -np.nan_to_num(row[rank_by]["swing"], nan=-1.0))
+    return rows
+
+
+def build_sensitivity(book, rows, percent, targets=TARGETS):
+    """Лист Sensitivity в книге Calculator: изменение показателей при -X% и +X%."""
+    from create_calculator import add_headers, add_title, set_column_widths
+    from styles import write_row
+
+    ws = book.new_sheet(SHEET_NAME)
+    width = 3 + 2 * len(targets)
+    add_title(ws, f"ЧУВСТВИТЕЛЬНОСТЬ: ИЗМЕНЕНИЕ ПРИ ±{percent:g}%", f"A1:{column_letter(width)}1")
+    headers = ["Параметр", "Ячейка", "Значение"]
+    for target in targets:
+        label = TARGET_LABELS.get(target, target)
+        headers += [f"{label} -{percent:g}%", f"{label} +{percent:g}%"]
+    add_headers(ws, 3, headers)
+    for i, row in enumerate(rows, 4):
+        values = [row["label"], row["cell"], row["base"]]
+        for target in targets:
+            stats = row[target]
+            values += [_delta(stats["low"], stats["base"]), _delta(stats["high"], stats["base"])]
+        write_row(ws, i, values, "calc_cell")
+    set_column_widths(ws, [35, 22, 12] + [16] * (2 * len(targets)))
+    return ws
+
+
+def _delta(value, base):
+    delta = value - base
+    return None if np.isnan(delta) else round(delta, 6)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Чувствительность итогов к вводным и ценам")
+    parser.add_argument("inputs", nargs="*", metavar="name=value",
+                        help="вводные CONTROL, например users=8000 growth=20")
+    parser.add_argument("--percent", type=float, default=10.0)
+    parser.add_argument("--rank-by", default="total", choices=TARGETS)
+    parser.add_argument("--top", type=int, default=20, help="сколько параметров показать")
+    parser.add_argument("--catalog", help="каталог цен (по умолчанию pricing.json)")
+    parser.add_argument("--xlsx", help="собрать книгу с листом Sensitivity")
+    args = parser.parse_args()
+
+    inputs = parse_inputs(args.inputs, parser)
+    catalog = load_catalog(args.catalog)
+
+    started = time.perf_counter()
+    rows = tornado(inputs, args.percent, rank_by=args.rank_by, catalog=catalog)
+    elapsed = time.perf_counter() - started
+    if args.xlsx:
+        from create_calculator import build_workbook
+        book = build_workbook(inputs=inputs, catalog=catalog)
+        build_sensitivity(book, rows, args.percent)
+        book.save(args.xlsx)
+    print(json.dumps({"percent": args.percent, "parameters": len(rows),
+                      "seconds": round(elapsed, 3), "rows": rows[:args.top]},
+                     ensure_ascii=False, indent=2))
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Локальный HTTP/JSON сервис расчета расходов (asyncio, только stdlib).
+
+Модель и каталог загружаются один раз и остаются в памяти; каталог
+перечитывается, только если pricing.json изменился (load_catalog()).
+Одинаковые запросы отвечаются из LRU-кэша ограниченного размера, а
+одновременные одинаковые запросы ждут один и тот же расчет.
+
+    GET  /health
+    GET  /cost?users=8000&growth=20&horizon=36
+    POST /cost   {"inputs": {"users": 8000}, "horizon": 36, "daily": false}
+    GET  /xlsx?users=8000
+    POST /xlsx   {"inputs": {"users": 8000}, "horizon": 60, "values": true}
+
+/cost отвечает ключевыми результатами модели (summary()) и прогнозом на
+horizon периодов (лист прогноза книги): пользователи и расходы по
+периодам, итог за горизонт. Расчет идет в потоке: для прогретой модели
+он занимает доли миллисекунды, но новый горизонт сначала компилирует
+модель (секунды для тысяч периодов), и цикл событий в это время
+обслуживает другие запросы. Книги для /xlsx собираются в пуле процессов
+(openpyxl импортируется в каждом процессе один раз), поэтому сборка не
+блокирует цикл и другие запросы; готовый xlsx отдается частями по
+CHUNK_SIZE байт.
+
+    python service.py --port 8765 --workers 4
+    curl -s 'localhost:8765/cost?users=8000' | jq .
+    curl -s -X POST localhost:8765/xlsx -d '{"inputs": {"users": 8000}}' -o calc.xlsx
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qsl, urlsplit
+
+from cost_model import CONTROL_INPUTS, FORECAST_MONTHS, check_horizon, evaluate, summary
+from export import forecast_table
+from pricing import load_catalog
+
+CACHE_SIZE = 1024
+XLSX_CACHE_SIZE = 64
+CHUNK_SIZE = 64 * 1024
+MAX_BODY = 1 << 20
+
+XLSX_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# Параметры запроса, которые не являются вводными CONTROL
+OPTIONS = {"horizon", "daily", "values"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class LRUCache:
+    """Кэш на maxsize записей; вытесняется давно не использованная."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def stats(self):
+        return {"size": len(self._data), "maxsize": self.maxsize,
+                "hits": self.hits, "misses": self.misses}
+
+
+def _workbook(options):
+    """Сборка xlsx в процессе пула."""
+    from create_calculator import workbook_bytes
+
+    return workbook_bytes(**options)
+
+
+def _warm_worker():
+    import openpyxl  # noqa: F401  импорт один раз на процесс
+
+
+def forecast(values, horizon, daily):
+    """Прогноз для ответа /cost: пользователи и расходы по периодам, итог за горизонт."""
+    table = forecast_table(values, horizon, daily)
+    return {"unit": table["unit"][0], "users": table["users"], "cost": table["total"],
+            "total": table["cumulative"][-1]}
+
+
+def parse_request(query, body):
+    """Вводные и параметры из query string или JSON-тела: (inputs, horizon, daily, values)."""
+    if body:
+        try:
+            params = json.loads(body)
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "тело запроса - не JSON") from None
+        if not isinstance(params, dict):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "ожидается JSON-объект")
+        inputs = params.get("inputs", {k: v for k, v in params.items() if k not in OPTIONS})
+        if not isinstance(inputs, dict):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "inputs должен быть JSON-объектом")
+    else:
+        params = dict(parse_qsl(query))
+        inputs = {k: v for k, v in params.items() if k not in OPTIONS}
+    unknown = sorted(set(inputs) - set(CONTROL_INPUTS))
+    if unknown:
+        raise HTTPError(HTTPStatus.BAD_REQUEST,
+                        f"неизвестные вводные {unknown}; допустимы {sorted(CONTROL_INPUTS)}")
+    try:
+        inputs = {name: float(value) for name, value in inputs.items()}
+        horizon = check_horizon(int(params.get("horizon", FORECAST_MONTHS)))
+    except (KeyError, TypeError, ValueError) as exc:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, exc.args[0] if exc.args else str(exc)) from None
+    daily = str(params.get("daily", "")).lower() in ("1", "true", "yes")
+    values = str(params.get("values", "")).lower() in ("1", "true", "yes")
+    return inputs, horizon, daily, values
+
+
+class CostService:
+    """Обработчик запросов: кэши, пул процессов и текущий каталог."""
+
+    def __init__(self, workers=None, cache_size=CACHE_SIZE, xlsx_cache_size=XLSX_CACHE_SIZE,
+                 catalog_path=None):
+        self.catalog_path = catalog_path
+        self.costs = LRUCache(cache_size)
+        self.workbooks = LRUCache(xlsx_cache_size)
+        self._pending = {}
+        self.pool = ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1,
+                                        initializer=_warm_worker)
+        self.started = time.time()
+        evaluate(catalog=self.catalog)  # компиляция модели до первого запроса
+
+    @property
+    def catalog(self):
+        return load_catalog(self.catalog_path)
+
+    async def _cached(self, cache, key, compute):
+        """Значение из cache; одинаковые одновременные запросы ждут один расчет."""
+        value = cache.get(key)
+        if value is not None:
+            return value, True
+        pending = self._pending.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending), True
+        future = asyncio.ensure_future(compute())
+        self._pending[key] = future
+        try:
+            value = await asyncio.shield(future)
+        finally:
+            self._pending.pop(key, None)
+        cache.put(key, value)
+        return value, False
+
+    async def cost(self, query, body):
+        inputs, horizon, daily, _ = parse_request(query, body)
+        catalog = self.catalog
+        key = ("cost", tuple(sorted(inputs.items())), horizon, daily, catalog)
+
+        def calculate():
+            values = evaluate(inputs, horizon, daily, catalog)
+            return summary(values, catalog), forecast(values, horizon, daily)
+
+        async def compute():
+            return await asyncio.get_running_loop().run_in_executor(None, calculate)
+
+        (result, periods), cached = await self._cached(self.costs, key, compute)
+        return {"inputs": inputs, "horizon": horizon, "daily": daily,
+                "summary": result, "forecast": periods, "cached": cached}
+
+    async def xlsx(self, query, body):
+        inputs, horizon, daily, values = parse_request(query, body)
+        catalog = self.catalog
+        key = ("xlsx", tuple(sorted(inputs.items())), horizon, daily, values, catalog)
+        options = {"inputs": inputs, "horizon": horizon, "daily": daily,
+                   "catalog": catalog, "cached_values": values}
+
+        async def compute():
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.pool, _workbook, options)
+
+        data, _ = await self._cached(self.workbooks, key, compute)
+        return data
+
+    def health(self):
+        return {"status": "ok", "uptime": round(time.time() - self.started, 1),
+                "catalog": self.catalog.path, "cost_cache": self.costs.stats(),
+                "xlsx_cache": self.workbooks.stats()}
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+    # ---------- HTTP ----------
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await _read_request(reader)
+                except HTTPError as exc:
+                    # тело не прочитано - соединение дальше не используется
+                    data = json.dumps({"error": str(exc)}, ensure_ascii=False).encode("utf-8")
+                    await _send(writer, exc.status, "application/json; charset=utf-8", data,
+                                keep_alive=False)
+                    break
+                if request is None:
+                    break
+                method, target, headers, body = request
+                keep_alive = headers.get("connection", "").lower() != "close"
+                await self._respond(writer, method, target, body, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, method, target, body, keep_alive):
+        url = urlsplit(target)
+        try:
+            if method not in ("GET", "POST"):
+                raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, f"метод {method} не поддерживается")
+            if url.path == "/health":
+                payload = self.health()
+            elif url.path == "/cost":
+                payload = await self.cost(url.query, body)
+            elif url.path == "/xlsx":
+                data = await self.xlsx(url.query, body)
+                await _send(writer, HTTPStatus.OK, XLSX_TYPE, data, keep_alive,
+                            {"Content-Disposition": 'attachment; filename="calculator.xlsx"'})
+                return
+            else:
+                raise HTTPError(HTTPStatus.NOT_FOUND, f"нет ресурса {url.path}")
+            status = HTTPStatus.OK
+        except HTTPError as exc:
+            status, payload = exc.status, {"error": str(exc)}
+        except Exception as exc:  # ошибка расчета не должна ронять сервис
+            status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": repr(exc)}
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        await _send(writer, status, "application/json; charset=utf-8", data, keep_alive)
+
+
+async def _read_request(reader):
+    """(метод, путь, заголовки, тело) или None, если клиент закрыл соединение."""
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, target, _ = line.decode("latin-1").split(" ", 2)
+    except ValueError:
+        raise ConnectionError("некорректная строка запроса") from None
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "некорректный Content-Length") from None
+    if length < 0:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "некорректный Content-Length")
+    if length > MAX_BODY:
+        raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "слишком большое тело запроса")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), target, headers, body
+
+
+async def _send(writer, status, content_type, data, keep_alive, extra=None):
+    head = [f"HTTP/1.1 {status.value} {status.phrase}",
+            f"Content-Type: {content_type}",
+            f"Content-Length: {len(data)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+    head += [f"{name}: {value}" for name, value in (extra or {}).items()]
+    writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1"))
+    view = memoryview(data)
+    for start in range(0, len(view), CHUNK_SIZE):
+        writer.write(view[start:start + CHUNK_SIZE])
+        await writer.drain()
+    await writer.drain()
+
+
+async def serve(host="127.0.0.1", port=8765, **options):
+    service = CostService(**options)
+    server = await asyncio.start_server(service.handle, host, port)
+    print(f"Сервис расчета: http://{host}:{port}", flush=True)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Локальный сервис расчета расходов")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=None, help="процессов для сборки xlsx")
+    parser.add_argument("--cache-size", type=int, default=CACHE_SIZE)
+    parser.add_argument("--xlsx-cache-size", type=int, default=XLSX_CACHE_SIZE)
+    parser.add_argument("--catalog", help="каталог цен (по умолчанию pricing.json)")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, workers=args.workers, cache_size=args.cache_size,
+                          xlsx_cache_size=args.xlsx_cache_size, catalog_path=args.catalog))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Обратные задачи по модели расходов (аналог Goal Seek в Excel).
+
+    from solver import max_where, min_where
+    # максимум пользователей в месяце 1, при котором TOTAL!B10 <= $20 000
+    max_where("total", 20000, "users", 0, 10**7, integer=True)
+    # рост (%), при котором к 12-му месяцу серверов станет больше 3
+    min_where("servers", 3, "growth", 0, 200, inputs={"month": 12})
+    # цена примерки, при которой $/пользователь <= 1.0
+    max_where("cost_per_user", 1.0, "AI_Generation!B5", 0, 1)
+
+Поиск - многоточечная бисекция: на каждом шаге отрезок делится на
+POINTS точек, которые считаются одним векторным проходом NumPy, и
+берется первая точка, где условие перестает выполняться. Ступенчатые
+функции (CEILING для серверов и воркеров) этому не мешают: ищется
+граница условия, а не корень.
+"""
+
+import math
+
+import numpy as np
+
+from cost_model import CONTROL_INPUTS, FORECAST_MONTHS, compiled_model, outputs, resolve_inputs
+
+POINTS = 64
+
+
+def _key(name, names):
+    key = names.get(name, name)
+    if "!" not in key:
+        raise KeyError(f"неизвестная ячейка или параметр {name!r}")
+    return key
+
+
+def _values(output, param, inputs, horizon, daily):
+    """Функция xs -> значения output (ошибки Excel -> nan)."""
+    model = compiled_model(horizon, daily)
+    out_key = _key(output, outputs())
+    param_key = _key(param, CONTROL_INPUTS)
+    base = resolve_inputs(inputs)
+    targets = (out_key,)
+
+    def values(xs):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            result = model.evaluate({**base, param_key: xs}, targets=targets)[out_key]
+        if isinstance(result, str):
+            return np.full(len(xs), np.nan)
+        return np.broadcast_to(np.asarray(result, dtype=float), xs.shape)
+
+    return values
+
+
+def _bounds(low, high, integer):
+    """Отрезок поиска; для integer - целые концы внутри [low, high]."""
+    if integer:
+        return float(math.ceil(low)), float(math.floor(high))
+    return float(low), float(high)
+
+
+def _grid(low, high, integer):
+    xs = np.linspace(low, high, POINTS)
+    return np.unique(np.round(xs)) if integer else xs
+
+
+def _first_failure(holds, low, high, integer, tol):
+    """
+    Граница условия на [low, high]: (последняя точка, где holds верно,
+    первая, где неверно). holds(low) должно быть верно, holds(high) - нет;
+    для integer концы - целые числа.
+    """
+    while high - low > (1 if integer else tol * max(1.0, abs(low), abs(high))):
+        xs = _grid(low, high, integer)
+        ok = holds(xs)
+        j = int(np.argmin(ok))  # первая точка, где условие нарушено
+        if ok[j]:
+            # на сетке нарушений нет (немонотонная функция) - сужаемся к high
+            low = xs[-1]
+            continue
+        if j == 0:
+            raise ValueError(f"условие нарушено уже в начале отрезка ({xs[0]:g})")
+        low, high = xs[j - 1], xs[j]
+    return low, high
+
+
+def max_where(output, limit, param, low, high, inputs=None, integer=False,
+              tol=1e-9, horizon=FORECAST_MONTHS, daily=False):
+    """
+    Наибольшее значение param на [low, high] (до первого нарушения),
+    при котором output <= limit. None, если уже при low условие нарушено
+    (для integer - при ceil(low); ответ - целое не больше floor(high)).
+    """
+    values = _values(output, param, inputs, horizon, daily)
+    low, high = _bounds(low, high, integer)
+    if low > high:
+        return None
+
+    def holds(xs):
+        return values(xs) <= limit
+
+    edges = holds(np.array([low, high], dtype=float))
+    if not edges[0]:
+        return None
+    if edges[1] and holds(_grid(low, high, integer)).all():
+        return high
+    return float(_first_failure(holds, low, high, integer, tol)[0])
+
+
+def min_where(output, limit, param, low, high, inputs=None, integer=False,
+              tol=1e-9, horizon=FORECAST_MONTHS, daily=False):
+    """
+    Наименьшее значение param на [low, high], при котором output > limit.
+    None, если условие не выполняется ни в одной точке поиска (для
+    integer - ни в одном целом от ceil(low) до floor(high)).
+    """
+    values = _values(output, param, inputs, horizon, daily)
+    low, high = _bounds(low, high, integer)
+    if low > high:
+        return None
+
+    def below(xs):
+        return ~(values(xs) > limit)
+
+    if not below(np.array([low], dtype=float))[0]:
+        return low
+    if below(_grid(low, high, integer)).all():
+        return None
+    return float(_first_failure(below, low, high, integer, tol)[1])
+
+
+def goal_seek(output, target, param, low, high, inputs=None, tol=1e-9,
+              horizon=FORECAST_MONTHS, daily=False):
+    """
+    Значение param, при котором output достигает target (первое
+    пересечение от low). Для ступенчатых функций - точка скачка.
+    """
+    values = _values(output, param, inputs, horizon, daily)
+    start = values(np.array([low], dtype=float))[0]
+    sign = 1 if start <= target else -1
+
+    def before(xs):
+        return sign * (values(xs) - target) < 0
+
+    if not before(np.array([low], dtype=float))[0]:
+        return float(low)
+    if before(np.linspace(low, high, POINTS)).all():
+        return None
+    return float(_first_failure(before, low, high, False, tol)[1])
+
+
+if __name__ == "__main__":
+    import time
+
+    started = time.perf_counter()
+    print("Макс. пользователей при бюджете $20 000:",
+          max_where("total", 20000, "users", 0, 10**7, integer=True))
+    print("Рост, при котором к 12 месяцу серверов > 3:",
+          min_where("servers", 3, "growth", 0, 200, inputs={"month": 12}))
+    print("Цена примерки при $/пользователь <= 1.0:",
+          max_where("cost_per_user", 1.0, "AI_Generation!B5", 0, 1))
+    print(f"3 задачи за {(time.perf_counter() - started) * 1000:.1f} мс")
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Именованные стили калькулятора.
+
+Стили регистрируются в книге один раз (register_styles), а ячейке
+назначается только имя стиля - одна запись на ячейку вместо отдельных
+Font/Border/PatternFill. В таблице стилей xlsx остается по записи на
+каждый используемый стиль.
+"""
+
+from copy import copy
+from functools import lru_cache
+
+# Цвета
+HEADER_COLOR = "1F4E79"
+SECTION_COLOR = "D6DCE5"
+TOTAL_COLOR = "E2EFDA"
+INPUT_COLOR = "FFF2CC"
+PERCENT = '0.0%'
+
+# Стили калькулятора (по порядку регистрации в книге)
+STYLE_NAMES = [
+    "calc_title", "calc_title_large", "calc_header", "calc_band", "calc_cell",
+    "calc_section", "calc_input", "calc_total", "calc_total_bold", "calc_grand_total",
+    "calc_input_fill", "calc_total_fill", "calc_percent", "calc_total_percent", "calc_note",
+]
+
+
+@lru_cache(maxsize=None)
+def style_attributes():
+    """
+    Имя стиля -> атрибуты NamedStyle. openpyxl импортируется при первом
+    вызове, чтобы модуль можно было импортировать без него.
+    """
+    from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
+
+    def fill(color):
+        return PatternFill(start_color=color, end_color=color, fill_type="solid")
+
+    header_fill = fill(HEADER_COLOR)
+    header_font = Font(color="FFFFFF", bold=True, size=11)
+    section_fill, total_fill, input_fill = fill(SECTION_COLOR), fill(TOTAL_COLOR), fill(INPUT_COLOR)
+    border = Border(
+        left=Side(style='thin'),
+        right=Side(style='thin'),
+        top=Side(style='thin'),
+        bottom=Side(style='thin')
+    )
+    center = Alignment(horizontal='center', vertical='center')
+    attrs = {
+        "calc_title": dict(font=Font(bold=True, size=14, color="FFFFFF"), fill=header_fill),
+        "calc_title_large": dict(font=Font(bold=True, size=16, color="FFFFFF"), fill=header_fill),
+        "calc_header": dict(font=header_font, fill=header_fill, alignment=center, border=border),
+        "calc_band": dict(font=header_font, fill=header_fill, border=border),
+        "calc_cell": dict(border=border),
+        "calc_section": dict(fill=section_fill, border=border),
+        "calc_input": dict(fill=input_fill, border=border),
+        "calc_total": dict(fill=total_fill, border=border),
+        "calc_total_bold": dict(font=Font(bold=True), fill=total_fill, border=border),
+        "calc_grand_total": dict(font=Font(bold=True, size=12), fill=total_fill, border=border),
+        "calc_input_fill": dict(fill=input_fill),
+        "calc_total_fill": dict(fill=total_fill),
+        "calc_percent": dict(border=border, number_format=PERCENT),
+        "calc_total_percent": dict(fill=total_fill, border=border, number_format=PERCENT),
+        "calc_note": dict(font=Font(italic=True, color="666666")),
+    }
+    return {name: attrs[name] for name in STYLE_NAMES}
+
+
+def register_styles(wb):
+    """Добавляет стили калькулятора в книгу (повторный вызов ничего не делает)."""
+    from openpyxl.styles import NamedStyle
+    from openpyxl.styles.fonts import DEFAULT_FONT
+
+    for name, attrs in style_attributes().items():
+        if name not in wb.named_styles:
+            # без явного шрифта NamedStyle получает пустой <font/>
+            wb.add_named_style(NamedStyle(name=name, **{"font": DEFAULT_FONT, **attrs}))
+        # индексы стилей ячеек (cellXfs) - в порядке STYLE_NAMES, а не первого
+        # использования: XML листа не зависит от того, какие еще листы есть в книге
+        wb._cell_styles.add(copy(wb._named_styles[name].as_tuple()))
+
+
+def style_range(ws, cell_range, name):
+    """Назначает стиль всем ячейкам диапазона вида 'A3:D3'."""
+    from openpyxl.utils import range_boundaries
+
+    min_col, min_row, max_col, max_row = range_boundaries(cell_range)
+    for row in range(min_row, max_row + 1):
+        for col in range(1 if min_col is None else min_col, max_col + 1):
+            ws.cell(row=row, column=col).style = name
+
+
+def write_row(ws, row, values, style=None):
+    """
+    Записывает строку значений (None - ячейка без значения) и стили:
+    одно имя на всю строку или список имен по колонкам.
+    """
+    styles = [style] * len(values) if style is None or isinstance(style, str) else style
+    for col, (value, name) in enumerate(zip(values, styles), 1):
+        cell = ws.cell(row=row, column=col, value=value)
+        if name:
+            cell.style = name
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Перебор сценариев CONTROL одним векторным проходом NumPy.
+
+    from sweep import sweep
+    result = sweep({
+        "users": [1000, 5000, 20000],
+        "growth": np.arange(0, 31, 5),
+        "users_per_server": [5000, 10000],
+    })
+    result["total"]          # массив из 3*7*2 значений TOTAL!B10
+
+Формулы те же, что в cost_model (включая CEILING(users/B19) для серверов),
+только ячейки содержат массивы. Сетка не разворачивается в память целиком:
+комбинации считаются блоками по chunk_size строк.
+"""
+
+import numpy as np
+
+from cost_model import CONTROL_INPUTS, compiled_model, outputs as model_outputs, resolve_inputs
+
+CHUNK_SIZE = 1 << 16
+
+
+def _columns(values, outputs, size):
+    """Ячейки модели -> массивы длины size (скаляры растягиваются)."""
+    columns = {}
+    for name, key in outputs.items():
+        value = values.get(key)
+        if isinstance(value, str):
+            value = np.nan
+        columns[name] = np.broadcast_to(np.asarray(value, dtype=float), (size,))
+    return columns
+
+
+def evaluate_batch(columns, outputs=None, inputs=None, catalog=None):
+    """
+    Считает модель для сценариев, заданных столбцами одинаковой длины:
+    {'users': [...], 'growth': [...]} -> {'users': ..., 'growth': ..., 'total': ...}.
+    Параметры, которых нет в columns, берутся из inputs (общие для всех
+    сценариев), затем из CONTROL; цены - из catalog.
+    """
+    outputs = model_outputs(catalog) if outputs is None else outputs
+    arrays = {name: np.asarray(col, dtype=float) for name, col in columns.items()}
+    size = len(next(iter(arrays.values()))) if arrays else 1
+    model = compiled_model(catalog=catalog)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        values = model.evaluate({**resolve_inputs(inputs), **resolve_inputs(arrays)},
+                                targets=outputs.values())
+    result = dict(arrays)
+    result.update(_columns(values, outputs, size))
+    return result
+
+
+def grid_size(grid):
+    return int(np.prod([len(np.atleast_1d(v)) for v in grid.values()], dtype=np.int64))
+
+
+def iter_sweep(grid, outputs=None, chunk_size=CHUNK_SIZE, inputs=None, catalog=None):
+    """
+    Декартово произведение значений grid блоками по chunk_size сценариев.
+    Каждый блок - словарь столбцов, как у evaluate_batch() (inputs и
+    catalog передаются ему же).
+    """
+    axes = {name: np.asarray(np.atleast_1d(values), dtype=float) for name, values in grid.items()}
+    for name in axes:
+        if name not in CONTROL_INPUTS and "!" not in name:
+            raise KeyError(f"неизвестный параметр {name!r}")
+    shape = tuple(len(a) for a in axes.values())
+    total = grid_size(axes)
+    for start in range(0, total, chunk_size):
+        index = np.unravel_index(np.arange(start, min(start + chunk_size, total)), shape)
+        columns = {name: axis[idx] for (name, axis), idx in zip(axes.items(), index)}
+        yield evaluate_batch(columns, outputs, inputs, catalog)
+
+
+def sweep(grid, outputs=None, chunk_size=CHUNK_SIZE, inputs=None, catalog=None):
+    """Все комбинации grid; столбцы входов и результатов длины grid_size(grid)."""
+    chunks = list(iter_sweep(grid, outputs, chunk_size, inputs, catalog))
+    return {name: np.concatenate([c[name] for c in chunks]) for name in chunks[0]}
+
+
+if __name__ == "__main__":
+    import time
+
+    grid = {
+        "users": np.linspace(1000, 100000, 100),
+        "growth": np.arange(0, 50, 1),
+        "tryons_per_user": [1, 2, 3, 4, 5],
+        "videos_per_user": [0, 1, 2, 3],
+        "users_per_server": [5000, 10000, 20000, 50000, 100000],
+    }
+    started = time.perf_counter()
+    result = sweep(grid)
+    elapsed = time.perf_counter() - started
+    print(f"Сценариев: {grid_size(grid):,} за {elapsed:.2f} с")
+    best = int(np.nanargmin(result["cost_per_user"]))
+    print("Минимальная стоимость пользователя:",
+          {name: float(col[best]) for name, col in result.items()})
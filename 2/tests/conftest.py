@@ -0,0 +1,5 @@
+import os
+import sys
+
+# модули калькулятора лежат уровнем выше и импортируются как скрипты
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,49 @@
+"""Пакетная генерация (batch.py): разбор и проверка сценариев до сборки книг."""
+
+import json
+import os
+
+import pytest
+
+from batch import generate, load_scenarios
+
+
+def _csv(tmp_path, text):
+    path = tmp_path / "scenarios.csv"
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def test_csv_inputs_and_metadata(tmp_path):
+    path = _csv(tmp_path, "name,users,growth,meta_owner,region\na,8000,20,anna,EU\nb,1500,,oleg,US\n")
+    assert load_scenarios(path, meta=["region"]) == [
+        ("a", {"users": 8000.0, "growth": 20.0}),
+        ("b", {"users": 1500.0}),
+    ]
+
+
+@pytest.mark.parametrize("text, message", [
+    ("name,Users\na,8000\n", "users?"),             # регистр
+    ("name,users,grwoth\na,8000,5\n", "growth?"),   # опечатка
+    ("name,users,region\na,8000,EU\n", "region"),   # метаданные не объявлены
+    ("name,users\na,много\n", "не число"),
+])
+def test_csv_rejects_unknown_or_bad_columns(tmp_path, text, message):
+    with pytest.raises(ValueError, match=message):
+        load_scenarios(_csv(tmp_path, text))
+
+
+def test_json_inputs_object(tmp_path):
+    path = tmp_path / "scenarios.jsonl"
+    rows = [{"name": "a", "inputs": {"users": 8000}, "meta_owner": "anna"},
+            {"name": "b", "inputs": {"tier": 1}}]
+    path.write_text("\n".join(json.dumps(row) for row in rows), encoding="utf-8")
+    with pytest.raises(ValueError, match="tier"):
+        load_scenarios(str(path))
+
+
+def test_generate_validates_before_building(tmp_path):
+    output = str(tmp_path / "out")
+    with pytest.raises(ValueError, match="userz"):
+        generate([("a", {"users": 8000}), ("b", {"userz": 1})], output, workers=1)
+    assert not os.path.exists(output)
@@ -0,0 +1,38 @@
+"""Кэш книг (build_cache.py): частичная сборка дает ту же книгу, что полная."""
+
+import io
+import zipfile
+
+import pytest
+
+pytest.importorskip("openpyxl")
+
+from build_cache import DiskCache, cached_workbook  # noqa: E402
+from pricing import load_catalog  # noqa: E402
+from xlsx_patch import sheet_parts  # noqa: E402
+
+
+def _sheets(data):
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        return {title: archive.read(part) for title, part in sheet_parts(archive).items()}
+
+
+@pytest.mark.parametrize("cached_values", [False, True])
+def test_partial_rebuild_matches_fresh_build(tmp_path, cached_values):
+    # цена трафика меняет лист Traffic, а со значениями - и TOTAL, и прогноз,
+    # которые на него ссылаются; CONTROL и остальные листы цен берутся из кэша
+    catalog = load_catalog()
+    changed = catalog.replace(catalog.per_user_items("Traffic")[0].key, price=0.5)
+    options = {"inputs": {"users": 8000}, "horizon": 12, "cached_values": cached_values}
+    cache = DiskCache(str(tmp_path / "cache"))
+    assert cached_workbook(cache, catalog=catalog, **options)[1]["status"] == "miss"
+    data, status = cached_workbook(cache, catalog=changed, **options)
+    assert status["status"] == "partial"
+    assert "Traffic" in status["rebuilt"] and "CONTROL" not in status["rebuilt"]
+    assert ("TOTAL" in status["rebuilt"]) == cached_values
+
+    fresh, status = cached_workbook(DiskCache(str(tmp_path / "fresh")), catalog=changed,
+                                    **options)
+    assert status["status"] == "miss"
+    assert _sheets(data) == _sheets(fresh)
+    assert cached_workbook(cache, catalog=changed, **options)[1]["status"] == "hit"
@@ -0,0 +1,122 @@
+"""Модель расходов (cost_model.py): итоги по умолчанию и совпадение с книгой."""
+
+import argparse
+import io
+
+import numpy as np
+import pytest
+
+from cost_model import (
+    CONTROL_INPUTS, MAX_HORIZON, evaluate, forecast_rows, forecast_sheet, parse_inputs,
+    resolve_inputs, sheet_cells, summary,
+)
+from formula import CellError, FormulaModel, column_letter
+
+
+def test_default_summary():
+    # вводные по умолчанию: 5000 пользователей, 3 примерки, 1 видео, 5 LLM на пользователя
+    result = summary(evaluate())
+    assert result["users_current"] == 5000
+    assert result["servers"] == 1
+    # 15000*0.1 + 5000*0.5 + 50000*0.005 + 12500*0.0003 + 25000*0.0001 + 7500*0.02 + 4500*0.01
+    assert result["ai"] == pytest.approx(4451.25)
+    # 45 + 60 + 25 + 15 + 26 + 20 + хранилище 117.1875 GB * 0.02 + CDN 351.5625 GB * 0.01
+    assert result["infrastructure"] == pytest.approx(196.859375)
+    # 50000*0.0001 + 15000*0.001 + 500*0.05 + 25000*0.0001
+    assert result["traffic"] == pytest.approx(47.5)
+    assert result["total"] == pytest.approx(4451.25 + 196.859375 + 47.5)
+    assert result["cost_per_user"] == pytest.approx(result["total"] / 5000)
+    assert result["cost_per_tryon"] == pytest.approx(0.1)
+
+
+def test_control_calculations():
+    values = evaluate({"users": 1000, "growth": 20, "month": 3, "users_per_server": 500})
+    assert values["CONTROL!B22"] == 1440                    # ROUND(1000 * 1.2^2)
+    assert values["CONTROL!B23"] == 1440 * 3
+    assert values["CONTROL!B26"] == pytest.approx(1440 * 3 * 3 / 1024)
+    assert values["CONTROL!B28"] == 3                       # CEILING(1440/500)
+
+
+@pytest.mark.parametrize("horizon, daily", [(6, False), (36, False), (30, True)])
+def test_forecast_users_compound(horizon, daily):
+    values = evaluate({"users": 2000, "growth": 10}, horizon, daily)
+    sheet = forecast_sheet(horizon, daily)
+    step = 12 / 365 if daily else 1    # рост CONTROL!B6 - месячный
+    for n in range(horizon):
+        expected = 2000 * 1.1 ** (n * step)
+        assert values[f"{sheet}!{column_letter(n + 2)}4"] == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("horizon", [0, -1, MAX_HORIZON + 1, 2.5])
+def test_horizon_out_of_range(horizon):
+    with pytest.raises(ValueError):
+        forecast_rows(horizon)
+    with pytest.raises(ValueError):
+        forecast_sheet(horizon)
+
+
+def test_vectorized_matches_scalar():
+    users = np.array([1000.0, 8000.0, 50000.0])
+    growth = np.array([0.0, 15.0, 40.0])
+    batch = evaluate({"users": users, "growth": growth, "month": 4}, horizon=12)
+    for i in range(len(users)):
+        single = evaluate({"users": users[i], "growth": growth[i], "month": 4}, horizon=12)
+        for key in ("TOTAL!B10", "CONTROL!B28", "Forecast_12M!M12"):
+            assert batch[key][i] == pytest.approx(single[key])
+
+
+def test_resolve_inputs():
+    assert resolve_inputs({"users": 8000, "CONTROL!B6": 20}) == {"CONTROL!B5": 8000,
+                                                                 "CONTROL!B6": 20}
+    with pytest.raises(KeyError):
+        resolve_inputs({"userz": 1})
+
+
+def test_parse_inputs():
+    parser = argparse.ArgumentParser()
+    assert parse_inputs(["users=8000", "growth=2.5"], parser) == {"users": 8000, "growth": 2.5}
+    for bad in (["users"], ["users=x"], ["userz=1"], ["TOTAL!B4=0"], ["CONTROL!B5=1"]):
+        with pytest.raises(SystemExit):
+            parse_inputs(bad, parser)
+
+
+def _workbook_cells(data):
+    from openpyxl import load_workbook
+
+    wb = load_workbook(io.BytesIO(data))
+    return {f"{ws.title}!{cell.coordinate}": cell.value
+            for ws in wb for row in ws.iter_rows() for cell in row if cell.value is not None}
+
+
+@pytest.mark.parametrize("options", [
+    {},
+    {"inputs": {"users": 8000, "growth": 25, "month": 6}, "horizon": 36},
+    {"horizon": 60, "daily": True},
+])
+def test_evaluate_matches_workbook(options):
+    """Формулы, записанные в книгу, дают те же значения, что evaluate()."""
+    pytest.importorskip("openpyxl")
+    from create_calculator import workbook_bytes
+
+    inputs = options.get("inputs")
+    horizon, daily = options.get("horizon", 6), options.get("daily", False)
+    cells = _workbook_cells(workbook_bytes(**options))
+    expected = evaluate(inputs, horizon, daily)
+    actual = FormulaModel(cells).evaluate()
+    keys = [key for key, value in sheet_cells(horizon, daily).items() if value not in ("", None)]
+    assert set(keys) <= cells.keys()
+    for key in keys:
+        want, got = expected[key], actual[key]
+        if isinstance(want, (CellError, str)) or isinstance(got, str):
+            assert got == want, key
+        else:
+            assert got == pytest.approx(want), key
+
+
+def test_control_inputs_are_written():
+    pytest.importorskip("openpyxl")
+    from create_calculator import workbook_bytes
+
+    cells = _workbook_cells(workbook_bytes(inputs={"users": 8000, "video_mb": 20}))
+    assert cells[CONTROL_INPUTS["users"]] == 8000
+    assert cells[CONTROL_INPUTS["video_mb"]] == 20
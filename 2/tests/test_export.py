@@ -0,0 +1,37 @@
+"""Выгрузка таблиц (export.py): перебор сценариев и разбор осей --grid."""
+
+import argparse
+import csv
+
+import pytest
+
+from cost_model import TRYON, evaluate
+from export import export_sweep, parse_grid
+from pricing import load_catalog
+
+
+def _rows(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def test_sweep_uses_inputs_and_catalog(tmp_path):
+    catalog = load_catalog().replace(TRYON, price=0.2)
+    inputs = {"growth": 20, "month": 3, "users": 1}
+    path = str(tmp_path / "sweep.csv")
+    assert export_sweep(path, {"users": [1000, 8000]}, inputs=inputs, catalog=catalog) == 2
+    for row in _rows(path):
+        users = float(row["users"])     # ось grid важнее общей вводной
+        expected = evaluate({**inputs, "users": users}, catalog=catalog)["TOTAL!B10"]
+        assert float(row["total"]) == pytest.approx(expected)
+
+
+def test_parse_grid():
+    parser = argparse.ArgumentParser()
+    grid = parse_grid(["users=1000:3000:3", "growth=5,10"], parser)
+    assert list(grid["users"]) == [1000, 2000, 3000]
+    assert grid["growth"] == [5, 10]
+    for bad in (["users"], ["userz=1,2"], ["users=1:2"], ["users=1:2:x"], ["users=1:2:0"],
+                ["users=a,b"], ["CONTROL!B5=1,2"], ["users=1", "users=2"]):
+        with pytest.raises(SystemExit):
+            parse_grid(bad, parser)
@@ -0,0 +1,124 @@
+"""Разбор и вычисление формул (formula.py) в сравнении с поведением Excel."""
+
+import math
+
+import numpy as np
+import pytest
+
+from formula import DIV0, NUM, VALUE, CellError, FormulaError, FormulaModel, LiveModel
+
+
+def calc(formula, **cells):
+    """Значение формулы в S!A1; cells - остальные ячейки листа S."""
+    model = FormulaModel({"S!A1": formula, **{f"S!{k}": v for k, v in cells.items()}})
+    return model.evaluate()["S!A1"]
+
+
+@pytest.mark.parametrize("formula, expected", [
+    ("=2+3*4^2", 50),
+    ("=-2^2", 4),            # унарный минус в Excel сильнее степени
+    ("=(1+2)*3", 9),
+    ("=10%", 0.1),
+    ("=7/2", 3.5),
+    ('="a"&"b"', "ab"),
+    ("=1=1", True),
+    ("=2<>2", False),
+])
+def test_operators(formula, expected):
+    assert calc(formula) == expected
+
+
+@pytest.mark.parametrize("formula, expected", [
+    ("=ROUND(2.5,0)", 3),
+    ("=ROUND(-2.5,0)", -3),
+    ("=ROUND(0.125,2)", 0.13),
+    ("=ROUND(1234.5,-1)", 1230),
+    ("=ROUND(2.4,0)", 2),
+])
+def test_round_half_away_from_zero(formula, expected):
+    assert calc(formula) == pytest.approx(expected)
+
+
+def test_round_array():
+    model = FormulaModel({"S!A1": "=ROUND(S!A2,0)"})
+    result = model.evaluate({"S!A2": np.array([2.5, -2.5, 0.4, 1.5])})["S!A1"]
+    np.testing.assert_array_equal(result, [3, -3, 0, 2])
+
+
+@pytest.mark.parametrize("formula, expected", [
+    ("=CEILING(2.1,1)", 3),
+    ("=CEILING(4,2)", 4),
+    ("=CEILING(5,2)", 6),
+    ("=CEILING(0.3,0.1)", 0.3),    # без лишнего шага из-за 0.3/0.1 = 2.9999...
+    ("=CEILING(-2.5,1)", -2),
+    ("=CEILING(5,0)", 0),
+])
+def test_ceiling(formula, expected):
+    assert calc(formula) == pytest.approx(expected)
+
+
+def test_ceiling_array_matches_scalar():
+    model = FormulaModel({"S!A1": "=CEILING(S!A2/3,1)"})
+    values = np.array([0.0, 1.0, 3.0, 3.5, 10000.0])
+    result = model.evaluate({"S!A2": values})["S!A1"]
+    np.testing.assert_array_equal(result, [math.ceil(x / 3) for x in values])
+
+
+def test_if_evaluates_only_taken_branch():
+    assert calc("=IF(1>0,1,1/0)") == 1
+    assert calc("=IF(0,1/0,2)") == 2
+    assert calc("=IF(A2=0,0,1/A2)", A2=0) == 0
+    assert calc("=IF(A2>1,A2)", A2=0) is False
+
+
+def test_if_array():
+    model = FormulaModel({"S!A1": "=IF(S!A2>1,S!A2*10,-1)"})
+    result = model.evaluate({"S!A2": np.array([0.0, 2.0, 3.0])})["S!A1"]
+    np.testing.assert_array_equal(result, [-1, 20, 30])
+
+
+@pytest.mark.parametrize("formula, cells, expected", [
+    ("=1/0", {}, DIV0),
+    ('="a"+1', {}, VALUE),
+    ("=(-8)^0.5", {}, NUM),
+    ("=A2+1", {"A2": "=1/0"}, DIV0),             # ошибка идет по ссылкам
+    ("=SUM(A2:A3)", {"A2": "=1/0", "A3": 2}, DIV0),
+    ("=A2*2", {"A2": "текст"}, VALUE),
+])
+def test_errors_propagate(formula, cells, expected):
+    result = calc(formula, **cells)
+    assert isinstance(result, CellError)
+    assert result == expected
+
+
+def test_ranges_skip_text_and_blanks():
+    assert calc("=SUM(A2:A5)", A2=1, A3="текст", A5=4) == 5
+    assert calc("=MIN(A2:A3)+MAX(3,1,2)", A2=5, A3=2) == 5
+    assert calc("=A9+1") == 1                    # пустая ячейка - 0
+
+
+def test_cross_sheet_absolute_refs():
+    model = FormulaModel({"S!A1": "=T!$B$2*2+T!B3", "T!B2": 5, "T!B3": "=T!B2+1"})
+    assert model.evaluate()["S!A1"] == 16
+
+
+def test_inputs_pin_formula_cells():
+    model = FormulaModel({"S!A1": "=S!A2*2", "S!A2": "=S!A3+1", "S!A3": 1})
+    assert model.evaluate()["S!A1"] == 4
+    assert model.evaluate({"S!A2": 10})["S!A1"] == 20
+    assert model.evaluate({"S!A3": 4}, targets=["S!A1"])["S!A1"] == 10
+
+
+def test_unsupported_function():
+    with pytest.raises(FormulaError):
+        FormulaModel({"S!A1": "=VLOOKUP(1,A2:B3,2)"})
+
+
+def test_live_model_matches_full_evaluation():
+    cells = {"S!A1": 2, "S!A2": "=S!A1*3", "S!A3": "=CEILING(S!A2/4,1)", "S!A4": "=S!A3+S!A1"}
+    model = FormulaModel(cells)
+    live = LiveModel(model)
+    changed = live.update({"S!A1": 5})
+    assert changed == {"S!A1": 5, "S!A2": 15, "S!A3": 4, "S!A4": 9}
+    assert live.values == model.evaluate({"S!A1": 5})
+    assert live.update({"S!A1": 5}) == {}
@@ -0,0 +1,63 @@
+"""Очередь AI-задач (queue_sim.py): подбор воркеров и разбор аргументов."""
+
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from cost_model import evaluate
+from queue_sim import _meets, _peak_load, generate_jobs, min_workers, sized_catalog
+
+SLOTS = 4
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="module")
+def flow():
+    return generate_jobs({"tryon": 60000, "video": 6000, "llm": 120000}, "evening", seed=1)
+
+
+@pytest.mark.parametrize("slo", [0.0, 30.0, 600.0, 1e9])
+def test_min_workers_is_smallest(flow, slo):
+    workers = min_workers(flow, slo, slots=SLOTS)
+    assert _meets(flow, workers, SLOTS, slo, 95)
+    assert workers == 1 or not _meets(flow, workers - 1, SLOTS, slo, 95)
+
+
+def test_soft_slo_goes_below_peak_bound():
+    # 1000 задач по минуте в первый час: в пик нужно 5 воркеров, но за сутки
+    # очередь рассасывается и при SLO в сутки хватает меньшего числа
+    arrivals = np.linspace(0, 3599, 1000)
+    flow = (arrivals, np.full(1000, 60.0), np.zeros(1000, np.int8))
+    assert np.ceil(_peak_load(flow[0], flow[1], 30) / SLOTS) == 5
+    assert min_workers(flow, 1e9, slots=SLOTS) == 1
+    workers = min_workers(flow, 3600, slots=SLOTS)
+    assert 1 < workers < 5
+    assert not _meets(flow, workers - 1, SLOTS, 3600, 95)
+
+
+@pytest.mark.parametrize("args", [
+    ["--service", "vidoe=120"],
+    ["--service", "video=abc"],
+    ["--service", "video=0"],
+    ["--profile", "evnening"],
+    ["--profile", "1,-1"],
+])
+def test_cli_rejects_bad_arguments(args):
+    result = subprocess.run([sys.executable, "queue_sim.py", "users=10", *args],
+                            capture_output=True, text=True,
+                            cwd=ROOT)
+    assert result.returncode == 2
+    assert "Traceback" not in result.stderr
+
+
+def test_forecast_prices_sized_workers():
+    # 100 тыс. пользователей - 10 серверов; без подбора воркеров CEILING(10/2) = 5
+    inputs = {"users": 100000}
+    default = evaluate(inputs, 6)
+    sized = evaluate(inputs, 6, catalog=sized_catalog(7, 30))
+    worker = sized["Infrastructure!B6"]
+    assert sized["Infrastructure!C6"] == 7
+    assert sized["Forecast_6M!B9"] - default["Forecast_6M!B9"] == pytest.approx((7 - 5) * worker)
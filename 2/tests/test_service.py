@@ -0,0 +1,76 @@
+"""HTTP-сервис расчета (service.py): разбор запросов и ошибки клиента."""
+
+import asyncio
+import json
+
+import pytest
+
+from service import CostService
+
+
+@pytest.fixture(scope="module")
+def service():
+    service = CostService(workers=1)
+    yield service
+    service.close()
+
+
+async def _exchange(service, raw):
+    server = await asyncio.start_server(service.handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    async with server:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(raw)
+        await writer.drain()
+        data = await asyncio.wait_for(reader.read(), 30)
+        writer.close()
+    return data
+
+
+def request(service, method, path, body=b"", headers=None):
+    """(статус, JSON) ответа на запрос с Connection: close."""
+    head = [f"{method} {path} HTTP/1.1", "Connection: close"]
+    if body:
+        head.append(f"Content-Length: {len(body)}")
+    head += headers or []
+    raw = ("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body
+    data = asyncio.run(_exchange(service, raw))
+    status_line, _, rest = data.partition(b"\r\n")
+    return int(status_line.split()[1]), json.loads(rest.partition(b"\r\n\r\n")[2])
+
+
+def test_cost_query(service):
+    status, payload = request(service, "GET", "/cost?users=8000&horizon=3")
+    assert status == 200
+    assert payload["summary"]["users_current"] == 8000
+    assert len(payload["forecast"]["users"]) == 3
+
+
+def test_cost_forecast_follows_horizon(service):
+    _, short = request(service, "GET", "/cost?horizon=3")
+    _, long = request(service, "GET", "/cost?horizon=12")
+    assert short["summary"] == long["summary"]
+    assert long["forecast"]["cost"][:3] == short["forecast"]["cost"]
+    assert long["forecast"]["total"] > short["forecast"]["total"]
+
+
+@pytest.mark.parametrize("body", [
+    b'{"inputs": [1]}',
+    b'{"inputs": {"TOTAL!B10": 5}}',
+    b'{"inputs": {"userz": 5}}',
+    b'{"inputs": {"users": "x"}}',
+    b"[]",
+    b"not json",
+])
+def test_bad_body_is_400(service, body):
+    for path in ("/cost", "/xlsx"):
+        status, payload = request(service, "POST", path, body)
+        assert status == 400, (path, body)
+        assert payload["error"]
+
+
+@pytest.mark.parametrize("length, expected", [("abc", 400), ("-5", 400), (str(1 << 30), 413)])
+def test_bad_content_length(service, length, expected):
+    status, payload = request(service, "POST", "/cost", headers=[f"Content-Length: {length}"])
+    assert status == expected
+    assert payload["error"]
@@ -0,0 +1,33 @@
+"""Обратные задачи (solver.py): границы условий, целочисленный поиск."""
+
+import pytest
+
+from cost_model import evaluate
+from solver import max_where, min_where
+
+
+def _total(users):
+    return evaluate({"users": users})["TOTAL!B10"]
+
+
+def test_max_users_for_budget():
+    users = max_where("total", 20000, "users", 0, 10**7, integer=True)
+    assert users == int(users)
+    assert _total(users) <= 20000 < _total(users + 1)
+
+
+@pytest.mark.parametrize("low, high, expected", [
+    (0, 1000.7, 1000),      # весь отрезок в бюджете - floor(high)
+    (0.3, 0.9, None),       # целых на отрезке нет
+])
+def test_max_where_integer_bounds(low, high, expected):
+    assert max_where("total", 10**9, "users", low, high, integer=True) == expected
+
+
+def test_min_where_integer_bounds():
+    # условие выполняется уже на нижней границе - ceil(low)
+    assert min_where("total", 0, "users", 10.2, 100, integer=True) == 11
+    servers = min_where("servers", 3, "users", 0.5, 10**6 + 0.5, integer=True)
+    assert servers == int(servers)
+    assert evaluate({"users": servers})["CONTROL!B28"] > 3
+    assert evaluate({"users": servers - 1})["CONTROL!B28"] <= 3
@@ -0,0 +1,48 @@
+"""Фактические расходы по журналу (usage_log.py): плохие строки не прерывают разбор."""
+
+import json
+
+import pytest
+
+from usage_log import attribute
+
+GOOD = [
+    {"operation": "try-on", "user": "u1", "ts": 1700000000},
+    {"operation": "try-on", "user": "u2", "count": "2", "date": "2024-01-02"},
+    {"operation": "llm", "model": "gpt-4o-mini", "input_tokens": "1000", "output_tokens": 10},
+]
+BAD = [
+    {"operation": "try-on", "input_tokens": "abc"},
+    {"operation": "llm", "model": "gpt-4o-mini", "input_tokens": [1]},
+    {"operation": "try-on", "count": True},
+    {"operation": "try-on", "count": "nan"},
+    {"operation": "try-on", "ts": 1e20},
+    {"operation": "try-on", "ts": float("-inf")},
+    [1, 2],
+]
+
+
+def _write(path, records, extra=()):
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+        for line in extra:
+            f.write(line + "\n")
+    return str(path)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_bad_records_are_counted(tmp_path, workers):
+    path = _write(tmp_path / "usage.jsonl", GOOD + BAD, extra=["{not json"])
+    report = attribute(path, workers)
+    assert report["lines"] == len(GOOD) + len(BAD) + 1
+    assert report["bad_lines"] == len(BAD) + 1
+    assert report["by_operation"]["tryon"]["requests"] == 2
+
+
+def test_numeric_strings_are_coerced(tmp_path):
+    report = attribute(_write(tmp_path / "usage.jsonl", GOOD), 1)
+    assert report["bad_lines"] == 0
+    assert report["by_operation"]["tryon"]["cost"] == pytest.approx(3 * 0.1)   # 1 + 2 примерки
+    assert report["by_operation"]["llm"]["input_tokens"] == 1000
+    assert set(report["by_day"]) == {"2023-11-14", "2024-01-02", "unknown"}
@@ -0,0 +1,47 @@
+"""Правка готовой книги (xlsx_patch.py): вводные CONTROL и когортные книги."""
+
+import os
+import subprocess
+import sys
+import zipfile
+
+import pytest
+
+pytest.importorskip("openpyxl")
+
+from cohorts import cohort_forecast  # noqa: E402
+from create_calculator import save_workbook  # noqa: E402
+from xlsx_patch import patch_inputs, read_inputs, sheet_parts  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _parts(path):
+    with zipfile.ZipFile(path) as archive:
+        return {info.filename: archive.read(info) for info in archive.infolist()}
+
+
+def test_patch_changes_only_control(tmp_path):
+    src, dst = str(tmp_path / "calc.xlsx"), str(tmp_path / "patched.xlsx")
+    save_workbook(src)
+    patch_inputs(src, {"users": 8000, "growth": 20}, dst)
+    assert read_inputs(dst)["users"] == 8000
+    with zipfile.ZipFile(src) as archive:
+        control = sheet_parts(archive)["CONTROL"]
+    before, after = _parts(src), _parts(dst)
+    assert before.keys() == after.keys()
+    assert [part for part in before if before[part] != after[part]] == [control]
+
+
+def test_cohort_book_is_refused(tmp_path):
+    path = str(tmp_path / "cohorts.xlsx")
+    save_workbook(path, horizon=6, cohorts=cohort_forecast(horizon=6))
+    data = open(path, "rb").read()
+    with pytest.raises(ValueError, match="когорт"):
+        patch_inputs(path, {"users": 8000})
+    assert open(path, "rb").read() == data
+
+    result = subprocess.run([sys.executable, "xlsx_patch.py", path, "users=8000"],
+                            capture_output=True, text=True, cwd=ROOT)
+    assert result.returncode == 2
+    assert "когорт" in result.stderr and "Traceback" not in result.stderr
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Фактические расходы по журналу запросов (JSONL).
+
+Каждая строка журнала - один запрос:
+
+    {"ts": "2025-03-01T12:00:00Z", "user": "u42", "operation": "llm",
+     "model": "gpt-4o", "input_tokens": 1200, "output_tokens": 350}
+    {"ts": "2025-03-01T12:00:05Z", "user": "u42", "operation": "try-on"}
+
+Токенные операции (llm, embedding) оцениваются по ценам листа
+Token_Calculator ($ за 1M входных и выходных токенов), поштучные
+(try-on, video, background_removal, upscale) - по ценам AI_Generation.
+Цены берутся из каталога pricing.json.
+Расходы суммируются по моделям, дням и пользователям.
+
+Файл читается построчно, память не зависит от длины журнала (растет
+только со числом разных пользователей/дней/моделей). С workers > 1
+файл делится на части по байтам, каждая часть разбирается в своем
+процессе, частичные итоги складываются.
+
+    python usage_log.py usage.jsonl --workers 8
+"""
+
+import argparse
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from cost_model import evaluate, summary
+from pricing import TOKEN_SHEET, load_catalog
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:  # orjson необязателен, json из stdlib медленнее в ~3 раза
+    _loads = json.loads
+
+TOKEN_OPERATIONS = {"llm", "embedding"}
+
+OPERATION_ALIASES = {
+    "try_on": "tryon", "try-on": "tryon", "chat": "llm", "completion": "llm",
+    "embeddings": "embedding", "animation": "video", "bg_removal": "background_removal",
+}
+
+
+def normalize(name):
+    """'Claude 3.5 Sonnet' -> 'claude-3.5-sonnet'"""
+    return "-".join(str(name).lower().replace("_", " ").split())
+
+
+def rates(catalog=None):
+    """Цены каталога: ({модель: ($/1M вход, $/1M выход)}, {операция: $})."""
+    catalog = load_catalog() if catalog is None else catalog
+    token_rates = {}
+    for item in catalog.sheet_items(TOKEN_SHEET):
+        rate = (item.spec["input"], item.spec["output"])
+        token_rates[normalize(item.spec["model"])] = rate
+        token_rates.setdefault(normalize(item.spec["name"]), rate)
+    # поштучная цена операции - первая позиция AI_Generation с этой операцией
+    operation_rates = {}
+    for item in catalog.sheet_items("AI_Generation"):
+        if item.spec["operation"] not in TOKEN_OPERATIONS:
+            operation_rates.setdefault(item.spec["operation"], item.spec["price"])
+    return token_rates, operation_rates
+
+
+def _day(record):
+    ts = record.get("ts", record.get("date"))
+    if isinstance(ts, (int, float)):
+        return time.strftime("%Y-%m-%d", time.gmtime(ts))
+    return str(ts)[:10] if ts else "unknown"
+
+
+def _new_report():
+    return {"lines": 0, "bad_lines": 0, "unpriced": 0, "cost": 0.0,
+            "by_model": {}, "by_operation": {}, "by_day": {}, "by_user": {}}
+
+
+def _add(bucket, key, cost, input_tokens=0, output_tokens=0):
+    row = bucket.get(key)
+    if row is None:
+        row = bucket[key] = [0, 0, 0, 0.0]
+    row[0] += 1
+    row[1] += input_tokens
+    row[2] += output_tokens
+    row[3] += cost
+
+
+def _number(record, name, default):
+    """Числовое поле записи ("5" -> 5); не число - ValueError (плохая строка)."""
+    value = record.get(name, default)
+    if value is None or value == "":
+        return default
+    if isinstance(value, bool):
+        raise ValueError(f"{name}: {value!r} - не число")
+    value = float(value)
+    if not math.isfinite(value):
+        raise ValueError(f"{name}: {value!r} - не число")
+    return int(value) if value.is_integer() else value
+
+
+def price_record(record, token_rates, operation_rates):
+    """(стоимость, модель, операция, вход, выход); стоимость None - нет цены."""
+    op = normalize(record.get("operation", "llm")).replace("-", "_")
+    op = OPERATION_ALIASES.get(op, op)
+    count = _number(record, "count", 1)
+    input_tokens = _number(record, "input_tokens", 0)
+    output_tokens = _number(record, "output_tokens", 0)
+    model = normalize(record["model"]) if record.get("model") else op
+    if op in TOKEN_OPERATIONS:
+        rate = token_rates.get(model)
+        if rate is None:
+            return None, model, op, input_tokens, output_tokens
+        cost = (input_tokens * rate[0] + output_tokens * rate[1]) / 1_000_000
+    else:
+        price = operation_rates.get(op)
+        if price is None:
+            return None, model, op, input_tokens, output_tokens
+        cost = price * count
+    return cost, model, op, input_tokens, output_tokens
+
+
+def _process_lines(lines, report, token_rates, operation_rates):
+    for line in lines:
+        if not line.strip():
+            continue
+        report["lines"] += 1
+        try:
+            record = _loads(line)
+            cost, model, op, inp, out = price_record(record, token_rates, operation_rates)
+            day = _day(record)
+        except (ValueError, TypeError, KeyError, AttributeError, OverflowError, OSError):
+            report["bad_lines"] += 1
+            continue
+        if cost is None:
+            report["unpriced"] += 1
+            cost = 0.0
+        report["cost"] += cost
+        _add(report["by_model"], model, cost, inp, out)
+        _add(report["by_operation"], op, cost, inp, out)
+        _add(report["by_day"], day, cost, inp, out)
+        _add(report["by_user"], str(record.get("user", "unknown")), cost, inp, out)
+
+
+def _byte_ranges(path, parts):
+    size = os.path.getsize(path)
+    bounds = [size * i // parts for i in range(parts)] + [size]
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+
+def _read_range(path, start, end):
+    """Строки, которые начинаются в [start, end)."""
+    with open(path, "rb", buffering=1 << 20) as f:
+        if start:
+            # строка, начатая до start, принадлежит предыдущей части
+            f.seek(start - 1)
+            f.readline()
+        pos = f.tell()
+        while pos < end:
+            line = f.readline()
+            if not line:
+                break
+            pos += len(line)
+            yield line
+
+
+def _process_range(task):
+    path, start, end, catalog = task
+    token_rates, operation_rates = rates(catalog)
+    report = _new_report()
+    _process_lines(_read_range(path, start, end), report, token_rates, operation_rates)
+    return report
+
+
+def _merge(total, part):
+    for key in ("lines", "bad_lines", "unpriced", "cost"):
+        total[key] += part[key]
+    for name in ("by_model", "by_operation", "by_day", "by_user"):
+        bucket = total[name]
+        for key, row in part[name].items():
+            if key in bucket:
+                bucket[key] = [a + b for a, b in zip(bucket[key], row)]
+            else:
+                bucket[key] = row
+    return total
+
+
+def _as_dicts(report):
+    fields = ("requests", "input_tokens", "output_tokens", "cost")
+    for name in ("by_model", "by_operation", "by_day", "by_user"):
+        report[name] = {key: dict(zip(fields, row)) for key, row in report[name].items()}
+    return report
+
+
+def attribute(path, workers=1, catalog=None):
+    """Расходы по журналу: итог и разбивки by_model/by_operation/by_day/by_user."""
+    catalog = load_catalog() if catalog is None else catalog
+    ranges = _byte_ranges(path, max(1, workers))
+    tasks = [(path, start, end, catalog) for start, end in ranges]
+    report = _new_report()
+    if workers <= 1 or len(tasks) <= 1:
+        for part in map(_process_range, tasks):
+            _merge(report, part)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for part in pool.map(_process_range, tasks):
+                _merge(report, part)
+    return _as_dicts(report)
+
+
+def compare_with_model(report, inputs=None, catalog=None):
+    """Факт за средний день журнала * 30 против прогноза AI-расходов модели на месяц."""
+    days = [d for d in report["by_day"] if d != "unknown"] or ["unknown"]
+    actual_month = report["cost"] / len(days) * 30
+    projected = summary(evaluate(inputs, catalog=catalog), catalog)["ai"]
+    return {"days": len(days), "actual_per_month": actual_month,
+            "projected_ai_per_month": projected,
+            "difference": actual_month - projected}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Фактические расходы по журналу JSONL")
+    parser.add_argument("path")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--top", type=int, default=20, help="сколько пользователей показать")
+    parser.add_argument("--catalog", help="каталог цен (по умолчанию pricing.json)")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    catalog = load_catalog(args.catalog)
+    report = attribute(args.path, args.workers, catalog)
+    users = sorted(report["by_user"].items(), key=lambda kv: -kv[1]["cost"])
+    result = {
+        "lines": report["lines"], "bad_lines": report["bad_lines"],
+        "unpriced": report["unpriced"], "cost": report["cost"],
+        "users": len(report["by_user"]),
+        "by_model": report["by_model"], "by_operation": report["by_operation"],
+        "by_day": report["by_day"], "top_users": dict(users[:args.top]),
+        "vs_model": compare_with_model(report, catalog=catalog),
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+    print(json.dumps(result, ensure_ascii=False, indent=2))
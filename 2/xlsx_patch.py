@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Правка готового xlsx на уровне XML, без openpyxl.
+
+xlsx - zip с XML листов. Меняются только части xl/worksheets/sheetN.xml,
+содержимое остальных частей не меняется (zipfile не копирует сжатые
+данные напрямую: части распаковываются и сжимаются заново тем же
+методом).
+
+write_cached_values() дописывает в ячейки с формулами вычисленные
+значения: openpyxl пишет формулу с пустым <v/>, и pandas, openpyxl
+data_only=True и просмотрщики видят пустые ячейки, пока книгу не
+пересчитает Excel или LibreOffice.
+
+patch_inputs() меняет вводные CONTROL (B5, B6, B7, B10-B12, B15, B16,
+B19) в готовой книге: переписывается только XML листа CONTROL (и
+значения формул, если они были сохранены), содержимое остальных частей
+zip не меняется. Книги с когортной моделью (--cohorts) не
+правятся - в них пользователи записаны числами.
+
+    python xlsx_patch.py calc.xlsx users=8000 growth=20          # на месте
+    python xlsx_patch.py calc.xlsx users=8000 -o calc_8000.xlsx
+"""
+
+import argparse
+import math
+import os
+import re
+import shutil
+import tempfile
+import time
+import zipfile
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+
+from cost_model import (
+    CALC_ROW, CONTROL_INPUTS, FORECAST_MONTHS, evaluate, parse_inputs, resolve_inputs,
+)
+from formula import CellError
+
+_NS = {
+    "main": "http://schemas.openxmlformats.org/spreadsheetml/2006/main",
+    "rel": "http://schemas.openxmlformats.org/package/2006/relationships",
+}
+_REL_ID = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id"
+
+# Ячейка с формулой в том виде, как ее пишет openpyxl
+_FORMULA_CELL_RE = re.compile(
+    r'<c r="(?P<ref>[A-Z]+\d+)"(?P<attrs>[^>]*)><f>(?P<formula>[^<]*)</f>'
+    r'(?:<v\s*/>|<v>[^<]*</v>)?</c>')
+_TYPE_RE = re.compile(r'\s+t="[^"]*"')
+_VALUE_CELL_RE = re.compile(r'<c r="(?P<ref>[A-Z]+\d+)"(?P<attrs>[^>]*?)(?:\s*/>|>(?P<body>.*?)</c>)')
+_CACHED_RE = re.compile(r"</f><v>[^<]")
+_FORECAST_RE = re.compile(r"Forecast_(\d+)([MD])$")
+
+
+def sheet_parts(archive):
+    """Имя листа -> путь части zip ('CONTROL' -> 'xl/worksheets/sheet1.xml')."""
+    workbook = ElementTree.fromstring(archive.read("xl/workbook.xml"))
+    rels = ElementTree.fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+    targets = {rel.get("Id"): rel.get("Target") for rel in rels.iterfind("rel:Relationship", _NS)}
+    parts = {}
+    for sheet in workbook.iterfind("main:sheets/main:sheet", _NS):
+        target = targets[sheet.get(_REL_ID)]
+        parts[sheet.get("name")] = target.lstrip("/") if target.startswith("/") else f"xl/{target}"
+    return parts
+
+
+def _value_xml(value):
+    """(атрибут t, содержимое <v>) для вычисленного значения."""
+    if isinstance(value, CellError):
+        return ' t="e"', str(value)
+    if isinstance(value, bool):
+        return ' t="b"', "1" if value else "0"
+    if isinstance(value, str):
+        return ' t="str"', escape(value)
+    value = float(value)
+    if not math.isfinite(value):
+        return ' t="e"', "#NUM!"
+    return "", repr(int(value)) if value.is_integer() and abs(value) < 1e15 else repr(value)
+
+
+def _fill_values(xml, sheet, values):
+    def replace(m):
+        value = values.get(f"{sheet}!{m['ref']}")
+        if value is None:
+            return m[0]
+        kind, text = _value_xml(value)
+        attrs = _TYPE_RE.sub("", m["attrs"]) + kind
+        return f'<c r="{m["ref"]}"{attrs}><f>{m["formula"]}</f><v>{text}</v></c>'
+
+    return _FORMULA_CELL_RE.sub(replace, xml)
+
+
+def rewrite_sheets(src, dst, transform, sheets=None):
+    """
+    Копирует xlsx src в dst (пути или файловые объекты); XML листов
+    sheets (по умолчанию всех) проходит через transform(имя листа, xml) -> xml.
+    Остальные части копируются потоком с тем же методом сжатия: данные
+    те же, но сжимаются заново.
+    """
+    with zipfile.ZipFile(src) as zin, zipfile.ZipFile(dst, "w") as zout:
+        parts = {part: name for name, part in sheet_parts(zin).items()
+                 if sheets is None or name in sheets}
+        for info in zin.infolist():
+            sheet = parts.get(info.filename)
+            if sheet is None:
+                with zin.open(info) as fin, zout.open(info, "w") as fout:
+                    shutil.copyfileobj(fin, fout, 1 << 20)
+                continue
+            xml = transform(sheet, zin.read(info).decode("utf-8"))
+            zout.writestr(info, xml.encode("utf-8"))
+
+
+def write_cached_values(src, dst, values):
+    """Копия книги, в которой у формул сохранены значения из values {'Лист!A1': ...}."""
+    rewrite_sheets(src, dst, lambda sheet, xml: _fill_values(xml, sheet, values))
+
+
+def _input_cells(inputs):
+    """{'users': 8000} -> {'B5': 8000}; только вводные ячейки CONTROL."""
+    allowed = set(CONTROL_INPUTS.values())
+    cells = {}
+    for key, value in resolve_inputs(inputs).items():
+        if key not in allowed:
+            raise KeyError(f"{key} - не вводная ячейка CONTROL")
+        cells[key.split("!")[1]] = value
+    return cells
+
+
+def read_inputs(src):
+    """Текущие вводные CONTROL книги: {'users': 5000, ...}."""
+    with zipfile.ZipFile(src) as archive:
+        xml = archive.read(sheet_parts(archive)["CONTROL"]).decode("utf-8")
+    names = {key.split("!")[1]: name for name, key in CONTROL_INPUTS.items()}
+    inputs = {}
+    for m in _VALUE_CELL_RE.finditer(xml):
+        value = re.fullmatch(r"<v>([^<]*)</v>", m["body"] or "")
+        if m["ref"] in names and value:
+            number = float(value[1])
+            inputs[names[m["ref"]]] = int(number) if number.is_integer() else number
+    return inputs
+
+
+def _set_inputs(xml, cells):
+    found = set()
+
+    def replace(m):
+        if m["ref"] not in cells:
+            return m[0]
+        found.add(m["ref"])
+        attrs = _TYPE_RE.sub("", m["attrs"])
+        return f'<c r="{m["ref"]}"{attrs} t="n"><v>{_value_xml(cells[m["ref"]])[1]}</v></c>'
+
+    xml = _VALUE_CELL_RE.sub(replace, xml)
+    missing = set(cells) - found
+    if missing:
+        raise KeyError(f"в листе CONTROL нет ячеек {sorted(missing)}")
+    return xml
+
+
+def _is_cohort_book(xml):
+    """
+    Книга собрана с когортной моделью: пользователи текущего месяца
+    (CONTROL!B22) - число, а не формула от вводных.
+    """
+    ref = f"B{CALC_ROW}"
+    for m in _VALUE_CELL_RE.finditer(xml):
+        if m["ref"] == ref:
+            return "<f>" not in (m["body"] or "")
+    return False
+
+
+def _forecast_options(sheets):
+    for name in sheets:
+        m = _FORECAST_RE.match(name)
+        if m:
+            return int(m[1]), m[2] == "D"
+    return FORECAST_MONTHS, False
+
+
+def patch_inputs(src, inputs, dst=None, catalog=None):
+    """
+    Записывает вводные CONTROL в готовую книгу src (путь); dst=None - на
+    месте. Если в книге сохранены значения формул, они пересчитываются
+    cost_model с каталогом catalog (книга должна быть собрана с ним же).
+    Когортные книги не правятся: пользователи и активность в них - числа,
+    посчитанные для прежних вводных, - такую книгу нужно собрать заново.
+    """
+    cells = _input_cells(inputs)
+    with zipfile.ZipFile(src) as archive:
+        parts = sheet_parts(archive)
+        control = archive.read(parts["CONTROL"]).decode("utf-8")
+    if _is_cohort_book(control):
+        raise ValueError("книга собрана с когортной моделью (--cohorts): вводные не "
+                         "пересчитывают пользователей, соберите книгу заново")
+    cached = _CACHED_RE.search(control)
+    values = None
+    if cached:
+        horizon, daily = _forecast_options(parts)
+        values = evaluate({**read_inputs(src), **inputs}, horizon, daily, catalog)
+
+    def transform(sheet, xml):
+        if sheet == "CONTROL":
+            xml = _set_inputs(xml, cells)
+        return xml if values is None else _fill_values(xml, sheet, values)
+
+    sheets = None if cached else {"CONTROL"}
+    if dst is not None:
+        rewrite_sheets(src, dst, transform, sheets)
+        return
+    fd, tmp = tempfile.mkstemp(suffix=".xlsx", dir=os.path.dirname(os.path.abspath(src)))
+    os.close(fd)
+    try:
+        rewrite_sheets(src, tmp, transform, sheets)
+        os.replace(tmp, src)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Правка вводных CONTROL в готовой книге")
+    parser.add_argument("path")
+    parser.add_argument("inputs", nargs="+", metavar="name=value")
+    parser.add_argument("-o", "--output", help="новый файл (по умолчанию - на месте)")
+    args = parser.parse_args()
+
+    inputs = parse_inputs(args.inputs, parser)
+    started = time.perf_counter()
+    try:
+        patch_inputs(args.path, inputs, args.output)
+    except (ValueError, KeyError, OSError, zipfile.BadZipFile) as error:
+        # str(KeyError) берет сообщение в кавычки
+        message = error.args[0] if isinstance(error, KeyError) and error.args else error
+        parser.error(f"{args.path}: {message}")
+    print(f"✅ {args.output or args.path}: {len(inputs)} вводных за "
+          f"{(time.perf_counter() - started) * 1000:.1f} мс")